@@ -0,0 +1,214 @@
+from metrics import (
+    bucket_label, ADMISSION_RUNNING, ADMISSION_QUEUED, ADMISSION_WAIT_SECONDS, ADMISSION_REJECTED,
+    PROVIDER_QUEUED, PROVIDER_WAIT_SECONDS
+)
+from contextlib import asynccontextmanager
+from collections import deque
+import asyncio, math, os, time
+
+# Recordings processed at once across uploads, streams, batch items, jobs
+# and live-call analyses
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+# Requests allowed to wait for a slot; beyond this they get a 429
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+# A queued request still waiting after this long gets a 429 too
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "60"))
+# Share of slots each bucket gets while both are queued, e.g. "x_bucket=2,y_bucket=1"
+ADMISSION_BUCKET_WEIGHTS = os.getenv("ADMISSION_BUCKET_WEIGHTS", "x_bucket=1,y_bucket=1")
+# Retry-After bounds, and the time per call assumed until one has finished
+ADMISSION_MIN_RETRY_AFTER = int(os.getenv("ADMISSION_MIN_RETRY_AFTER", "1"))
+ADMISSION_MAX_RETRY_AFTER = int(os.getenv("ADMISSION_MAX_RETRY_AFTER", "120"))
+ADMISSION_DEFAULT_CALL_SECONDS = float(os.getenv("ADMISSION_DEFAULT_CALL_SECONDS", "20"))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def parse_weights(value: str) -> dict:
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() and weight.strip():
+            weights[name.strip()] = max(float(weight), 0.01)
+    return weights
+
+
+class AdmissionController:
+    """
+    Global concurrency cap in front of the pipeline with a bounded wait
+    queue per bucket. Freed slots go to the bucket with the lowest pass
+    (stride scheduling): each admission advances its bucket's pass by
+    1 / weight, so queued buckets share slots in proportion to their
+    weights, and a bucket that was idle restarts at the current pass
+    instead of catching up on the share it did not use.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, max_wait: float, weights: dict):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.weights = weights
+        self.running = 0
+        self.queued = 0
+        self.waiting = {}
+        self.passes = {}
+        self.current_pass = 0.0
+        # Smoothed seconds a call holds its slot, for Retry-After
+        self.call_seconds = None
+        self.admitted = 0
+
+    def retry_after(self) -> int:
+        call_seconds = self.call_seconds or ADMISSION_DEFAULT_CALL_SECONDS
+        estimate = math.ceil(call_seconds * (self.queued + 1) / self.max_concurrent)
+        return max(ADMISSION_MIN_RETRY_AFTER, min(ADMISSION_MAX_RETRY_AFTER, estimate))
+
+    def _admit(self, bucket: str):
+        self.current_pass = max(self.passes.get(bucket, 0.0), self.current_pass)
+        self.passes[bucket] = self.current_pass + 1 / self.weights.get(bucket, 1.0)
+        self.running += 1
+        self.admitted += 1
+        ADMISSION_RUNNING.set(self.running)
+
+    def _dispatch(self):
+        while self.running < self.max_concurrent and self.queued:
+            bucket = min((name for name, queue in self.waiting.items() if queue), key=lambda name: self.passes[name])
+            waiter = self.waiting[bucket].popleft()
+            self.queued -= 1
+            ADMISSION_QUEUED.labels(bucket).set(len(self.waiting[bucket]))
+            self._admit(bucket)
+            waiter.set_result(None)
+
+    def _abandon(self, bucket: str, waiter: asyncio.Future):
+        self.waiting[bucket].remove(waiter)
+        self.queued -= 1
+        ADMISSION_QUEUED.labels(bucket).set(len(self.waiting[bucket]))
+
+    async def acquire(self, bucket: str, reject: bool = True) -> float:
+        """
+        Wait for a slot and return the time it was granted, to be passed to
+        `release`. Raises AdmissionRejected when the queue is full or the
+        wait runs past ADMISSION_MAX_WAIT_SECONDS. Work nobody is waiting on
+        a response for (batch items, jobs, live analyses) passes
+        reject=False and waits its turn instead; it is bounded upstream.
+        """
+        bucket = bucket_label(bucket)
+        start = time.monotonic()
+        if self.running < self.max_concurrent and not self.queued:
+            self._admit(bucket)
+            ADMISSION_WAIT_SECONDS.labels(bucket).observe(0)
+            return start
+
+        if reject and self.queued >= self.max_queue:
+            ADMISSION_REJECTED.labels(bucket, "queue_full").inc()
+            raise AdmissionRejected("Too many calls in progress, try again later.", self.retry_after())
+
+        queue = self.waiting.setdefault(bucket, deque())
+        if not queue:
+            self.passes[bucket] = max(self.passes.get(bucket, 0.0), self.current_pass)
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self.queued += 1
+        ADMISSION_QUEUED.labels(bucket).set(len(queue))
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait if reject else None)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                waiter.cancel()
+                self._abandon(bucket, waiter)
+                ADMISSION_REJECTED.labels(bucket, "wait_timeout").inc()
+                raise AdmissionRejected("Timed out waiting for a free slot, try again later.", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away; give back the slot if it was granted meanwhile
+            if waiter.done():
+                self.release(time.monotonic())
+            else:
+                waiter.cancel()
+                self._abandon(bucket, waiter)
+            raise
+        finally:
+            ADMISSION_WAIT_SECONDS.labels(bucket).observe(time.monotonic() - start)
+        return time.monotonic()
+
+    def release(self, admitted_at: float):
+        held = time.monotonic() - admitted_at
+        self.call_seconds = held if self.call_seconds is None else 0.8 * self.call_seconds + 0.2 * held
+        self.running -= 1
+        ADMISSION_RUNNING.set(self.running)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, bucket: str, reject: bool = True):
+        admitted_at = await self.acquire(bucket, reject)
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+
+    def snapshot(self):
+        return {
+            "running": self.running,
+            "max_concurrent": self.max_concurrent,
+            "queued": {bucket: len(queue) for bucket, queue in self.waiting.items()},
+            "max_queue": self.max_queue,
+            "weights": self.weights,
+            "admitted": self.admitted,
+            "call_seconds": round(self.call_seconds, 3) if self.call_seconds is not None else None,
+            "retry_after": self.retry_after()
+        }
+
+
+class ProviderLimit:
+    """
+    Per-provider concurrency cap (an asyncio.Semaphore) that reports how
+    many requests are waiting for it and for how long.
+    """
+
+    def __init__(self, provider: str, limit: int):
+        self.provider = provider
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_use = 0
+        self.waiting = 0
+
+    async def __aenter__(self):
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+            self.in_use += 1
+            PROVIDER_WAIT_SECONDS.labels(self.provider).observe(0)
+            return self
+        start = time.monotonic()
+        self.waiting += 1
+        PROVIDER_QUEUED.labels(self.provider).inc()
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+            PROVIDER_QUEUED.labels(self.provider).dec()
+            PROVIDER_WAIT_SECONDS.labels(self.provider).observe(time.monotonic() - start)
+        self.in_use += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.in_use -= 1
+        self.semaphore.release()
+
+    def snapshot(self):
+        return {"limit": self.limit, "in_use": self.in_use, "waiting": self.waiting}
+
+
+provider_limits = {}
+
+
+def provider_limit(provider: str, limit: int) -> ProviderLimit:
+    provider_limits[provider] = ProviderLimit(provider, limit)
+    return provider_limits[provider]
+
+
+admission = AdmissionController(
+    ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT_SECONDS, parse_weights(ADMISSION_BUCKET_WEIGHTS)
+)
@@ -0,0 +1,308 @@
+from starlette.concurrency import run_in_threadpool
+import asyncio, hashlib, os, re, subprocess, tempfile
+
+CHUNK_SIZE = 1024 * 1024
+
+# Containers whose index may sit at the end of the file, so ffmpeg has to seek
+SEEKABLE_INPUT_EXTS = ["mp4", "m4a", "mov", "3gp", "3gpp", "caf"]
+# Raw formats ffmpeg cannot probe from a pipe without a hint
+INPUT_FORMATS = {
+    "gsm": "gsm"
+}
+# Normalized uploads: sample-rate ceiling (telephony audio is never upsampled) and lossy bitrate
+NORMALIZE_SAMPLE_RATE = int(os.getenv("AUDIO_NORMALIZE_SAMPLE_RATE", "16000"))
+NORMALIZE_BITRATE_KBPS = int(os.getenv("AUDIO_NORMALIZE_BITRATE_KBPS", "16"))
+# ffmpeg encoder arguments and output format per normalization codec
+NORMALIZE_CODECS = {
+    "opus": (["-c:a", "libopus", "-b:a", f"{NORMALIZE_BITRATE_KBPS}k", "-application", "voip", "-compression_level", "0"], "ogg"),
+    "flac": (["-c:a", "flac"], "flac"),
+    "mp3": (["-c:a", "libmp3lame", "-b:a", f"{NORMALIZE_BITRATE_KBPS}k"], "mp3")
+}
+# Zip archives sent to /transcribe/batch: member count, and compressed and
+# decompressed sizes (per member and in total) as read from the central directory
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "500"))
+ZIP_MAX_COMPRESSED_MB = int(os.getenv("ZIP_MAX_COMPRESSED_MB", "1024"))
+ZIP_MAX_MEMBER_MB = int(os.getenv("ZIP_MAX_MEMBER_MB", "200"))
+ZIP_MAX_TOTAL_MB = int(os.getenv("ZIP_MAX_TOTAL_MB", "2048"))
+# tmpfs keeps the spool in memory; /tmp is the only writable path on Vercel
+SPOOL_DIR = os.getenv("AUDIO_SPOOL_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+
+
+class InvalidAudio(Exception):
+    """
+    The upload could not be decoded. A client error, not a provider failure.
+    """
+
+
+def invalid_audio(e: subprocess.CalledProcessError) -> InvalidAudio:
+    lines = (e.stderr or b"").decode(errors="ignore").strip().splitlines()
+    return InvalidAudio(f"Could not decode the audio: {lines[-1] if lines else f'ffmpeg exited with {e.returncode}'}")
+
+
+async def upload_chunks(file):
+    """
+    Yield an UploadFile's content from the start in CHUNK_SIZE pieces.
+    """
+    await file.seek(0)
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def bytes_chunks(data: bytes):
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        yield view[start:start + CHUNK_SIZE]
+
+
+def zip_members(archive) -> list:
+    """
+    The recordings in an open ZipFile as `(filename, ZipInfo)`, keyed by
+    basename like uploaded files. Raises ValueError when the archive is over
+    the ZIP_MAX_* limits or two members share a basename. ZipFile stops
+    reading a member at its declared size, so checking the central
+    directory bounds what is decompressed.
+    """
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+    ]
+    if len(members) > ZIP_MAX_MEMBERS:
+        raise ValueError(f"Archive has {len(members)} files, the limit is {ZIP_MAX_MEMBERS}.")
+    if sum(info.compress_size for info in members) > ZIP_MAX_COMPRESSED_MB * 1024 * 1024:
+        raise ValueError(f"Archive is larger than {ZIP_MAX_COMPRESSED_MB} MB.")
+    for info in members:
+        if info.file_size > ZIP_MAX_MEMBER_MB * 1024 * 1024:
+            raise ValueError(f"{info.filename} is larger than {ZIP_MAX_MEMBER_MB} MB uncompressed.")
+    if sum(info.file_size for info in members) > ZIP_MAX_TOTAL_MB * 1024 * 1024:
+        raise ValueError(f"Archive is larger than {ZIP_MAX_TOTAL_MB} MB uncompressed.")
+
+    recordings = {}
+    for info in members:
+        filename = os.path.basename(info.filename)
+        if filename in recordings:
+            raise ValueError(f"{recordings[filename].filename} and {info.filename} share the filename {filename}.")
+        recordings[filename] = info
+    return list(recordings.items())
+
+
+async def zip_member_chunks(archive, info):
+    """
+    Yield one member of an open ZipFile in CHUNK_SIZE pieces, decompressing
+    in the thread pool.
+    """
+    member = await run_in_threadpool(archive.open, info)
+    try:
+        while True:
+            chunk = await run_in_threadpool(member.read, CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        member.close()
+
+
+def hash_chunks(open_chunks):
+    """
+    Wrap `open_chunks` so the upload is sha256-hashed as it streams through
+    the first complete pass. Returns the wrapped callable and a function
+    giving the hex digest (None until a pass has finished).
+    """
+    state = {"digest": None}
+
+    async def hashed():
+        digest = hashlib.sha256()
+        async for chunk in open_chunks():
+            digest.update(chunk)
+            yield chunk
+        if state["digest"] is None:
+            state["digest"] = digest.hexdigest()
+
+    return hashed, lambda: state["digest"]
+
+
+async def read_chunks(chunks) -> bytes:
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+    return bytes(buffer)
+
+
+async def _ffmpeg(args: list, chunks=None, loglevel: str = "error"):
+    """
+    Run ffmpeg, optionally streaming `chunks` into stdin, and return
+    `(stdout, stderr)`. Raises CalledProcessError on failure.
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", loglevel, *args]
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if chunks is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+
+    async def feed():
+        try:
+            async for chunk in chunks:
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg exited early; its return code carries the real error
+            pass
+        finally:
+            process.stdin.close()
+
+    feeder = asyncio.create_task(feed()) if chunks is not None else None
+    stdout, stderr = await asyncio.gather(process.stdout.read(), process.stderr.read())
+    if feeder:
+        await feeder
+    await process.wait()
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, output=stdout, stderr=stderr)
+    return stdout, stderr
+
+
+async def _run_ffmpeg(args: list, chunks=None) -> bytes:
+    stdout, _ = await _ffmpeg(args, chunks)
+    return stdout
+
+
+async def _spool(chunks, ext: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=f".{ext}", dir=SPOOL_DIR)
+    with os.fdopen(fd, "wb") as spool:
+        async for chunk in chunks:
+            await run_in_threadpool(spool.write, chunk)
+    return path
+
+
+def _output_args(ext: str):
+    # Convert GSM → WAV (fastest) or anything else that is not wav/mp3 → MP3
+    if ext == "gsm":
+        return ["-f", "wav", "pipe:1"], "wav"
+    return ["-f", "mp3", "pipe:1"], "mp3"
+
+
+async def transcode(open_chunks, ext: str):
+    """
+    Return the upload as a single (audio bytes, extension) buffer ready for a
+    provider. wav/mp3 pass through untouched; other formats are streamed
+    through ffmpeg's stdin/stdout. Inputs that need seeking, or that fail to
+    decode from a pipe, are spooled to SPOOL_DIR first.
+
+    `open_chunks` is a zero-argument callable returning a fresh async
+    iterator over the upload, so the input can be replayed for the spool.
+    """
+    if ext in ["wav", "mp3"]:
+        return await read_chunks(open_chunks()), ext
+
+    output_args, out_ext = _output_args(ext)
+
+    if ext not in SEEKABLE_INPUT_EXTS:
+        input_format = ["-f", INPUT_FORMATS[ext]] if ext in INPUT_FORMATS else []
+        try:
+            return await _run_ffmpeg([*input_format, "-i", "pipe:0", *output_args], open_chunks()), out_ext
+        except subprocess.CalledProcessError as e:
+            print(f"[Transcode] pipe failed for .{ext}, retrying from spool: {e.stderr.decode(errors='ignore').strip()}")
+
+    path = await _spool(open_chunks(), ext)
+    try:
+        return await _run_ffmpeg(["-i", path, *output_args]), out_ext
+    finally:
+        os.remove(path)
+
+
+def _ffmpeg_time(stderr: bytes) -> float:
+    # Last "time=HH:MM:SS.xx" progress stamp, i.e. how much audio ffmpeg read
+    stamps = re.findall(rb"time=(\d+):(\d+):(\d+(?:\.\d+)?)", stderr)
+    if not stamps:
+        return 0.0
+    hours, minutes, seconds = stamps[-1]
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+async def probe_audio(audio: bytes) -> dict:
+    """
+    Duration, sample rate, channel count and bitrate (kb/s, None when the
+    container does not say), read by stream-copying the audio (no decoding).
+    """
+    _, stderr = await _ffmpeg(["-i", "pipe:0", "-map", "0:a", "-c", "copy", "-f", "null", "-"], bytes_chunks(audio), "info")
+    stream = re.search(rb"Audio: [^\n]*?(\d+) Hz, ([^,\n]+)(?:,[^,\n]*)?(?:, (\d+) kb/s)?", stderr)
+    info = {"duration": _ffmpeg_time(stderr), "sample_rate": None, "channels": None, "bitrate_kbps": None}
+    if stream:
+        layout = stream.group(2).decode().strip()
+        channels = re.match(r"(\d+) channels", layout)
+        info["sample_rate"] = int(stream.group(1))
+        info["channels"] = {"mono": 1, "stereo": 2}.get(layout, int(channels.group(1)) if channels else None)
+        info["bitrate_kbps"] = int(stream.group(3)) if stream.group(3) else None
+    return info
+
+
+async def probe_duration(audio: bytes) -> float:
+    return (await probe_audio(audio))["duration"]
+
+
+async def normalize_audio(audio: bytes, ext: str, codec: str):
+    """
+    Downmix to mono, cap the sample rate at NORMALIZE_SAMPLE_RATE and
+    re-encode with one of NORMALIZE_CODECS. Returns `(audio, ext)`; the input
+    comes back untouched when it is already compact, when `codec` is not a
+    known codec (e.g. "off"), or when re-encoding would not make it smaller.
+    """
+    if codec not in NORMALIZE_CODECS:
+        return audio, ext
+
+    info = await probe_audio(audio)
+    sample_rate = min(info["sample_rate"] or NORMALIZE_SAMPLE_RATE, NORMALIZE_SAMPLE_RATE)
+    compact = (
+        ext != "wav"
+        and info["channels"] == 1
+        and info["sample_rate"] == sample_rate
+        and info["bitrate_kbps"] is not None
+        and info["bitrate_kbps"] <= NORMALIZE_BITRATE_KBPS * 1.5
+    )
+    if compact:
+        return audio, ext
+
+    codec_args, out_ext = NORMALIZE_CODECS[codec]
+    normalized = await _run_ffmpeg(
+        ["-i", "pipe:0", "-map", "0:a", "-ac", "1", "-ar", str(sample_rate), *codec_args, "-f", out_ext, "pipe:1"],
+        bytes_chunks(audio)
+    )
+    if len(normalized) >= len(audio):
+        return audio, ext
+    return normalized, out_ext
+
+
+async def detect_silences(audio: bytes, noise_db: float, min_seconds: float):
+    """
+    Return `(duration, silences)` where silences is a list of `(start, end)`
+    seconds quieter than `noise_db` for at least `min_seconds`.
+    """
+    _, stderr = await _ffmpeg(
+        ["-i", "pipe:0", "-af", f"silencedetect=noise={noise_db}dB:d={min_seconds}", "-f", "null", "-"],
+        bytes_chunks(audio),
+        "info"
+    )
+    starts = [float(value) for value in re.findall(rb"silence_start: (-?\d+(?:\.\d+)?)", stderr)]
+    ends = [float(value) for value in re.findall(rb"silence_end: (\d+(?:\.\d+)?)", stderr)]
+    duration = _ffmpeg_time(stderr)
+    # A recording that ends in silence has a start without a matching end
+    ends += [duration] * (len(starts) - len(ends))
+    return duration, [(max(0.0, start), end) for start, end in zip(starts, ends)]
+
+
+async def cut_audio(audio: bytes, ext: str, start: float, duration: float = None) -> bytes:
+    """
+    Stream-copy `[start, start + duration)` out of a buffer without
+    re-encoding. `ext` names the container, which ffmpeg also writes the
+    cut in: the normalized ogg (opus), flac and mp3 uploads, or wav. Cuts
+    land on the nearest packet boundary.
+    """
+    length = ["-t", f"{duration:.3f}"] if duration is not None else []
+    return await _run_ffmpeg(
+        ["-i", "pipe:0", "-ss", f"{start:.3f}", *length, "-map", "0:a", "-c", "copy", "-f", ext, "pipe:1"],
+        bytes_chunks(audio)
+    )
@@ -0,0 +1,111 @@
+from pipeline import run_stages, analysis_metadata
+from metrics import track_call
+from admission import admission
+from mongo_utils import get_or_create_agent, call_document, insert_calls
+import asyncio, os, time
+
+# Recordings from one batch processed at the same time
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", "8"))
+BATCH_MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", "32"))
+
+MANIFEST_FIELDS = ["agent_name", "patient_name", "agent_phone_number"]
+
+
+def parse_manifest(manifest: list):
+    """
+    Index manifest entries by filename and lowercase the stored values,
+    like /transcribe does. Raises ValueError on malformed entries.
+    """
+    entries = {}
+    for entry in manifest:
+        if not isinstance(entry, dict) or not entry.get("filename"):
+            raise ValueError("Every manifest entry needs a filename.")
+        missing = [field for field in MANIFEST_FIELDS if not entry.get(field)]
+        if missing:
+            raise ValueError(f"Manifest entry {entry['filename']} is missing {', '.join(missing)}.")
+        entries[entry["filename"]] = {
+            **{field: str(entry[field]).lower() for field in MANIFEST_FIELDS},
+            "bucket": entry.get("bucket")
+        }
+    return entries
+
+
+async def process_batch(recordings: list, manifest: dict, bucket: str, parallelism: int = None, provider: str = None):
+    """
+    Run transcode → transcribe → analysis for many recordings with bounded
+    parallelism, then store every successful call with one insert_many.
+
+    `recordings` is a list of `(filename, open_chunks)`; `manifest` maps each
+    filename to its agent/patient/phone metadata (see parse_manifest).
+    Returns the per-file results and a batch summary.
+    """
+    start = time.monotonic()
+    parallelism = max(1, min(parallelism or BATCH_PARALLELISM, BATCH_MAX_PARALLELISM))
+    semaphore = asyncio.Semaphore(parallelism)
+
+    # One agent lookup per distinct agent instead of one per file
+    agent_names = sorted({manifest[filename]["agent_name"] for filename, _ in recordings if filename in manifest})
+    agent_ids = dict(zip(agent_names, await asyncio.gather(
+        *(get_or_create_agent(agent_name=name) for name in agent_names)
+    )))
+
+    async def run_one(filename: str, open_chunks):
+        metadata = manifest.get(filename)
+        if not metadata:
+            return {"filename": filename, "success": False, "response": "No manifest entry for file."}
+        if not agent_ids.get(metadata["agent_name"]):
+            return {"filename": filename, "success": False, "response": "Could not resolve agent."}
+
+        file_bucket = metadata["bucket"] or bucket
+        async with semaphore, admission.slot(file_bucket, reject=False):
+            with track_call(file_bucket) as call:
+                call["status"] = "failed"
+                try:
+                    ext = filename.split(".")[-1].lower()
+                    transcription, analysis = await run_stages(open_chunks, ext, file_bucket, provider=provider)
+                except Exception as e:
+                    call["status"] = "error"
+                    return {"filename": filename, "success": False, "response": str(e)}
+                if transcription and analysis:
+                    call["status"] = "ok"
+
+        if not (transcription and analysis):
+            return {"filename": filename, "success": False, "response": "Error Processing Data."}
+        return {
+            "filename": filename,
+            "success": True,
+            "analysis": analysis,
+            "document": call_document(
+                agent_name=metadata["agent_name"],
+                agent_id=agent_ids[metadata["agent_name"]],
+                bucket=file_bucket,
+                patient_name=metadata["patient_name"],
+                agent_phone_number=metadata["agent_phone_number"],
+                analystics=analysis,
+                transcribe=transcription,
+                **analysis_metadata(file_bucket)
+            )
+        }
+
+    results = await asyncio.gather(*(run_one(filename, open_chunks) for filename, open_chunks in recordings))
+
+    stored = [result for result in results if result["success"]]
+    ids = await insert_calls([result.pop("document") for result in stored])
+    for id, result in zip(ids, stored):
+        if id is None:
+            result["success"] = False
+            result["response"] = "Error storing data."
+        else:
+            result["response"] = id
+
+    succeeded = sum(1 for result in results if result["success"])
+    return {
+        "results": results,
+        "summary": {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "parallelism": parallelism,
+            "elapsed_seconds": round(time.monotonic() - start, 3)
+        }
+    }
@@ -0,0 +1,111 @@
+"""
+Shift-end burst against /transcribe with admission control: --uploads calls
+arrive at once, --x-share of them for x_bucket and the rest for y_bucket,
+with providers and Mongo replaced by stand-ins that sleep for a fixed
+latency.
+
+Reports per bucket how many calls were admitted or answered 429 (with the
+Retry-After values), their latency, and the bucket share of queued calls
+admitted while both buckets were waiting, next to what the weights ask for.
+
+    python benchmarks/bench_admission.py --uploads 120 --max-concurrent 16 --max-queue 64
+    python benchmarks/bench_admission.py --weights x_bucket=3,y_bucket=1 --x-share 0.5
+"""
+import argparse, asyncio, os, random, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(samples: list) -> str:
+    if not samples:
+        return "-"
+    ordered = sorted(samples)
+    return f"p50 {ordered[len(ordered) // 2]:.2f}s  p95 {ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]:.2f}s"
+
+
+async def run(args):
+    import httpx
+    import main
+    from admission import admission, parse_weights
+    from bench_concurrent_uploads import install_fakes
+
+    install_fakes(args.latency, args.db_latency)
+
+    # Buckets admitted while the other bucket also had calls waiting
+    contended = []
+    admit = admission._admit
+
+    def recording_admit(bucket: str):
+        other = "y_bucket" if bucket == "x_bucket" else "x_bucket"
+        if admission.waiting.get(other):
+            contended.append(bucket)
+        admit(bucket)
+
+    admission._admit = recording_admit
+
+    with open(os.path.join(ROOT, args.file), "rb") as f:
+        audio = f.read()
+    buckets = ["x_bucket" if index < args.uploads * args.x_share else "y_bucket" for index in range(args.uploads)]
+    results = {bucket: {"ok": 0, "rejected": 0, "failed": 0, "latency": [], "retry_after": []} for bucket in ("x_bucket", "y_bucket")}
+
+    async def upload(client: httpx.AsyncClient, bucket: str):
+        start = time.perf_counter()
+        response = await client.post(
+            "/transcribe",
+            params={"bucket": bucket},
+            files={"file": ("call.mp3", audio, "audio/mpeg")},
+            data={"agent_name": "bench", "patient_name": "bench", "agent_phone_number": "0"},
+        )
+        result = results[bucket]
+        if response.status_code == 429:
+            result["rejected"] += 1
+            result["retry_after"].append(int(response.headers["Retry-After"]))
+        elif response.json().get("success"):
+            result["ok"] += 1
+            result["latency"].append(time.perf_counter() - start)
+        else:
+            result["failed"] += 1
+
+    # Interleave arrivals so neither bucket gets to the queue first
+    order = list(range(args.uploads))
+    random.Random(0).shuffle(order)
+    transport = httpx.ASGITransport(app=main.app)
+    start = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await asyncio.gather(*(upload(client, buckets[index]) for index in order))
+    elapsed = time.perf_counter() - start
+
+    print(f"uploads={args.uploads} max_concurrent={admission.max_concurrent} max_queue={admission.max_queue}  {elapsed:.2f}s")
+    for bucket, result in results.items():
+        retry = result["retry_after"]
+        retry_range = f"{min(retry)}-{max(retry)}s" if retry else "-"
+        print(f"{bucket}: ok {result['ok']:>4}  429 {result['rejected']:>4} (Retry-After {retry_range})  failed {result['failed']}  latency {percentiles(result['latency'])}")
+
+    if contended:
+        weights = parse_weights(args.weights)
+        expected = weights.get("x_bucket", 1.0) / (weights.get("x_bucket", 1.0) + weights.get("y_bucket", 1.0))
+        print(f"x_bucket share of {len(contended)} contended admissions: {contended.count('x_bucket') / len(contended):.1%} (weights ask {expected:.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=120)
+    parser.add_argument("--x-share", type=float, default=0.8, help="fraction of uploads for x_bucket")
+    parser.add_argument("--max-concurrent", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=60)
+    parser.add_argument("--weights", default="x_bucket=1,y_bucket=1")
+    parser.add_argument("--latency", type=float, default=0.5, help="stand-in provider latency")
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    parser.add_argument("--file", default="Bad call 2.mp3")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "ADMISSION_MAX_CONCURRENT": str(args.max_concurrent),
+        "ADMISSION_MAX_QUEUE": str(args.max_queue),
+        "ADMISSION_MAX_WAIT_SECONDS": str(args.max_wait),
+        "ADMISSION_BUCKET_WEIGHTS": args.weights,
+    })
+    asyncio.run(run(args))
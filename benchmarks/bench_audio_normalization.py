@@ -0,0 +1,70 @@
+"""
+Measure what audio normalization saves on the bundled samples: bytes before
+and after, and time spent re-encoding. With --live each sample is also
+transcribed as-is and normalized through the real provider, and the
+transcripts are compared word by word so a quality regression shows up as
+a similarity drop (speaker labels and punctuation are ignored).
+
+    python benchmarks/bench_audio_normalization.py --codec opus
+    python benchmarks/bench_audio_normalization.py --live --provider deepgram
+"""
+import argparse, asyncio, difflib, os, re, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLES = ["apex1.mp3", "apex2.mp3", "Good call 2.mp3", "Bad call 2.mp3", "audio_rec.mp3"]
+
+
+def words(transcript: str) -> list:
+    text = re.sub(r"Speaker \d+:", " ", transcript or "")
+    return re.findall(r"\w+", text.lower())
+
+
+async def timed(call):
+    start = time.perf_counter()
+    result = await call()
+    return time.perf_counter() - start, result
+
+
+async def run(args):
+    from audio_utils import normalize_audio
+    from pipeline import TRANSCRIBE_FUNCTIONS
+
+    function = TRANSCRIBE_FUNCTIONS[args.provider]
+    header = f"{'file':<18} {'before':>10} {'after':>10} {'saved':>7} {'encode':>7}"
+    if args.live:
+        header += f" {'upload before':>13} {'upload after':>12} {'similarity':>10}"
+    print(header)
+
+    total_before = total_after = 0
+    for name in SAMPLES:
+        with open(os.path.join(ROOT, name), "rb") as f:
+            audio = f.read()
+        encode, (normalized, ext) = await timed(lambda: normalize_audio(audio, "mp3", args.codec))
+        total_before += len(audio)
+        total_after += len(normalized)
+        row = (
+            f"{name:<18} {len(audio):>10,} {len(normalized):>10,} "
+            f"{1 - len(normalized) / len(audio):>6.1%} {encode:>6.2f}s"
+        )
+        if args.live:
+            before, original = await timed(lambda: function(audio, "mp3"))
+            after, compact = await timed(lambda: function(normalized, ext))
+            similarity = difflib.SequenceMatcher(None, words(original), words(compact)).ratio()
+            row += f" {before:>12.2f}s {after:>11.2f}s {similarity:>10.3f}"
+        print(row)
+
+    print(f"{'total':<18} {total_before:>10,} {total_after:>10,} {1 - total_after / total_before:>6.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--codec", default="opus", help="opus, flac or mp3")
+    parser.add_argument("--provider", default="deepgram", help="provider used with --live")
+    parser.add_argument("--live", action="store_true", help="also transcribe through the real provider")
+    args = parser.parse_args()
+
+    for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    asyncio.run(run(args))
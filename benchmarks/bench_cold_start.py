@@ -0,0 +1,103 @@
+"""
+Cold-start cost of the app as deployed through vercel.json: each run starts
+a fresh interpreter and measures
+
+- import:         `import main`
+- first_request:  the first GET /ping through the ASGI app
+- first_analysis: building the OpenAI client the first analysis needs
+- sdks_loaded:    which provider SDKs the import pulled in
+
+Exits with status 1 when a median exceeds --max-import or
+--max-first-request, so it can gate cold-start regressions in CI.
+
+    python benchmarks/bench_cold_start.py --runs 5
+    python benchmarks/bench_cold_start.py --max-import 1.0 --max-first-request 0.1 --top 15
+"""
+import argparse, json, os, statistics, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+sdks = [name for name in ("openai", "groq", "deepgram") if name in sys.modules]
+
+async def first_request():
+    import httpx
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        begin = time.perf_counter()
+        response = await client.get("/ping")
+        response.raise_for_status()
+        return time.perf_counter() - begin
+
+request = asyncio.run(first_request())
+import clients
+begin = time.perf_counter()
+clients.openai_client()
+print(json.dumps({
+    "import": imported - start,
+    "first_request": request,
+    "first_analysis": time.perf_counter() - begin,
+    "sdks_loaded": sdks
+}))
+"""
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("MONGODB_URI", "mongodb://localhost:27017/?serverSelectionTimeoutMS=1000")
+    for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+        env.setdefault(key, "benchmark")
+    return env
+
+
+def measure() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def top_imports(count: int):
+    """
+    Slowest modules by cumulative import time, from `python -X importtime`.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=child_env(), capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    print(f"\n{'cumulative':>10}  module")
+    for cumulative, name in sorted(rows, reverse=True)[:count]:
+        print(f"{cumulative / 1000:>8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import", type=float, help="fail if the median import takes longer (seconds)")
+    parser.add_argument("--max-first-request", type=float, help="fail if the median first request takes longer (seconds)")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    medians = {key: statistics.median(run[key] for run in runs) for key in ("import", "first_request", "first_analysis")}
+    for key, value in medians.items():
+        print(f"{key:<15} median {value * 1000:>7.1f}ms  (min {min(run[key] for run in runs) * 1000:.1f}ms)")
+    print(f"{'sdks_loaded':<15} {', '.join(runs[0]['sdks_loaded']) or 'none'}")
+
+    if args.top:
+        top_imports(args.top)
+
+    failed = False
+    for key, limit in (("import", args.max_import), ("first_request", args.max_first_request)):
+        if limit is not None and medians[key] > limit:
+            print(f"REGRESSION: median {key} {medians[key]:.3f}s > {limit:.3f}s")
+            failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,95 @@
+"""
+Show that N concurrent /transcribe uploads finish in roughly the time of one.
+
+Provider and Mongo calls are replaced with local stand-ins that sleep for a
+fixed latency, and the result caches are bypassed, so the only thing measured is whether the
+request path lets uploads overlap.
+
+    python benchmarks/bench_concurrent_uploads.py --uploads 20
+"""
+import argparse, asyncio, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+    os.environ.setdefault(key, "benchmark")
+# The fake provider ignores the audio; keep re-encoding CPU out of the measurement
+os.environ.setdefault("AUDIO_NORMALIZE_DEEPGRAM", "off")
+# Measure overlap on the request path, not the admission cap (see bench_admission.py)
+os.environ.setdefault("ADMISSION_MAX_CONCURRENT", "1000")
+os.environ.setdefault("ADMISSION_MAX_QUEUE", "1000")
+
+import httpx
+import main, pipeline
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "apex1.mp3")
+
+
+async def cache_miss(key: str):
+    return None
+
+
+def install_fakes(provider_latency: float, db_latency: float):
+    async def fake_transcribe(audio: bytes, ext: str = "mp3", model: str = "nova-2"):
+        await asyncio.sleep(provider_latency)
+        return "Speaker 0: Hello\n\nSpeaker 1: hello"
+
+    async def fake_analysis(transcribe: str, bucket: str):
+        await asyncio.sleep(provider_latency)
+        return {"Total_Score": 7}
+
+    async def fake_agent(agent_name: str):
+        await asyncio.sleep(db_latency)
+        return "0" * 24
+
+    async def fake_insert(**kwargs):
+        await asyncio.sleep(db_latency)
+        return "0" * 24
+
+    pipeline.TRANSCRIBE_FUNCTIONS["deepgram"] = fake_transcribe
+    pipeline.get_call_analysis = fake_analysis
+    pipeline.get_or_create_agent = fake_agent
+    pipeline.update_data = fake_insert
+    # Every upload is the same file; skip the result caches so each one does the full work
+    pipeline.transcript_cache.get_or_compute = lambda key, compute, meta=None: compute()
+    pipeline.transcript_cache.peek = cache_miss
+    pipeline.analysis_cache.get_or_compute = lambda key, compute, meta=None: compute()
+
+
+async def upload(client: httpx.AsyncClient, audio: bytes):
+    response = await client.post(
+        "/transcribe",
+        params={"bucket": "x_bucket"},
+        files={"file": ("apex1.mp3", audio, "audio/mpeg")},
+        data={"agent_name": "bench", "patient_name": "bench", "agent_phone_number": "0"},
+    )
+    assert response.json()["success"], response.text
+
+
+async def timed(client: httpx.AsyncClient, audio: bytes, n: int):
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(client, audio) for _ in range(n)))
+    return time.perf_counter() - start
+
+
+async def run(uploads: int):
+    with open(SAMPLE, "rb") as f:
+        audio = f.read()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        single = await timed(client, audio, 1)
+        concurrent = await timed(client, audio, uploads)
+
+    print(f"1 upload:          {single:.3f}s")
+    print(f"{uploads} concurrent uploads: {concurrent:.3f}s ({concurrent / single:.2f}x one upload)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--provider-latency", type=float, default=0.5)
+    parser.add_argument("--db-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    install_fakes(args.provider_latency, args.db_latency)
+    asyncio.run(run(args.uploads))
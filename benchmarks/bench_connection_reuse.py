@@ -0,0 +1,134 @@
+"""
+Connection reuse on the shared provider pool (clients.http_pool). A local
+HTTP server stands in for the Deepgram, Groq and OpenAI APIs, and the real
+SDK calls in get_transcribe/get_analysis run against it: --calls
+recordings, --concurrency at a time, each transcribed with --provider and
+then analyzed.
+
+Prints the pool's per-host stats: requests, new connections and the share
+of requests that reused an open connection. The stand-in speaks plain
+HTTP/1.1, so TLS handshakes and HTTP/2 only show up against the real APIs.
+
+    python benchmarks/bench_connection_reuse.py --calls 200 --concurrency 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS=0 python benchmarks/bench_connection_reuse.py
+"""
+import argparse, asyncio, json, os, socket, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ANALYSIS = {
+    "Sentiment_overall": "neutral",
+    "Total_Score": 7,
+    "Individual_Scores": {},
+    "Call_summary": "stand-in"
+}
+
+
+async def standin_app(scope, receive, send):
+    """
+    Minimal responses for the three provider endpoints the pipeline calls.
+    """
+    if scope["type"] != "http":
+        return
+    while (await receive()).get("more_body"):
+        pass
+    await asyncio.sleep(standin_app.latency)
+
+    path = scope["path"]
+    if path.endswith("/listen"):
+        transcript = "Speaker 0: stand-in transcript"
+        body = {
+            "metadata": {"request_id": "bench"},
+            "results": {"channels": [{"alternatives": [{"transcript": transcript, "confidence": 1.0, "words": [], "paragraphs": {"transcript": transcript, "paragraphs": []}}]}]}
+        }
+    elif path.endswith("/audio/transcriptions"):
+        body = {"text": "stand-in transcript"}
+    elif path.endswith("/responses"):
+        body = {
+            "id": "resp_bench", "object": "response", "created_at": int(time.time()), "model": "gpt-4o-mini",
+            "status": "completed", "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+            "output": [{
+                "type": "message", "id": "msg_bench", "role": "assistant", "status": "completed",
+                "content": [{"type": "output_text", "text": json.dumps(ANALYSIS), "annotations": []}]
+            }],
+            "usage": {
+                "input_tokens": 1000, "output_tokens": 200, "total_tokens": 1200,
+                "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}
+            }
+        }
+    else:
+        await send({"type": "http.response.start", "status": 404, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    payload = json.dumps(body).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": payload})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(args):
+    import uvicorn
+
+    standin_app.latency = args.latency
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(standin_app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base = f"http://127.0.0.1:{port}"
+    os.environ["DEEPGRAM_HOST"] = base
+    os.environ["GROQ_BASE_URL"] = base
+    os.environ["OPENAI_BASE_URL"] = f"{base}/v1"
+
+    import get_transcribe, clients
+    from get_analysis import get_call_analysis
+    transcribe = {
+        "deepgram": get_transcribe.transcribe_audio_deepgram,
+        "groq": get_transcribe.transcribe_audio,
+        "openai": get_transcribe.transcribe_audio_openai
+    }[args.provider]
+
+    audio = b"\0" * args.audio_bytes
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def call():
+        async with semaphore:
+            transcript = await transcribe(audio, "mp3")
+            await get_call_analysis(transcribe=transcript, bucket="x_bucket")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(args.calls)))
+    elapsed = time.perf_counter() - start
+
+    stats = clients.http_stats()
+    await clients.close_http_pool()
+    server.should_exit = True
+    await serving
+
+    print(f"calls={args.calls} concurrency={args.concurrency} provider={args.provider}  {elapsed:.2f}s, {args.calls / elapsed:.1f} calls/s")
+    print(f"{'host':<18} {'requests':>9} {'connections':>12} {'reused':>7}")
+    for host, host_stats in stats.items():
+        print(f"{host:<18} {host_stats['requests']:>9} {host_stats['connections_opened']:>12} {host_stats['reused_ratio']:>7.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--provider", choices=["deepgram", "groq", "openai"], default="deepgram")
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in delay per request")
+    parser.add_argument("--audio-bytes", type=int, default=200_000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017/?serverSelectionTimeoutMS=1000")
+    for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    asyncio.run(run(args))
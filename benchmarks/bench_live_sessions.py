@@ -0,0 +1,135 @@
+"""
+Load test for /transcribe/live: many concurrent calls stream a recording in
+frames to the app (served by uvicorn in this process), which relays them to
+the local streaming stand-in (benchmarks/live_standin.py). Analysis and
+storage use the stubs from benchmarks/stubs.py.
+
+Reports time to the first segment, stop-to-stored latency, and how many
+calls were refused or failed.
+
+    python benchmarks/bench_live_sessions.py --sessions 100 --speed 20
+    python benchmarks/bench_live_sessions.py --sessions 50 --max-sessions 20
+"""
+import argparse, asyncio, json, os, socket, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(samples: list) -> str:
+    if not samples:
+        return "-"
+    ordered = sorted(samples)
+    return f"p50 {ordered[len(ordered) // 2] * 1000:.0f}ms  p95 {ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000:.0f}ms"
+
+
+async def run(args):
+    import websockets, uvicorn
+    from live_standin import serve
+    from audio_utils import probe_duration
+
+    with open(os.path.join(ROOT, args.file), "rb") as f:
+        audio = f.read()
+    bytes_per_second = len(audio) / await probe_duration(audio)
+    standin, url = await serve(bytes_per_second=bytes_per_second, latency=args.latency)
+    os.environ["DEEPGRAM_LIVE_URL"] = url
+
+    import main, pipeline, live
+    from stubs import Latency, install_provider_stubs, install_memory_store
+    install_provider_stubs({name: Latency.parse(args.analysis) for name in ("groq", "openai", "deepgram", "analysis")})
+    install_memory_store(args.db_latency)
+    live.get_or_create_agent, live.update_data = pipeline.get_or_create_agent, pipeline.update_data
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    frame_bytes = int(bytes_per_second * args.frame_ms / 1000)
+    frame_interval = args.frame_ms / 1000 / args.speed
+    first_segment, stored, outcomes = [], [], {"stored": 0, "refused": 0, "failed": 0}
+
+    async def call(index: int):
+        query = f"bucket=x_bucket&agent_name=bench%20{index}&patient_name=bench&agent_phone_number=0"
+        start = time.perf_counter()
+        async with websockets.connect(f"ws://127.0.0.1:{port}/transcribe/live?{query}", max_size=None) as client:
+            async def send_audio():
+                for offset in range(0, len(audio), frame_bytes):
+                    await client.send(audio[offset:offset + frame_bytes])
+                    await asyncio.sleep(frame_interval)
+                await client.send(json.dumps({"type": "stop"}))
+                return time.perf_counter()
+
+            sending = asyncio.create_task(send_audio())
+            segments = 0
+            try:
+                async for message in client:
+                    message = json.loads(message)
+                    if message["type"] == "segment":
+                        if not segments:
+                            first_segment.append(time.perf_counter() - start)
+                        segments += 1
+                    elif message["type"] == "stored":
+                        stored.append(time.perf_counter() - await sending)
+                        outcomes["stored"] += 1
+                        return
+                    elif message["type"] == "error":
+                        outcomes["failed"] += 1
+                        return
+            finally:
+                sending.cancel()
+            outcomes["refused" if client.close_code == 1013 else "failed"] += 1
+
+    async def guarded_call(index: int):
+        try:
+            await call(index)
+        except websockets.ConnectionClosed as e:
+            if e.rcvd and e.rcvd.code == 1013:
+                outcomes["refused"] += 1
+            else:
+                print(f"session {index}: {e}")
+                outcomes["failed"] += 1
+        except Exception as e:
+            print(f"session {index}: {type(e).__name__}: {e}")
+            outcomes["failed"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(guarded_call(index) for index in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+
+    server.should_exit = True
+    await serving
+    standin.close()
+
+    print(f"sessions={args.sessions} speed={args.speed}x frame={args.frame_ms}ms  {elapsed:.2f}s total")
+    print(f"outcomes: {outcomes}")
+    print(f"first segment:    {percentiles(first_segment)}")
+    print(f"stop to stored:   {percentiles(stored)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--max-sessions", type=int, help="LIVE_MAX_SESSIONS for the app")
+    parser.add_argument("--file", default="apex1.mp3", help="recording streamed by every call")
+    parser.add_argument("--speed", type=float, default=10, help="playback speed relative to real time")
+    parser.add_argument("--frame-ms", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in delay before each result")
+    parser.add_argument("--analysis", default="1.0,0.2", help="stub analysis latency, base[,jitter]")
+    parser.add_argument("--db-latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    if args.max_sessions:
+        os.environ["LIVE_MAX_SESSIONS"] = str(args.max_sessions)
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017/?serverSelectionTimeoutMS=1000")
+    for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    asyncio.run(run(args))
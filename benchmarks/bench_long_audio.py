@@ -0,0 +1,79 @@
+"""
+Compare single-shot and chunked (long-audio mode) transcription wall-clock
+time on the bundled mp3 recordings.
+
+By default Deepgram is replaced with a local stand-in whose latency grows
+with the audio length (--base-latency + --seconds-per-audio-second), while
+the ffmpeg silence detection and cutting run for real. Pass --live to call
+Deepgram with DEEPGRAM_API_KEY instead.
+
+    python benchmarks/bench_long_audio.py
+    python benchmarks/bench_long_audio.py --live --chunk-seconds 45
+"""
+import argparse, asyncio, glob, os, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def install_fakes(get_transcribe, long_audio, seconds_per_byte: float, base_latency: float, per_audio_second: float):
+    async def fake_request(audio: bytes) -> float:
+        duration = len(audio) * seconds_per_byte
+        await asyncio.sleep(base_latency + per_audio_second * duration)
+        return duration
+
+    async def fake_transcribe(audio: bytes, ext: str = "mp3", model: str = "nova-2"):
+        await fake_request(audio)
+        return "Speaker 0: ..."
+
+    async def fake_words(audio: bytes, ext: str = "mp3", model: str = "nova-2"):
+        duration = await fake_request(audio)
+        # Two speakers alternating every 5 seconds, one word every half second
+        return [
+            {"word": f"w{index}", "start": index * 0.5, "end": index * 0.5 + 0.4, "speaker": int(index * 0.5 // 5) % 2}
+            for index in range(int(duration * 2))
+        ]
+
+    get_transcribe.transcribe_audio_deepgram = fake_transcribe
+    long_audio.transcribe_words_deepgram = fake_words
+
+
+async def timed(call):
+    start = time.perf_counter()
+    result = await call()
+    return time.perf_counter() - start, result
+
+
+async def run(args):
+    import get_transcribe, long_audio
+    from audio_utils import probe_duration
+
+    files = sorted(glob.glob(os.path.join(ROOT, "*.mp3")))
+    print(f"{'file':<18} {'audio':>8} {'chunks':>6} {'single':>8} {'chunked':>8} {'speedup':>8}")
+    for path in files:
+        with open(path, "rb") as f:
+            audio = f.read()
+        duration = await probe_duration(audio)
+        if not args.live:
+            install_fakes(get_transcribe, long_audio, duration / len(audio), args.base_latency, args.seconds_per_audio_second)
+
+        single, _ = await timed(lambda: get_transcribe.transcribe_audio_deepgram(audio, "mp3"))
+        chunked, result = await timed(lambda: long_audio.transcribe_chunked(audio, "mp3"))
+        print(
+            f"{os.path.basename(path):<18} {duration:>7.1f}s {result['chunks']:>6} "
+            f"{single:>7.2f}s {chunked:>7.2f}s {single / chunked:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true", help="call Deepgram instead of the local stand-in")
+    parser.add_argument("--chunk-seconds", type=float, default=30)
+    parser.add_argument("--base-latency", type=float, default=0.6)
+    parser.add_argument("--seconds-per-audio-second", type=float, default=0.03)
+    args = parser.parse_args()
+
+    os.environ["LONG_AUDIO_CHUNK_SECONDS"] = str(args.chunk_seconds)
+    for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    asyncio.run(run(args))
@@ -0,0 +1,98 @@
+"""
+Concurrent /docs lookups against a local mongod: the old pattern (sync
+pymongo called from the event loop) versus the async data layer, both
+directly and through the ASGI app.
+
+Seeds a scratch database (MONGO_DB_NAME, default diallo_bench; names
+not starting with diallo_bench are refused) and drops it afterwards.
+
+    MONGODB_URI=mongodb://localhost:27017 python benchmarks/bench_mongo_docs.py --requests 2000 --concurrency 100
+"""
+import argparse, asyncio, os, random, statistics, sys, time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "diallo_bench")
+if not os.environ["MONGO_DB_NAME"].startswith("diallo_bench"):
+    # The database is dropped; never point this at a real one
+    sys.exit(f"MONGO_DB_NAME={os.environ['MONGO_DB_NAME']!r} does not start with diallo_bench, refusing to run")
+for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+    os.environ.setdefault(key, "benchmark")
+
+from bson import ObjectId
+from pymongo import MongoClient
+import httpx
+import main, mongo_utils
+
+TRANSCRIPT = "Speaker 0: जी बताइए sir, payment कब तक हो जाएगा?\n\n" * 80
+
+
+def seed(sync_db, calls: int):
+    sync_db.diallo.drop()
+    docs = [{
+        "agent_id": ObjectId(),
+        "agent_name": f"agent {i % 20}",
+        "patient_name": f"patient {i}",
+        "bucket": random.choice(["x_bucket", "y_bucket"]),
+        "agent_phone_number": "9999999999",
+        "analysis": {"Total_Score": i % 11, "Call_summary": "summary " * 40},
+        "transcribe": TRANSCRIPT,
+        "created_at": datetime.now()
+    } for i in range(calls)]
+    return [str(_id) for _id in sync_db.diallo.insert_many(docs).inserted_ids]
+
+
+def report(title: str, latencies: list, elapsed: float):
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{title:<34} {len(latencies) / elapsed:>8.0f} req/s  p50={statistics.median(latencies) * 1000:6.1f}ms  p95={p95 * 1000:6.1f}ms")
+
+
+async def run(label: str, lookup, ids: list, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            assert await lookup(random.choice(ids))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    report(label, latencies, time.perf_counter() - start)
+
+
+async def main_async(requests: int, concurrency: int, calls: int):
+    sync_client = MongoClient(os.environ["MONGODB_URI"], maxPoolSize=mongo_utils.MONGO_MAX_POOL_SIZE)
+    sync_db = sync_client[mongo_utils.MONGO_DB_NAME]
+    ids = seed(sync_db, calls)
+
+    async def sync_on_loop(doc_id: str):
+        # What the handlers used to do: a blocking pymongo call inside async def
+        return sync_db.diallo.find_one({"_id": ObjectId(doc_id)})
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def via_app(doc_id: str):
+            return (await client.get("/docs", params={"doc_id": doc_id})).json()["success"]
+
+        try:
+            print(f"{requests} lookups, concurrency {concurrency}, {calls} seeded calls")
+            await run("sync pymongo on event loop", sync_on_loop, ids, requests, concurrency)
+            await run("async get_data_by_id", mongo_utils.get_data_by_id, ids, requests, concurrency)
+            await run("async GET /docs (ASGI)", via_app, ids, requests, concurrency)
+        finally:
+            sync_client.drop_database(mongo_utils.MONGO_DB_NAME)
+            sync_client.close()
+            await mongo_utils.client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.requests, args.concurrency, args.calls))
@@ -0,0 +1,209 @@
+"""
+Offline end-to-end benchmark of POST /transcribe: the real upload handling,
+ffmpeg transcoding/normalization/long-audio splitting and orchestration run
+on the mp3 files in the repo root, with stub providers (benchmarks/stubs.py)
+and either a local mongod or an in-memory store.
+
+Reports per-stage timings, throughput and memory peaks, and writes the
+results to benchmarks/results/ so runs on different commits can be compared.
+The result caches are bypassed unless --use-caches is given (recorded in the
+result's config), so stage times measure provider work in both --mongo modes.
+
+    python benchmarks/bench_pipeline.py --uploads 40 --concurrency 8
+    python benchmarks/bench_pipeline.py --mongo memory --deepgram 0.8,0.3
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/pipeline-abc1234-20260101T120000.json
+"""
+import argparse, asyncio, glob, itertools, json, os, resource, subprocess, sys, time, tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except OSError:
+        return "unknown"
+
+
+async def mongo_reachable() -> bool:
+    import mongo_utils
+    try:
+        await mongo_utils.client.admin.command("ping")
+        return True
+    except Exception as e:
+        print(f"Local mongod not reachable ({type(e).__name__}); falling back to --mongo memory")
+        return False
+
+
+def instrument(timer):
+    """
+    Time each pipeline stage where the pipeline looks it up, so the real
+    functions still run underneath.
+    """
+    import pipeline
+    for stage, name in [
+        ("agent_lookup", "get_or_create_agent"),
+        ("transcode", "transcode"),
+        ("transcribe", "transcribe_routed"),
+        ("normalize", "normalize_audio"),
+        ("analyze", "analyze_cached"),
+        ("store", "update_data"),
+    ]:
+        setattr(pipeline, name, timer.wrap(stage, getattr(pipeline, name)))
+
+
+async def run(args):
+    import httpx
+    import main
+    from stubs import Latency, StageTimer, install_provider_stubs, install_memory_store, bypass_caches
+
+    files = sorted(glob.glob(os.path.join(ROOT, "*.mp3")))
+    samples = {os.path.basename(path): open(path, "rb").read() for path in files}
+
+    mongo = args.mongo
+    if mongo == "local" and not await mongo_reachable():
+        mongo = "memory"
+    if args.use_caches and mongo == "memory":
+        # The caches live in Mongo; the memory store always bypasses them
+        sys.exit("--use-caches needs a reachable local mongod")
+
+    timer = StageTimer()
+    install_provider_stubs({
+        "groq": Latency.parse(args.groq),
+        "openai": Latency.parse(args.openai),
+        "deepgram": Latency.parse(args.deepgram),
+        "analysis": Latency.parse(args.analysis),
+    }, timer)
+    if mongo == "memory":
+        install_memory_store(args.db_latency)
+    if not args.use_caches:
+        # Uploads cycle over a few files; without this most stages would time cache hits
+        bypass_caches()
+    instrument(timer)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    failures = 0
+
+    async def upload(client, name: str):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                "/transcribe",
+                params={"bucket": "x_bucket"},
+                files={"file": (name, samples[name], "audio/mpeg")},
+                data={"agent_name": f"bench {name}", "patient_name": "bench", "agent_phone_number": "0"},
+            )
+            timer.record("request", time.perf_counter() - start)
+            if not response.json().get("success"):
+                failures += 1
+
+    names = list(itertools.islice(itertools.cycle(samples), args.uploads))
+    if args.trace_memory:
+        tracemalloc.start()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(upload(client, name) for name in names))
+        elapsed = time.perf_counter() - start
+
+    python_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    if args.trace_memory:
+        tracemalloc.stop()
+    if mongo == "local":
+        import mongo_utils
+        await mongo_utils.client.drop_database(mongo_utils.MONGO_DB_NAME)
+
+    uploaded_bytes = sum(len(samples[name]) for name in names)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {**vars(args), "mongo": mongo, "files": list(samples)},
+        "throughput": {
+            "uploads": len(names),
+            "failures": failures,
+            "seconds": elapsed,
+            "calls_per_second": len(names) / elapsed,
+            "upload_mb_per_second": uploaded_bytes / elapsed / 1e6
+        },
+        "stages": timer.summary(),
+        "memory": {
+            "python_peak_mb": python_peak / 1e6 if python_peak is not None else None,
+            # ru_maxrss is KiB on Linux; children covers the ffmpeg processes
+            "process_max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "ffmpeg_max_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        }
+    }
+
+
+def print_report(result: dict, baseline: dict = None):
+    def delta(now, before):
+        if before in (None, 0) or now is None:
+            return ""
+        return f" ({(now - before) / before:+.0%})"
+
+    throughput = result["throughput"]
+    before = (baseline or {}).get("throughput", {})
+    print(f"commit {result['commit']}  mongo={result['config']['mongo']}  uploads={throughput['uploads']}  failures={throughput['failures']}")
+    print(f"throughput: {throughput['calls_per_second']:.2f} calls/s{delta(throughput['calls_per_second'], before.get('calls_per_second'))}, "
+          f"{throughput['upload_mb_per_second']:.2f} MB/s, {throughput['seconds']:.2f}s total")
+
+    print(f"{'stage':<26} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9}")
+    baseline_stages = (baseline or {}).get("stages", {})
+    for stage, stats in sorted(result["stages"].items()):
+        previous = baseline_stages.get(stage, {})
+        print(f"{stage:<26} {stats['count']:>6} {stats['mean'] * 1000:>7.1f}ms {stats['p50'] * 1000:>7.1f}ms "
+              f"{stats['p95'] * 1000:>7.1f}ms{delta(stats['p95'], previous.get('p95'))}")
+
+    memory = result["memory"]
+    before = (baseline or {}).get("memory", {})
+    for key, value in memory.items():
+        if value is not None:
+            print(f"{key}: {value:.1f}{delta(value, before.get(key))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--mongo", choices=["local", "memory"], default="local",
+                        help="local uses MONGODB_URI (default localhost) and a scratch database")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="per call, with --mongo memory")
+    parser.add_argument("--groq", default="0.8,0.2", help="base[,jitter[,per_audio_second[,failure_rate]]]")
+    parser.add_argument("--openai", default="1.5,0.3")
+    parser.add_argument("--deepgram", default="0.5,0.1")
+    parser.add_argument("--analysis", default="2.0,0.5")
+    parser.add_argument("--use-caches", action="store_true",
+                        help="let repeated files hit the transcript/analysis caches (needs --mongo local; off by default)")
+    parser.add_argument("--trace-memory", action="store_true", help="track the Python heap peak (slows the run)")
+    parser.add_argument("--output", help="result file (default benchmarks/results/pipeline-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017/?serverSelectionTimeoutMS=1000")
+    os.environ.setdefault("MONGO_DB_NAME", "diallo_bench")
+    if args.mongo == "local" and not os.environ["MONGO_DB_NAME"].startswith("diallo_bench"):
+        # The database is dropped afterwards; never point this at a real one
+        sys.exit(f"MONGO_DB_NAME={os.environ['MONGO_DB_NAME']!r} does not start with diallo_bench, refusing to run")
+    for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+
+    result = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{result['commit']}-{datetime.now():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"saved {os.path.relpath(output, ROOT)}")
@@ -0,0 +1,107 @@
+"""
+Exercise the transcription ProviderRouter against local fake providers
+that inject latency, jitter and failures. No network or API keys needed.
+
+    python benchmarks/bench_provider_router.py --calls 200
+"""
+import argparse, asyncio, os, random, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ROUTER_BACKOFF_SECONDS", "0.01")
+os.environ.setdefault("ROUTER_BREAKER_COOLDOWN", "1")
+os.environ.setdefault("ROUTER_HEDGE_DEFAULT_DELAY", "0.2")
+
+from provider_router import ProviderRouter
+
+
+def fake_provider(name: str, latency: float, jitter: float = 0.0, failure_rate: float = 0.0, slow_rate: float = 0.0):
+    """
+    Async stand-in for a transcribe function. `slow_rate` of calls take 10x
+    longer, which is what hedging is meant to cut off.
+    """
+    async def transcribe(audio: bytes, ext: str, audio_hash: str = None):
+        delay = latency + random.uniform(-jitter, jitter)
+        if random.random() < slow_rate:
+            delay *= 10
+        await asyncio.sleep(max(0.0, delay))
+        if random.random() < failure_rate:
+            raise RuntimeError(f"{name} injected failure")
+        return f"transcript from {name}"
+    return transcribe
+
+
+async def run_scenario(title: str, router: ProviderRouter, calls: int, concurrency: int, provider: str = None):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, served, failures = [], {}, 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                _, name = await router.call(b"audio", "mp3", provider=provider)
+                served[name] = served.get(name, 0) + 1
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else float("nan")
+    print(f"\n== {title}")
+    print(f"calls={calls} ok={len(latencies)} failed={failures} wall={elapsed:.2f}s p50={p(0.5):.3f}s p95={p(0.95):.3f}s p99={p(0.99):.3f}s")
+    print(f"served by: {served}")
+    for name, stats in router.snapshot().items():
+        print(f"  {name}: {stats}")
+
+
+async def main(calls: int, concurrency: int):
+    order = ["deepgram", "groq", "openai"]
+
+    await run_scenario("healthy primary", ProviderRouter({
+        "deepgram": fake_provider("deepgram", 0.05, 0.01),
+        "groq": fake_provider("groq", 0.03, 0.01),
+        "openai": fake_provider("openai", 0.08, 0.02),
+    }, order=order), calls, concurrency)
+
+    await run_scenario("primary outage (failover + circuit breaker)", ProviderRouter({
+        "deepgram": fake_provider("deepgram", 0.05, failure_rate=1.0),
+        "groq": fake_provider("groq", 0.03, 0.01),
+        "openai": fake_provider("openai", 0.08, 0.02),
+    }, order=order), calls, concurrency)
+
+    await run_scenario("flaky primary (30% errors, retries)", ProviderRouter({
+        "deepgram": fake_provider("deepgram", 0.05, 0.01, failure_rate=0.3),
+        "groq": fake_provider("groq", 0.03, 0.01),
+        "openai": fake_provider("openai", 0.08, 0.02),
+    }, order=order), calls, concurrency)
+
+    for hedge in (False, True):
+        await run_scenario(f"slow tail on primary, hedge={hedge}", ProviderRouter({
+            "deepgram": fake_provider("deepgram", 0.05, 0.01, slow_rate=0.1),
+            "groq": fake_provider("groq", 0.05, 0.01),
+            "openai": fake_provider("openai", 0.08, 0.02),
+        }, order=order, hedge=hedge), calls, concurrency)
+
+    await run_scenario("latency-aware routing", ProviderRouter({
+        "deepgram": fake_provider("deepgram", 0.12, 0.02),
+        "groq": fake_provider("groq", 0.03, 0.01),
+        "openai": fake_provider("openai", 0.08, 0.02),
+    }, order=order, strategy="latency"), calls, concurrency)
+
+    await run_scenario("pinned to openai", ProviderRouter({
+        "deepgram": fake_provider("deepgram", 0.05),
+        "groq": fake_provider("groq", 0.03),
+        "openai": fake_provider("openai", 0.08, 0.02),
+    }, order=order), calls, concurrency, provider="openai")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency))
@@ -0,0 +1,141 @@
+"""
+/search against a local mongod: text-index queries (English, Devanagari,
+mixed, phrases, with filters) versus the case-insensitive regex scan over
+every transcript they replace.
+
+Seeds a scratch database (MONGO_DB_NAME, default diallo_bench; names
+not starting with diallo_bench are refused) with Hinglish calls, some
+mentioning a settlement in either script or a fee with and without the
+nukta, half of them stored split. Checks that every query finds exactly
+the calls it should, including the spellings the index's diacritic
+folding conflates, and exits with status 1 if one does not; drops the
+database afterwards.
+
+    MONGODB_URI=mongodb://localhost:27017 python benchmarks/bench_search.py --calls 20000 --repeat 20
+"""
+import argparse, asyncio, os, random, statistics, sys, time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "diallo_bench")
+if not os.environ["MONGO_DB_NAME"].startswith("diallo_bench"):
+    # The database is dropped; never point this at a real one
+    sys.exit(f"MONGO_DB_NAME={os.environ['MONGO_DB_NAME']!r} does not start with diallo_bench, refusing to run")
+for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+    os.environ.setdefault(key, "benchmark")
+
+from bson import ObjectId
+import mongo_utils
+
+FILLER = "Speaker 0: जी बताइए sir, payment कब तक हो जाएगा?\n\nSpeaker 1: अगले हफ्ते तक कर दूंगा।\n\n" * 40
+MENTIONS = {
+    "latin": "Speaker 1: मुझे settlement का option चाहिए।\n\n",
+    "devanagari": "Speaker 1: क्या सेटलमेंट हो सकता है?\n\n",
+    "nukta": "Speaker 1: फ़ीस कितनी है?\n\n",
+    "plain": "Speaker 1: फीस कितनी है?\n\n",
+    "virama": "Speaker 1: पक्का कल तक कर दूंगा।\n\n",
+}
+# query, search filters, which seeded calls it should return
+QUERIES = [
+    ("settlement", {}, lambda call: call["mention"] == "latin"),
+    ("सेटलमेंट", {}, lambda call: call["mention"] == "devanagari"),
+    ("settlement सेटलमेंट", {}, lambda call: call["mention"] in ("latin", "devanagari")),
+    ("settlement", {"bucket": "y_bucket"}, lambda call: call["mention"] == "latin" and call["bucket"] == "y_bucket"),
+    ("dispute", {}, lambda call: call["dispute"]),
+    ('"payment dispute"', {}, lambda call: call["dispute"]),
+    # Diacritic folding drops the nukta and virama, so these spellings conflate
+    ("फ़ीस", {}, lambda call: call["mention"] in ("nukta", "plain")),
+    ("फीस", {}, lambda call: call["mention"] in ("nukta", "plain")),
+    ("पकका", {}, lambda call: call["mention"] == "virama"),
+]
+
+
+def seed_docs(calls: int):
+    docs, truth = [], []
+    now = datetime.now()
+    for i in range(calls):
+        mention = random.choices([None, *MENTIONS], weights=[84, 5, 5, 2, 2, 2])[0]
+        dispute = random.random() < 0.05
+        call = {
+            "_id": ObjectId(),
+            "agent_id": ObjectId(),
+            "agent_name": f"agent {i % 20}",
+            "patient_name": f"patient {i}",
+            "bucket": random.choice(["x_bucket", "y_bucket"]),
+            "agent_phone_number": "9999999999",
+            "analysis": {
+                "Total_Score": i % 11,
+                "Call_summary": "Customer asked about the payment date.",
+                "Unresolved_issues": ["Open payment dispute with the lender"] if dispute else []
+            },
+            "transcribe": FILLER + (MENTIONS[mention] if mention else ""),
+            "created_at": now - timedelta(minutes=i)
+        }
+        docs.append(call)
+        truth.append({"_id": str(call["_id"]), "mention": mention, "dispute": dispute, "bucket": call["bucket"]})
+    return docs, truth
+
+
+async def search_all(query: str, filters: dict):
+    ids, after = set(), None
+    while True:
+        docs = await mongo_utils.search_calls(query, limit=501, after=after, **filters)
+        ids.update(doc["_id"] for doc in docs[:500])
+        if len(docs) <= 500:
+            return ids
+        after = (docs[499]["score"], ObjectId(docs[499]["_id"]))
+
+
+async def regex_scan(word: str, filters: dict):
+    query = {"transcribe": {"$regex": word, "$options": "i"}, **mongo_utils.calls_filter(**filters)}
+    return {str(doc["_id"]) async for doc in mongo_utils.calls_collection.find(query, {"_id": 1})}
+
+
+def timed(samples: list) -> str:
+    samples.sort()
+    return f"p50 {statistics.median(samples) * 1000:7.1f}ms  p95 {samples[int(0.95 * (len(samples) - 1))] * 1000:7.1f}ms"
+
+
+async def run(args):
+    await mongo_utils.client.drop_database(mongo_utils.MONGO_DB_NAME)
+    docs, truth = seed_docs(args.calls)
+    half = len(docs) // 2
+    await mongo_utils.calls_collection.insert_many(docs[:half])
+    mongo_utils.CALL_STORAGE_MODE = "split"
+    await mongo_utils.insert_calls(docs[half:])
+    await mongo_utils.ensure_indexes()
+
+    failed = False
+    print(f"{args.calls} calls, half stored split")
+    for query, filters, expected in QUERIES:
+        want = {call["_id"] for call in truth if expected(call)}
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            found = await search_all(query, filters)
+            samples.append(time.perf_counter() - start)
+        status = "ok" if found == want else f"MISMATCH (expected {len(want)})"
+        failed |= found != want
+        label = f"{query} {filters or ''}"
+        print(f"search {label:<42} {len(found):>6} hits  {timed(samples)}  {status}")
+
+    samples = []
+    for _ in range(max(1, args.repeat // 5)):
+        start = time.perf_counter()
+        found = await regex_scan("settlement", {})
+        samples.append(time.perf_counter() - start)
+    print(f"regex  {'settlement':<42} {len(found):>6} hits  {timed(samples)}  (inline transcripts only)")
+
+    await mongo_utils.client.drop_database(mongo_utils.MONGO_DB_NAME)
+    await mongo_utils.client.close()
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    random.seed(0)
+    sys.exit(1 if asyncio.run(run(args)) else 0)
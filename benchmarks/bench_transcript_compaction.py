@@ -0,0 +1,104 @@
+"""
+Token savings of transcript compaction (transcript_compaction.py), and a
+regression check that it leaves the analysis scores alone.
+
+Offline, it reports tokens before/after compaction for the Deepgram sample
+transcript quoted in get_transcribe.py plus any *.txt transcripts in
+--transcripts. With --live it also transcribes the mp3 recordings in the
+repo root (saved to --transcripts so later runs reuse them), analyzes each
+transcript as-is and compacted --repeats times, and exits with status 1 if
+the mean Total_Score of any call moves by more than --tolerance.
+
+    python benchmarks/bench_transcript_compaction.py --budget 400 --collapse
+    python benchmarks/bench_transcript_compaction.py --live --repeats 3 --tolerance 1
+"""
+import argparse, asyncio, glob, os, statistics, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSCRIPTS_DIR = os.path.join(ROOT, "benchmarks", "results", "transcripts")
+sys.path.insert(0, ROOT)
+
+
+def embedded_sample() -> str:
+    """
+    The speaker-labelled transcript commented out at the end of get_transcribe.py.
+    """
+    with open(os.path.join(ROOT, "get_transcribe.py"), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    start = next(index for index, line in enumerate(lines) if line.startswith("# Speaker"))
+    return "\n".join(line[2:] for line in lines[start:] if line.startswith("#"))
+
+
+async def transcribe_samples(directory: str):
+    from pipeline import transcribe_routed
+    from audio_utils import transcode
+    os.makedirs(directory, exist_ok=True)
+    for path in sorted(glob.glob(os.path.join(ROOT, "*.mp3"))):
+        target = os.path.join(directory, os.path.basename(path)[:-4] + ".txt")
+        if os.path.exists(target):
+            continue
+        with open(path, "rb") as f:
+            audio = f.read()
+
+        async def open_chunks():
+            yield audio
+
+        data, ext = await transcode(open_chunks, "mp3")
+        transcript, provider = await transcribe_routed(data, ext)
+        print(f"transcribed {os.path.basename(path)} with {provider}")
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(transcript)
+
+
+async def scores(transcript: str, bucket: str, repeats: int) -> list:
+    from get_analysis import get_call_analysis
+    results = await asyncio.gather(*(get_call_analysis(transcribe=transcript, bucket=bucket) for _ in range(repeats)))
+    return [result["Total_Score"] for result in results]
+
+
+async def run(args) -> bool:
+    from transcript_compaction import compact_transcript
+
+    if args.live:
+        await transcribe_samples(args.transcripts)
+    samples = {"get_transcribe.py sample": embedded_sample()}
+    for path in sorted(glob.glob(os.path.join(args.transcripts, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            samples[os.path.basename(path)] = f.read()
+
+    stable = True
+    print(f"{'transcript':<28} {'before':>7} {'after':>7} {'saved':>6}" + (f" {'score':>7} {'compact':>7}" if args.live else ""))
+    for name, transcript in samples.items():
+        compacted, stats = compact_transcript(transcript, budget=args.budget, collapse=args.collapse)
+        saved = 1 - stats["tokens_after"] / stats["tokens_before"] if stats["tokens_before"] else 0
+        line = f"{name[:28]:<28} {stats['tokens_before']:>7} {stats['tokens_after']:>7} {saved:>6.0%}"
+        if args.live:
+            original = await scores(transcript, args.bucket, args.repeats)
+            compact = await scores(compacted, args.bucket, args.repeats)
+            drift = abs(statistics.mean(compact) - statistics.mean(original))
+            line += f" {statistics.mean(original):>7.2f} {statistics.mean(compact):>7.2f}"
+            if drift > args.tolerance:
+                stable = False
+                line += f"  DRIFT {drift:.2f}"
+        print(line)
+        if args.show:
+            print(compacted, end="\n\n")
+    return stable
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=int, help="token budget (default TRANSCRIPT_TOKEN_BUDGET)")
+    parser.add_argument("--collapse", action="store_true", help="also collapse repetitions and hold segments")
+    parser.add_argument("--transcripts", default=TRANSCRIPTS_DIR, help="directory of .txt transcripts")
+    parser.add_argument("--live", action="store_true", help="transcribe the mp3 files and compare Total_Score")
+    parser.add_argument("--bucket", default="x_bucket")
+    parser.add_argument("--repeats", type=int, default=3, help="analyses per transcript and variant, with --live")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed change in mean Total_Score")
+    parser.add_argument("--show", action="store_true", help="print each compacted transcript")
+    args = parser.parse_args()
+
+    if not args.live:
+        for key in ("GROQ_API_KEY", "OPENAI_API_KEY", "DEEPGRAM_API_KEY"):
+            os.environ.setdefault(key, "benchmark")
+    sys.exit(0 if asyncio.run(run(args)) else 1)
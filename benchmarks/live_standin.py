@@ -0,0 +1,84 @@
+"""
+Local stand-in for Deepgram's streaming API, for exercising /transcribe/live
+without credentials or network access.
+
+Audio is not decoded: every --bytes-per-second bytes received count as one
+second of audio. An interim result goes out every --interim-seconds of audio
+and a final one every --final-seconds, with made-up words alternating
+between two speakers every 5 seconds. CloseStream flushes the rest and
+closes the stream, like the real service.
+
+    python benchmarks/live_standin.py --port 8765
+    DEEPGRAM_LIVE_URL=ws://127.0.0.1:8765/v1/listen uvicorn main:app
+"""
+import argparse, asyncio, json
+import websockets
+
+
+def word(index: int) -> dict:
+    return {
+        "word": f"w{index}", "punctuated_word": f"w{index}",
+        "start": index * 0.5, "end": index * 0.5 + 0.4, "speaker": int(index // 10) % 2
+    }
+
+
+def results(start: float, end: float, is_final: bool) -> str:
+    words = [word(index) for index in range(int(start * 2), int(end * 2))]
+    return json.dumps({
+        "type": "Results",
+        "start": start,
+        "duration": end - start,
+        "is_final": is_final,
+        "channel": {"alternatives": [{"transcript": " ".join(item["punctuated_word"] for item in words), "words": words}]}
+    })
+
+
+def make_handler(bytes_per_second: float, interim_seconds: float = 1.0, final_seconds: float = 3.0, latency: float = 0.05):
+    async def handler(connection):
+        received = final_at = interim_at = 0.0
+        async for message in connection:
+            if isinstance(message, bytes):
+                received += len(message) / bytes_per_second
+                if received - final_at >= final_seconds:
+                    await asyncio.sleep(latency)
+                    await connection.send(results(final_at, received, True))
+                    final_at = interim_at = received
+                elif received - interim_at >= interim_seconds:
+                    await asyncio.sleep(latency)
+                    await connection.send(results(final_at, received, False))
+                    interim_at = received
+            elif json.loads(message).get("type") == "CloseStream":
+                await asyncio.sleep(latency)
+                if received > final_at:
+                    await connection.send(results(final_at, received, True))
+                await connection.send(json.dumps({"type": "Metadata", "duration": received}))
+                return
+    return handler
+
+
+async def serve(port: int = 0, **options):
+    """
+    Start the stand-in on 127.0.0.1; returns the server and its ws:// URL.
+    """
+    server = await websockets.serve(make_handler(**options), "127.0.0.1", port)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"ws://127.0.0.1:{port}/v1/listen"
+
+
+async def main(args):
+    server, url = await serve(
+        args.port, bytes_per_second=args.bytes_per_second, interim_seconds=args.interim_seconds,
+        final_seconds=args.final_seconds, latency=args.latency
+    )
+    print(f"Streaming stand-in listening on {url}")
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bytes-per-second", type=float, default=16000, help="audio bytes that make one second")
+    parser.add_argument("--interim-seconds", type=float, default=1.0)
+    parser.add_argument("--final-seconds", type=float, default=3.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before each result is sent")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,160 @@
+"""
+Local stand-ins for the transcription and analysis providers and for the
+Mongo data layer, so the pipeline can be benchmarked offline.
+
+Each provider stub sleeps for `Latency.base ± Latency.jitter` seconds, plus
+`Latency.per_audio_second` times the audio length when that is set, and
+fails with probability `failure_rate`.
+"""
+from dataclasses import dataclass
+import asyncio, random, time
+
+SCORE_FIELDS = [
+    "Greeting_&_Opening",
+    "Objection_Handling",
+    "Urgency_Creation",
+    "Payment_Process_Clarity",
+    "Empathy_&_Tonality",
+    "Call_Management_&_Closing"
+]
+
+
+@dataclass
+class Latency:
+    base: float = 0.5
+    jitter: float = 0.0
+    per_audio_second: float = 0.0
+    failure_rate: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str):
+        """
+        "base[,jitter[,per_audio_second[,failure_rate]]]", e.g. "0.8,0.2".
+        """
+        return cls(*(float(value) for value in spec.split(",")))
+
+    async def wait(self, audio: bytes = None):
+        delay = self.base + random.uniform(-self.jitter, self.jitter)
+        if self.per_audio_second and audio is not None:
+            from audio_utils import probe_duration
+            delay += self.per_audio_second * await probe_duration(audio)
+        await asyncio.sleep(max(0.0, delay))
+        if random.random() < self.failure_rate:
+            raise RuntimeError("stub provider injected failure")
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations per stage name.
+    """
+
+    def __init__(self):
+        self.samples = {}
+
+    def record(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage: str, function):
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self):
+        result = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[stage] = {
+                "count": len(ordered),
+                "mean": sum(ordered) / len(ordered),
+                "p50": ordered[len(ordered) // 2],
+                "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+                "total": sum(ordered)
+            }
+        return result
+
+
+def fake_words(seconds: float = 20.0) -> list:
+    # Two speakers alternating every 5 seconds, one word every half second
+    return [
+        {"word": f"w{index}", "punctuated_word": f"w{index}", "start": index * 0.5, "end": index * 0.5 + 0.4, "speaker": int(index // 10) % 2}
+        for index in range(int(seconds * 2))
+    ]
+
+
+def fake_analysis() -> dict:
+    scores = {field: random.randint(3, 10) for field in SCORE_FIELDS}
+    return {
+        "Sentiment_overall": random.choice(["positive", "neutral", "negative"]),
+        "Sentiment_by_speaker": {"Agent_sentiment": "positive", "Customer_sentiment": random.choice(["neutral", "negative"])},
+        "Follow_up_required": random.random() < 0.4,
+        "Payment_discussed": random.random() < 0.6,
+        "Summary": "stub analysis",
+        "Total_Score": round(sum(scores.values()) / len(scores)),
+        "Individual_Scores": scores
+    }
+
+
+def install_provider_stubs(latency: dict, timer: StageTimer = None):
+    """
+    Replace every transcription provider and the analysis call with stubs.
+    `latency` maps "groq", "openai", "deepgram" and "analysis" to a Latency.
+    """
+    import pipeline, long_audio
+
+    def stub_transcriber(name: str):
+        async def transcribe(audio: bytes, ext: str = "mp3", model: str = None):
+            await latency[name].wait(audio)
+            return f"Speaker 0: {name} stub transcript\n\nSpeaker 1: {len(audio)} bytes of .{ext}"
+        return timer.wrap(f"provider:{name}", transcribe) if timer else transcribe
+
+    async def stub_words(audio: bytes, ext: str = "mp3", model: str = None):
+        await latency["deepgram"].wait(audio)
+        return fake_words()
+
+    async def stub_analysis(transcribe: str, bucket: str):
+        await latency["analysis"].wait()
+        return fake_analysis()
+
+    for name in pipeline.TRANSCRIBE_FUNCTIONS:
+        pipeline.TRANSCRIBE_FUNCTIONS[name] = stub_transcriber(name)
+    # Long recordings are still split for real and their chunks reach stub_words
+    long_audio.transcribe_words_deepgram = timer.wrap("provider:deepgram_chunk", stub_words) if timer else stub_words
+    pipeline.get_call_analysis = timer.wrap("provider:analysis", stub_analysis) if timer else stub_analysis
+
+
+def install_memory_store(db_latency: float):
+    """
+    In-process replacement for the Mongo calls the request path makes, for
+    machines without a local mongod. The result caches are bypassed.
+    """
+    import pipeline
+
+    agents, calls = {}, []
+
+    async def get_or_create_agent(agent_name: str):
+        await asyncio.sleep(db_latency)
+        return agents.setdefault(agent_name.lower(), f"{len(agents):024x}")
+
+    async def update_data(**kwargs):
+        await asyncio.sleep(db_latency)
+        calls.append(kwargs)
+        return f"{len(calls):024x}"
+
+    pipeline.get_or_create_agent = get_or_create_agent
+    pipeline.update_data = update_data
+    bypass_caches()
+
+
+async def cache_miss(key: str):
+    return None
+
+
+def bypass_caches():
+    import pipeline
+    pipeline.transcript_cache.get_or_compute = lambda key, compute, meta=None: compute()
+    pipeline.transcript_cache.peek = cache_miss
+    pipeline.analysis_cache.get_or_compute = lambda key, compute, meta=None: compute()
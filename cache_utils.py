@@ -0,0 +1,113 @@
+from collections import OrderedDict
+import asyncio, hashlib, json
+
+
+def make_key(*parts) -> str:
+    """
+    Stable sha256 key over any JSON-serialisable parts (dict order ignored).
+    """
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Memoize an expensive async computation by key.
+
+    Lookups go through an optional in-process LRU, then a persistent store
+    (`load`/`save` are async functions). Concurrent misses for the same key
+    share a single computation.
+    """
+
+    def __init__(self, name: str, load, save, lru_size: int = 0):
+        self.name = name
+        self.load = load
+        self.save = save
+        self.lru_size = lru_size
+        self.lru = OrderedDict()
+        self.inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    def _remember(self, key: str, value):
+        if self.lru_size <= 0:
+            return
+        self.lru[key] = value
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    async def _resolve(self, key: str, compute, meta: dict):
+        value = await self.load(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            self._remember(key, value)
+            return value
+
+        self.stats["misses"] += 1
+        value = await compute()
+        if value:
+            self._remember(key, value)
+            await self.save(key, value, meta or {})
+        return value
+
+    async def peek(self, key: str):
+        """
+        The cached value for `key`, or None, without computing it.
+        """
+        if key in self.lru:
+            self.stats["hits"] += 1
+            self.lru.move_to_end(key)
+            return self.lru[key]
+        value = await self.load(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            self._remember(key, value)
+        return value
+
+    async def refresh(self, key: str, compute, meta: dict = None):
+        """
+        Compute `key` again, ignoring any cached value, and replace the
+        stored entry with the result.
+        """
+        self.stats["misses"] += 1
+        try:
+            value = await compute()
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        if value:
+            self._remember(key, value)
+            await self.save(key, value, meta or {})
+        return value
+
+    async def get_or_compute(self, key: str, compute, meta: dict = None):
+        if key in self.lru:
+            self.stats["hits"] += 1
+            self.lru.move_to_end(key)
+            return self.lru[key]
+
+        if key in self.inflight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self.inflight[key])
+
+        future = asyncio.ensure_future(self._resolve(key, compute, meta))
+        self.inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            if future.done():
+                self.inflight.pop(key, None)
+            else:
+                # The caller was cancelled; let the shared call finish for the others
+                future.add_done_callback(lambda done: self._forget(key, done))
+
+    def _forget(self, key: str, future):
+        self.inflight.pop(key, None)
+        if not future.cancelled() and future.exception():
+            self.stats["errors"] += 1
+
+    def snapshot(self):
+        return {**self.stats, "lru_entries": len(self.lru)}
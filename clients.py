@@ -0,0 +1,70 @@
+from dotenv import load_dotenv
+from functools import cache
+import os
+
+# Loaded once, before any module reads its settings from the environment
+load_dotenv()
+
+# One keep-alive pool shared by every provider client (see http_pool.PooledTransport)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "40"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "90"))
+# Used for hosts that offer it, when the h2 package is installed
+HTTP2 = os.getenv("HTTP2", "1") == "1"
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+# Read/write timeout per stage: transcription uploads whole recordings, analysis returns small JSON
+STAGE_TIMEOUTS = {
+    "transcribe": float(os.getenv("TRANSCRIBE_TIMEOUT_SECONDS", "300")),
+    "analysis": float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "120")),
+}
+
+
+@cache
+def http_pool():
+    from http_pool import PooledTransport
+    return PooledTransport(HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY, HTTP2)
+
+
+def stage_timeout(stage: str):
+    import httpx
+    return httpx.Timeout(STAGE_TIMEOUTS[stage], connect=HTTP_CONNECT_TIMEOUT)
+
+
+def _http_client():
+    import httpx
+    return httpx.AsyncClient(transport=http_pool(), timeout=stage_timeout("analysis"))
+
+
+async def close_http_pool():
+    if http_pool.cache_info().currsize:
+        await http_pool().close_pool()
+
+
+def http_stats():
+    """
+    Requests, new connections and TLS handshakes per provider host.
+    """
+    return http_pool().snapshot() if http_pool.cache_info().currsize else {}
+
+
+@cache
+def openai_client():
+    """
+    OpenAI client shared by Whisper transcription and call analysis. The SDK
+    is imported and the client built on first use, not at startup.
+    """
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=_http_client(), timeout=stage_timeout("analysis"))
+
+
+@cache
+def groq_client():
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=_http_client(), timeout=stage_timeout("transcribe"))
+
+
+@cache
+def deepgram_client():
+    # The SDK opens a client per request; pass `transport=http_pool()` so they all share the pool
+    from deepgram import DeepgramClient, DeepgramClientOptions
+    return DeepgramClient(config=DeepgramClientOptions(url=os.getenv("DEEPGRAM_HOST", "")))
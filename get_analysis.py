@@ -1,108 +1,126 @@
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+from clients import openai_client
+import asyncio
+import hashlib
 import json
 from prompt.call_analysis_prompt import x_bucket_prompt, y_bucket_prompt
-
-load_dotenv()
+from metrics import track_provider, record_tokens, KNOWN_BUCKETS
+from admission import provider_limit
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-openai_client = OpenAI(
-    api_key=OPENAI_API_KEY
-)
+# Max in-flight analysis requests from this process
+analysis_limit = provider_limit("openai_analysis", int(os.getenv("OPENAI_ANALYSIS_CONCURRENCY", "8")))
+
+ANALYSIS_MODEL = "gpt-4o-mini"
 
 bucket_prompt = {
     "x_bucket": x_bucket_prompt,
     "y_bucket": y_bucket_prompt
 }
+KNOWN_BUCKETS.update(bucket_prompt)
+
+
+ANALYSIS_TEXT_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "diallo_call_analysis",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "Call_summary": { "type": "string" },
+                "Call_purpose": { "type": "string" },
+                "Sentiment_overall": { "type": "string", "enum": ["positive", "neutral", "negative"] },
+                "Sentiment_by_speaker": {
+                "type": "object",
+                "properties": {
+                    "Agent_sentiment": { "type": "string", "enum": ["positive", "neutral", "negative"] },
+                    "Customer_sentiment": { "type": "string", "enum": ["positive", "neutral", "negative"] }
+                },
+                "required": ["Agent_sentiment", "Customer_sentiment"],
+                "additionalProperties": False
+                },
+                "Payment_discussed": { "type": "boolean" },
+                "Payment_amount": { "type": ["string", "null"] },
+                "Payment_options_discussed": { "type": "array", "items": { "type": "string" } },
+                "Follow_up_required": { "type": "boolean" },
+                "Follow_up_details": { "type": ["string", "null"] },
+                "Agent_performance": { "type": "string" },
+                "Unresolved_issues": { "type": "array", "items": { "type": "string" } },
+                "Summary": { "type": "string" },
+                "Total_Score": { "type": "integer", "minimum": 0, "maximum": 10 },
+                "Individual_Scores": {
+                "type": "object",
+                "properties": {
+                    "Greeting_&_Opening": { "type": "integer", "minimum": 0, "maximum": 10 },
+                    "Objection_Handling": { "type": "integer", "minimum": 0, "maximum": 10 },
+                    "Urgency_Creation": { "type": "integer", "minimum": 0, "maximum": 10 },
+                    "Payment_Process_Clarity": { "type": "integer", "minimum": 0, "maximum": 10 },
+                    "Empathy_&_Tonality": { "type": "integer", "minimum": 0, "maximum": 10 },
+                    "Call_Management_&_Closing": { "type": "integer", "minimum": 0, "maximum": 10 }
+                },
+                "required": [
+                    "Greeting_&_Opening",
+                    "Objection_Handling",
+                    "Urgency_Creation",
+                    "Payment_Process_Clarity",
+                    "Empathy_&_Tonality",
+                    "Call_Management_&_Closing"
+                ],
+                "additionalProperties": False
+                },
+                "Positives": { "type": "array", "items": { "type": "string" } },
+                "Improvements": { "type": "array", "items": { "type": "string" } }
+            },
+            "required": [
+                "Call_summary",
+                "Call_purpose",
+                "Sentiment_overall",
+                "Sentiment_by_speaker",
+                "Payment_discussed",
+                "Payment_amount",
+                "Payment_options_discussed",
+                "Follow_up_required",
+                "Follow_up_details",
+                "Agent_performance",
+                "Unresolved_issues",
+                "Summary",
+                "Total_Score",
+                "Individual_Scores",
+                "Positives",
+                "Improvements"
+            ],
+            "additionalProperties": False
+        } 
+    }
+}
+
+
+def analysis_prompt_hash(bucket: str) -> str:
+    """
+    Fingerprint of everything that shapes the analysis for a bucket besides
+    the transcript: the bucket prompt and the output schema.
+    """
+    raw = json.dumps([bucket_prompt[bucket], ANALYSIS_TEXT_FORMAT], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
-def get_call_analysis(transcribe: str, bucket: str):
-    model = "gpt-4o-mini"
+async def get_call_analysis(transcribe: str, bucket: str):
+    model = ANALYSIS_MODEL
     instructions = bucket_prompt[bucket]
 
     try:
-        response = openai_client.responses.create(
-            model=model,
-            instructions=instructions,
-            input=transcribe,
-            text={
-                "format": {
-                    "type": "json_schema",
-                    "name": "diallo_call_analysis",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "Call_summary": { "type": "string" },
-                            "Call_purpose": { "type": "string" },
-                            "Sentiment_overall": { "type": "string", "enum": ["positive", "neutral", "negative"] },
-                            "Sentiment_by_speaker": {
-                            "type": "object",
-                            "properties": {
-                                "Agent_sentiment": { "type": "string", "enum": ["positive", "neutral", "negative"] },
-                                "Customer_sentiment": { "type": "string", "enum": ["positive", "neutral", "negative"] }
-                            },
-                            "required": ["Agent_sentiment", "Customer_sentiment"],
-                            "additionalProperties": False
-                            },
-                            "Payment_discussed": { "type": "boolean" },
-                            "Payment_amount": { "type": ["string", "null"] },
-                            "Payment_options_discussed": { "type": "array", "items": { "type": "string" } },
-                            "Follow_up_required": { "type": "boolean" },
-                            "Follow_up_details": { "type": ["string", "null"] },
-                            "Agent_performance": { "type": "string" },
-                            "Unresolved_issues": { "type": "array", "items": { "type": "string" } },
-                            "Summary": { "type": "string" },
-                            "Total_Score": { "type": "integer", "minimum": 0, "maximum": 10 },
-                            "Individual_Scores": {
-                            "type": "object",
-                            "properties": {
-                                "Greeting_&_Opening": { "type": "integer", "minimum": 0, "maximum": 10 },
-                                "Objection_Handling": { "type": "integer", "minimum": 0, "maximum": 10 },
-                                "Urgency_Creation": { "type": "integer", "minimum": 0, "maximum": 10 },
-                                "Payment_Process_Clarity": { "type": "integer", "minimum": 0, "maximum": 10 },
-                                "Empathy_&_Tonality": { "type": "integer", "minimum": 0, "maximum": 10 },
-                                "Call_Management_&_Closing": { "type": "integer", "minimum": 0, "maximum": 10 }
-                            },
-                            "required": [
-                                "Greeting_&_Opening",
-                                "Objection_Handling",
-                                "Urgency_Creation",
-                                "Payment_Process_Clarity",
-                                "Empathy_&_Tonality",
-                                "Call_Management_&_Closing"
-                            ],
-                            "additionalProperties": False
-                            },
-                            "Positives": { "type": "array", "items": { "type": "string" } },
-                            "Improvements": { "type": "array", "items": { "type": "string" } }
-                        },
-                        "required": [
-                            "Call_summary",
-                            "Call_purpose",
-                            "Sentiment_overall",
-                            "Sentiment_by_speaker",
-                            "Payment_discussed",
-                            "Payment_amount",
-                            "Payment_options_discussed",
-                            "Follow_up_required",
-                            "Follow_up_details",
-                            "Agent_performance",
-                            "Unresolved_issues",
-                            "Summary",
-                            "Total_Score",
-                            "Individual_Scores",
-                            "Positives",
-                            "Improvements"
-                        ],
-                        "additionalProperties": False
-                    } 
-                }
-            }
-        )
-
-        print(response)
+        async with analysis_limit:
+            with track_provider("openai_analysis"):
+                response = await openai_client().responses.create(
+                    model=model,
+                    instructions=instructions,
+                    input=transcribe,
+                    text=ANALYSIS_TEXT_FORMAT
+                )
+
+        if response.usage:
+            record_tokens(model, response.usage.input_tokens, response.usage.output_tokens)
         return json.loads(response.output[0].content[0].text)
     except Exception as e:
         print(f"Analysis Error: {e}")
@@ -110,7 +128,7 @@ def get_call_analysis(transcribe: str, bucket: str):
 
 
 if __name__ == "__main__":
-    response = get_call_analysis(transcribe="""Speaker 0: Hello
+    response = asyncio.run(get_call_analysis(transcribe="""Speaker 0: Hello
 
 Speaker 1: hello
 
@@ -148,5 +166,5 @@ Speaker 1: आप WhatsApp share कर दो, मैं उसको call क
 
 Speaker 0: sir? बिल्कुल sir, हमने आपको WhatsApp पर share कर दिया है.
 
-Speaker 1: ठीक है.""")
+Speaker 1: ठीक है."""))
     print(json.dumps(response, indent=2))
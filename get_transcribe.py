@@ -1,84 +1,114 @@
-from groq import Groq
-from openai import OpenAI
+from clients import groq_client, openai_client, deepgram_client, http_pool, stage_timeout
+from metrics import track_provider
+from admission import provider_limit
+import asyncio
 import os
 
-from deepgram import (
-    DeepgramClient,
-    PrerecordedOptions,
-    FileSource,
-)
-
-from dotenv import load_dotenv
-load_dotenv()
-
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 
-groq_client = Groq(api_key=GROQ_API_KEY)
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-deepgram = DeepgramClient()
-
-def transcribe_audio(file_path: str, model: str = "whisper-large-v3-turbo") -> str:
+# Max in-flight requests per provider from this process
+provider_limits = {
+    "groq": provider_limit("groq", int(os.getenv("GROQ_CONCURRENCY", "8"))),
+    "openai": provider_limit("openai", int(os.getenv("OPENAI_TRANSCRIBE_CONCURRENCY", "8"))),
+    "deepgram": provider_limit("deepgram", int(os.getenv("DEEPGRAM_CONCURRENCY", "16"))),
+}
+
+GROQ_MODEL = "whisper-large-v3-turbo"
+OPENAI_TRANSCRIBE_MODEL = "whisper-1"
+DEEPGRAM_MODEL = "nova-2"
+DEEPGRAM_OPTIONS = {
+    "language": "hi",
+    "smart_format": True,
+    "punctuate": True,
+    "paragraphs": True,
+    "utterances": True,
+    "diarize": True,
+}
+
+def _read_file(file_path: str) -> bytes:
+    with open(file_path, "rb") as file:
+        return file.read()
+
+async def transcribe_audio(audio: bytes, ext: str = "mp3", model: str = GROQ_MODEL) -> str:
     try:
-        with open(file_path, "rb") as file:
-            transcription = groq_client.audio.transcriptions.create(
-                file=(file_path, file.read()),
-                model=model,
-                language="",
-                prompt="",
-                response_format="verbose_json",
-            )
-            return transcription.text
+        async with provider_limits["groq"]:
+            with track_provider("groq"):
+                transcription = await groq_client().audio.transcriptions.create(
+                    file=(f"audio.{ext}", audio),
+                    model=model,
+                    language="",
+                    prompt="",
+                    response_format="verbose_json",
+                )
+        return transcription.text
     except Exception as e:
         print(f"Transcription Error: {e}")
         raise e
     
-def transcribe_audio_openai(file_path: str, model: str = "whisper-1"):
+async def transcribe_audio_openai(audio: bytes, ext: str = "mp3", model: str = OPENAI_TRANSCRIBE_MODEL):
     try:
-        with open(file_path, "rb") as file:
-            transcription = openai_client.audio.transcriptions.create(
-                file=(file_path, file.read()),
-                model=model
-            )
-            return transcription.text
+        async with provider_limits["openai"]:
+            with track_provider("openai"):
+                transcription = await openai_client().audio.transcriptions.create(
+                    file=(f"audio.{ext}", audio),
+                    model=model,
+                    timeout=stage_timeout("transcribe")
+                )
+        return transcription.text
     except Exception as e:
         print(f"Transcription Error: {e}")
         raise e
     
-def transcribe_audio_deepgram(file_path: str, model: str = "nova-2"):
+async def _deepgram_alternative(audio: bytes, model: str) -> dict:
+    from deepgram import PrerecordedOptions
     options = PrerecordedOptions(
             model=model,
-            language="hi",
-            smart_format=True,
-            punctuate=True,
-            paragraphs=True,
-            utterances=True,
-            diarize=True,
+            **DEEPGRAM_OPTIONS,
     )
-    try:
-        with open(file_path, "rb") as file:
-            payload: FileSource = {
-                "buffer": file.read()
-            }
-            response = deepgram.listen.rest.v("1").transcribe_file(
+    payload = {
+        "buffer": audio
+    }
+    async with provider_limits["deepgram"]:
+        with track_provider("deepgram"):
+            response = await deepgram_client().listen.asyncrest.v("1").transcribe_file(
                 payload,
                 options,
+                timeout=stage_timeout("transcribe"),
+                transport=http_pool()
             )
-            return response["results"]["channels"][0]["alternatives"][0]["paragraphs"]["transcript"]
+    return response["results"]["channels"][0]["alternatives"][0]
+
+async def transcribe_audio_deepgram(audio: bytes, ext: str = "mp3", model: str = DEEPGRAM_MODEL):
+    try:
+        alternative = await _deepgram_alternative(audio, model)
+        return alternative["paragraphs"]["transcript"]
+    except Exception as e:
+        print(f"Transcription Error: {e}")
+        raise e
+
+async def transcribe_words_deepgram(audio: bytes, ext: str = "mp3", model: str = DEEPGRAM_MODEL) -> list:
+    """
+    Word-level Deepgram result: dicts with `word`, `punctuated_word`,
+    `start`, `end` (seconds) and `speaker`.
+    """
+    try:
+        alternative = await _deepgram_alternative(audio, model)
+        return alternative["words"]
     except Exception as e:
         print(f"Transcription Error: {e}")
         raise e
 
 if __name__ == "__main__":  
     # print(
-    #     transcribe_audio("apex2.mp3")
+    #     asyncio.run(transcribe_audio(_read_file("apex2.mp3")))
     # )
     print("\Deephram")
     print(
-        transcribe_audio_deepgram(
-            "apex2.mp3"
-        )
+        asyncio.run(transcribe_audio_deepgram(
+            _read_file("apex2.mp3")
+        ))
     )
 
 # नमस्कार एपेक्स ओस्पिटल्स. हलो. जी बताईए सर. हलो. आवाज आ रही है सर आपको मेरी? एपेक्स ओस्पिटल्स बोल रहे हो क्या? जी सर बताईए. हाँ जी वो ऐसे करें. वो क्या मतलब? वो क्या मतलब? आज लग जाएगी न? सर चीज़ की 30 तारीक डेट थी. आप थोड़ा एक्स्प्लेइन कर पाएंगे? क्या जानकारी आप लेना चाहें? वो क्या मतलब? वो क्या मतलब? जी. 30 तारीक थी. कल की. कल बारिश आने वाली है. बारिश आने वाली है. अब आज लग जाएगी न? सर इसके लिए आप एक बार लाइन से बने रहे हैं. हम चेक कर लेते हैं. तो लाइन से बने रहने के लिए धन्यवाद सर. हाँ जी. जी इसके लिए सर जो डॉक्टर के कोडिनेट हैं, उनको कि इनके नंबर आपको शेयर कर दिये गए हैं. आप एक बार आने से पहले इनके बात कर लीजियेगा. तो यह आपकी नौ बज़े के बात में भी आप इनको कॉल कर सकते हैं. सर जेस्ट करेंगे. नौ बज़े बाद हो गया है? जी सर आप इनको एक बार कॉल कर लीजियेगा या आपको जानकारी प्लप्स करवा देंगे. नंबर नहीं है सर. जी सर यह जो टीट्वेंट आप ले रहे हैं, एटेक्स ओस्पिटिल्स में किस ब्रांच से ले रहे हैं? यह मानसरोर में. मानसरोर ब्रांच. डॉक्टर के जो कोडिनेट हैं, इनके नंबर हम आपको वर्टसब पर शेयर कर देते हैं. आप एक बार इनके बात कर लीजियेगा, या आपको जानकारी प्लप्स करवा देंगे. हां जी, एक बार. जी सर, आप एक बार इनको कॉल कर लीजियेगा, नौ बज़े के एपरोप्स कॉल कर लीजियेगा. सर मैं भी इसका मैं आपकी बात नहीं हो पाएगी, तो आप एक बार इनसे बात कर लीजियेगा. हां जी, एक बार नौ बज़े तक तो हमारे वहाँ बुलाते हैं, फिर लेके जाएंगे आने में, तो उनको लेके दो ढ़ायेंगे जाएंगे. जी सर, सज़ेस्ट करेंगे सर, सि                                                                                                                                                                                        िंगल कॉल अबी आप कर सकते हैं, अगर कॉल रिसीव हो जाता है, तो किनकि डॉक्टर के जब ओपीडी रहती है, मोस्तली डॉक्टर के जो कोडिनेट रहते हैं, उसी समय अवेलेबल हो पाते हैं. बाकि आप एक बार कॉल कर लीजियेगा, अगर नौ तक आप विजिट करना चाहें, तो नंबर                       र आपको वेटसेब पर बेज़ दिये गए हैं. जी, नाम जान सकते हैं सर, पेशेंट का? चिकन वाले. जी, क्या कोई और जानकारी आप इसके लावा लेना चाहें? नहीं, नहीं, बस मुझे वो आज लग जाएगा, वो आज लग जाएगा. कल के लिए, 30 तारीक के लिए फोन आए था वहां से? ज                          जी सर. आज आजाएगी, मैं लेकर दूँगा. आज एक बार जो नंबर आपको भेजे गए हैं, आप इस नंबर पर कॉल कर लीजियेगा. ठीक है. धन्यवाद सर एपेक्स ओस्पिल्स सुनने के लिए, आपका दिन शुब है.
@@ -0,0 +1,63 @@
+from metrics import HTTP_CLIENT_REQUESTS, HTTP_CLIENT_CONNECTIONS
+import importlib.util
+import httpx
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """
+    One connection pool for every provider client in the process. Clients
+    that close their transport leave the pool open; `close_pool` shuts it.
+
+    New TCP connections and TLS handshakes are counted per host from
+    httpcore's trace events, so reuse can be read off `snapshot()`.
+    """
+
+    def __init__(self, max_connections: int, max_keepalive: int, keepalive_expiry: float, http2: bool):
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.pool = httpx.AsyncHTTPTransport(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        self.stats = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        stats = self.stats.setdefault(host, {"requests": 0, "connections_opened": 0, "tls_handshakes": 0, "http2_responses": 0})
+        stats["requests"] += 1
+        HTTP_CLIENT_REQUESTS.labels(host).inc()
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event: str, info: dict):
+            if event == "connection.connect_tcp.complete":
+                stats["connections_opened"] += 1
+                HTTP_CLIENT_CONNECTIONS.labels(host).inc()
+            elif event == "connection.start_tls.complete":
+                stats["tls_handshakes"] += 1
+            if outer_trace:
+                await outer_trace(event, info)
+
+        request.extensions["trace"] = trace
+        response = await self.pool.handle_async_request(request)
+        if response.extensions.get("http_version") == b"HTTP/2":
+            stats["http2_responses"] += 1
+        return response
+
+    async def aclose(self):
+        # Provider SDKs close their clients freely; the pool outlives them
+        pass
+
+    async def close_pool(self):
+        await self.pool.aclose()
+
+    def snapshot(self):
+        return {
+            host: {
+                **stats,
+                "reused_ratio": round(1 - stats["connections_opened"] / stats["requests"], 4) if stats["requests"] else None
+            }
+            for host, stats in self.stats.items()
+        }
@@ -0,0 +1,151 @@
+from pipeline import process_call
+from audio_utils import bytes_chunks, InvalidAudio
+from admission import admission, AdmissionRejected
+from mongo_utils import (
+    create_job, update_job, claim_job, load_job_audio, delete_job_audio, requeue_stale_jobs, queued_job_ids
+)
+import asyncio, os
+
+# Number of jobs processed concurrently by this process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# New jobs waiting beyond this are rejected with a 429 instead of piling up in memory
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+# A running job not updated for this long is assumed to belong to a dead worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "180"))
+# Running jobs refresh updated_at this often; keep it well under the lease
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+# How often every process looks for jobs whose lease expired
+JOB_SWEEP_SECONDS = float(os.getenv("JOB_SWEEP_SECONDS", "60"))
+# Wait before retrying a job that could not be claimed because storage failed
+JOB_CLAIM_RETRY_SECONDS = float(os.getenv("JOB_CLAIM_RETRY_SECONDS", "5"))
+
+job_queue: asyncio.Queue = None
+_workers = []
+_retries = set()
+# Queue places held by submissions still storing their audio
+_reserved = 0
+
+
+async def _requeue(job_id: str):
+    await asyncio.sleep(JOB_CLAIM_RETRY_SECONDS)
+    job_queue.put_nowait(job_id)
+
+
+async def _heartbeat(job_id: str):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        await update_job(job_id)
+
+
+async def run_job(job_id: str):
+    """
+    Process one persisted job end to end.
+    """
+    try:
+        job = await claim_job(job_id)
+    except Exception as e:
+        # Still queued in Mongo; try again once storage is back
+        print(f"[Job Error] {job_id}: could not claim, retrying: {e}")
+        task = asyncio.create_task(_requeue(job_id))
+        _retries.add(task)
+        task.add_done_callback(_retries.discard)
+        return
+    if not job:
+        return
+
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        await _run_claimed(job_id, job)
+    finally:
+        heartbeat.cancel()
+
+
+async def _run_claimed(job_id: str, job: dict):
+    audio = await load_job_audio(job["audio_id"])
+    if audio is None:
+        await update_job(job_id, status="failed", error="Job audio is missing.")
+        return
+
+    metadata = job["metadata"]
+    try:
+        async with admission.slot(metadata["bucket"], reject=False):
+            result = await process_call(
+                open_chunks=lambda: bytes_chunks(audio),
+                ext=job["ext"],
+                bucket=metadata["bucket"],
+                agent_name=metadata["agent_name"],
+                patient_name=metadata["patient_name"],
+                agent_phone_number=metadata["agent_phone_number"],
+                provider=metadata.get("provider"),
+                on_stage=lambda stage: update_job(job_id, status=stage)
+            )
+    except InvalidAudio as e:
+        result = {"success": False, "response": str(e)}
+
+    if result["success"]:
+        await update_job(job_id, status="completed", result={"id": result["response"], "analysis": result["analysis"]})
+    else:
+        await update_job(job_id, status="failed", error=result["response"])
+    await delete_job_audio(job_id, job["audio_id"])
+
+
+async def _worker():
+    while True:
+        job_id = await job_queue.get()
+        try:
+            await run_job(job_id)
+        except Exception as e:
+            print(f"[Job Error] {job_id}: {e}")
+            await update_job(job_id, status="failed", error=str(e))
+        finally:
+            job_queue.task_done()
+
+
+async def _resume_jobs():
+    await requeue_stale_jobs(JOB_LEASE_SECONDS)
+    for job_id in await queued_job_ids():
+        job_queue.put_nowait(job_id)
+    # Pick up jobs left behind by a worker that died after this process started
+    while True:
+        await asyncio.sleep(JOB_SWEEP_SECONDS)
+        for job_id in await requeue_stale_jobs(JOB_LEASE_SECONDS):
+            print(f"[Job] {job_id}: lease expired, requeued")
+            job_queue.put_nowait(job_id)
+
+
+async def start_workers():
+    global job_queue
+    # Bounded in submit_job; resumed and retried jobs are already stored and always fit
+    job_queue = asyncio.Queue()
+    for _ in range(JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+    _workers.append(asyncio.create_task(_resume_jobs()))
+
+
+async def stop_workers():
+    tasks = _workers + list(_retries)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _workers.clear()
+
+
+async def submit_job(audio: bytes, ext: str, metadata: dict):
+    """
+    Persist a job and hand it to the worker pool.
+    Returns the job id, or None when storage failed. Raises
+    AdmissionRejected when the queue is full.
+    """
+    global _reserved
+    if job_queue is None or job_queue.qsize() + _reserved >= JOB_QUEUE_SIZE:
+        raise AdmissionRejected("Job queue is full, try again later.", admission.retry_after())
+
+    # Hold the place while the audio is stored so concurrent submissions cannot overshoot
+    _reserved += 1
+    try:
+        job_id = await create_job(audio, ext, metadata)
+    finally:
+        _reserved -= 1
+    if job_id:
+        job_queue.put_nowait(job_id)
+    return job_id
@@ -0,0 +1,230 @@
+from get_transcribe import DEEPGRAM_API_KEY, DEEPGRAM_MODEL, DEEPGRAM_OPTIONS
+from get_analysis import bucket_prompt
+from long_audio import render_paragraphs
+from pipeline import analyze_cached, analysis_metadata
+from mongo_utils import update_data, get_or_create_agent
+from metrics import track_call, stage, LIVE_SESSIONS
+from admission import admission
+from urllib.parse import urlencode
+import asyncio, json, os
+import websockets
+
+# Deepgram streaming endpoint; point it at benchmarks/live_standin.py to test locally
+DEEPGRAM_LIVE_URL = os.getenv("DEEPGRAM_LIVE_URL", "wss://api.deepgram.com/v1/listen")
+# Live calls handled at once by this process; more are refused with close code 1013
+LIVE_MAX_SESSIONS = int(os.getenv("LIVE_MAX_SESSIONS", "200"))
+# Audio frames buffered per call; when full we stop reading from the client
+LIVE_FRAME_BUFFER = int(os.getenv("LIVE_FRAME_BUFFER", "64"))
+# Deepgram drops a stream after ~10 s without audio
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "5"))
+# Wait for the last results after the call ends
+LIVE_FINALIZE_SECONDS = float(os.getenv("LIVE_FINALIZE_SECONDS", "10"))
+
+# Options the streaming API shares with prerecorded requests (no paragraphs/utterances)
+LIVE_OPTIONS = {
+    "model": DEEPGRAM_MODEL,
+    **{key: value for key, value in DEEPGRAM_OPTIONS.items() if key not in ("paragraphs", "utterances")},
+    "interim_results": True
+}
+
+live_sessions = asyncio.Semaphore(LIVE_MAX_SESSIONS)
+
+
+def _query(options: dict) -> str:
+    return urlencode({key: str(value).lower() if isinstance(value, bool) else value for key, value in options.items()})
+
+
+class LiveSession:
+    """
+    Relay one call's audio frames to the streaming API and hand transcript
+    segments to `send` as they arrive. Final words are kept for the stored
+    transcript.
+    """
+
+    def __init__(self, send, audio_format: dict = None):
+        self.send = send
+        self.options = {**LIVE_OPTIONS, **{key: value for key, value in (audio_format or {}).items() if value}}
+        self.frames = asyncio.Queue(LIVE_FRAME_BUFFER)
+        self.words = []
+
+    async def push(self, frame: bytes):
+        # Waits while the buffer is full, which stops reads from the client socket
+        await self.frames.put(frame)
+
+    async def end(self):
+        await self.frames.put(None)
+
+    async def run(self) -> str:
+        """
+        Stream until the call ends and the upstream has flushed its last
+        results. Returns the transcript in the "Speaker N: ..." format. If
+        the upstream fails after words came back, the client is sent an
+        `interrupted` message and the transcript so far is returned.
+        """
+        try:
+            async with websockets.connect(
+                f"{DEEPGRAM_LIVE_URL}?{_query(self.options)}",
+                additional_headers={"Authorization": f"Token {DEEPGRAM_API_KEY}"}
+            ) as upstream:
+                relay = asyncio.create_task(self._relay(upstream))
+                try:
+                    async for message in upstream:
+                        await self._on_message(message)
+                    await relay
+                finally:
+                    relay.cancel()
+        except Exception as e:
+            if not self.words:
+                raise
+            print(f"[Live] Upstream failed, keeping {len(self.words)} words: {e}")
+            await self.send({"type": "interrupted", "response": f"Transcription stopped early: {e}"})
+        return self.transcript()
+
+    async def _relay(self, upstream):
+        while True:
+            try:
+                frame = await asyncio.wait_for(self.frames.get(), LIVE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                await upstream.send(json.dumps({"type": "KeepAlive"}))
+                continue
+            if frame is None:
+                await upstream.send(json.dumps({"type": "CloseStream"}))
+                return
+            await upstream.send(frame)
+
+    async def _on_message(self, message):
+        result = json.loads(message)
+        if result.get("type") != "Results":
+            return
+        alternative = result["channel"]["alternatives"][0]
+        if not alternative.get("transcript"):
+            return
+        words = alternative.get("words", [])
+        if result.get("is_final"):
+            self.words.extend({**word, "speaker": word.get("speaker", 0)} for word in words)
+        await self.send({
+            "type": "segment",
+            "is_final": bool(result.get("is_final")),
+            "speaker": words[0].get("speaker", 0) if words else None,
+            "start": result.get("start"),
+            "end": result.get("start", 0) + result.get("duration", 0),
+            "text": alternative["transcript"]
+        })
+
+    def transcript(self) -> str:
+        return "\n\n".join(f"Speaker {paragraph['speaker']}: {paragraph['text']}" for paragraph in render_paragraphs(self.words))
+
+
+async def finish(session: LiveSession, streaming: asyncio.Task) -> str:
+    """
+    End the stream and wait for the last results; if they do not come within
+    LIVE_FINALIZE_SECONDS, keep the words received so far.
+    """
+    async def flush():
+        await session.end()
+        return await streaming
+
+    try:
+        return await asyncio.wait_for(flush(), LIVE_FINALIZE_SECONDS)
+    except asyncio.TimeoutError:
+        print("[Live] Timed out waiting for final results")
+        return session.transcript()
+
+
+async def run_live_call(websocket, bucket: str, agent_name: str, patient_name: str, agent_phone_number: str, audio_format: dict = None):
+    """
+    Serve one /transcribe/live connection: binary messages are audio frames,
+    `{"type": "stop"}` (or a disconnect) ends the call. Segments are pushed
+    back while the call runs; afterwards the transcript is analyzed and
+    stored, and `analysis` and `stored` messages are sent before closing.
+    If transcription fails mid-call, an `interrupted` message is sent and
+    the words received until then are analyzed and stored the same way.
+    """
+    await websocket.accept()
+    if bucket not in bucket_prompt:
+        await websocket.close(code=1008, reason=f"Unknown bucket: {bucket}")
+        return
+    if live_sessions.locked():
+        await websocket.close(code=1013, reason="Too many live calls, try again later.")
+        return
+
+    connected = True
+
+    async def send(message: dict):
+        nonlocal connected
+        if not connected:
+            return
+        try:
+            await websocket.send_json(message)
+        except Exception:
+            connected = False
+
+    async def read_client(session: LiveSession):
+        nonlocal connected
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                return
+            if message.get("bytes"):
+                await session.push(message["bytes"])
+            elif message.get("text"):
+                try:
+                    if json.loads(message["text"]).get("type") == "stop":
+                        return
+                except ValueError:
+                    continue
+
+    async with live_sessions:
+        LIVE_SESSIONS.inc()
+        with track_call(bucket) as call:
+            call["status"] = "failed"
+            try:
+                with stage("agent_lookup"):
+                    agent_id = await get_or_create_agent(agent_name=agent_name)
+
+                session = LiveSession(send, audio_format)
+                streaming = asyncio.create_task(session.run())
+                reading = asyncio.create_task(read_client(session))
+                with stage("live_transcribe"):
+                    await asyncio.wait({streaming, reading}, return_when=asyncio.FIRST_COMPLETED)
+                    if reading.done():
+                        transcription = await finish(session, streaming)
+                    else:
+                        # The upstream closed or failed mid-call
+                        reading.cancel()
+                        transcription = await streaming
+
+                analysis = None
+                if transcription:
+                    with stage("analyze"):
+                        async with admission.slot(bucket, reject=False):
+                            analysis = await analyze_cached(transcription, bucket)
+                if not analysis:
+                    await send({"type": "error", "response": "Error Processing Data."})
+                    return
+                await send({"type": "analysis", "analysis": analysis})
+
+                with stage("store"):
+                    id = await update_data(
+                        agent_name=agent_name,
+                        agent_id=agent_id,
+                        bucket=bucket,
+                        patient_name=patient_name,
+                        agent_phone_number=agent_phone_number,
+                        analystics=analysis,
+                        transcribe=transcription,
+                        **analysis_metadata(bucket)
+                    )
+                await send({"type": "stored", "id": id})
+                call["status"] = "ok"
+            except Exception as e:
+                call["status"] = "error"
+                await send({"type": "error", "response": str(e)})
+            finally:
+                LIVE_SESSIONS.dec()
+                if connected:
+                    try:
+                        await websocket.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,176 @@
+from get_transcribe import transcribe_words_deepgram, DEEPGRAM_MODEL
+from audio_utils import probe_duration, detect_silences, cut_audio
+from collections import Counter
+import asyncio, os
+
+# Split recordings longer than this into chunks transcribed in parallel
+LONG_AUDIO_MODE = os.getenv("LONG_AUDIO_MODE", "1") == "1"
+LONG_AUDIO_MIN_SECONDS = float(os.getenv("LONG_AUDIO_MIN_SECONDS", "90"))
+# Target chunk length; each cut moves to the longest silence within the search window
+LONG_AUDIO_CHUNK_SECONDS = float(os.getenv("LONG_AUDIO_CHUNK_SECONDS", "30"))
+LONG_AUDIO_SEARCH_SECONDS = float(os.getenv("LONG_AUDIO_SEARCH_SECONDS", "10"))
+# Audio repeated at the start of each chunk, used to line speakers up across the cut
+LONG_AUDIO_OVERLAP_SECONDS = float(os.getenv("LONG_AUDIO_OVERLAP_SECONDS", "4"))
+# Phone recordings rarely drop below -35 dB, so silence is relative to a noisy floor
+LONG_AUDIO_NOISE_DB = float(os.getenv("LONG_AUDIO_NOISE_DB", "-30"))
+LONG_AUDIO_MIN_SILENCE = float(os.getenv("LONG_AUDIO_MIN_SILENCE", "0.3"))
+# Attempts per chunk before the whole recording fails over to the next provider
+LONG_AUDIO_RETRIES = int(os.getenv("LONG_AUDIO_RETRIES", "3"))
+LONG_AUDIO_BACKOFF_SECONDS = float(os.getenv("LONG_AUDIO_BACKOFF_SECONDS", "0.5"))
+# Max start-time difference for the same word seen in two overlapping chunks
+ALIGN_TOLERANCE_SECONDS = 0.3
+
+# Everything that changes the stitched output; part of the transcript cache key
+LONG_AUDIO_SETTINGS = {
+    "long_audio_min_seconds": LONG_AUDIO_MIN_SECONDS,
+    "long_audio_chunk_seconds": LONG_AUDIO_CHUNK_SECONDS,
+    "long_audio_search_seconds": LONG_AUDIO_SEARCH_SECONDS,
+    "long_audio_overlap_seconds": LONG_AUDIO_OVERLAP_SECONDS,
+    "long_audio_noise_db": LONG_AUDIO_NOISE_DB,
+    "long_audio_min_silence": LONG_AUDIO_MIN_SILENCE,
+}
+
+
+def plan_cuts(duration: float, silences: list) -> list:
+    """
+    Cut points (seconds) roughly every LONG_AUDIO_CHUNK_SECONDS, each moved
+    to the middle of the longest nearby silence so no word is split. Falls
+    back to a hard cut when there is no silence in the window.
+    """
+    cuts = []
+    position = 0.0
+    # Stop early enough that the last chunk is not a sliver
+    while duration - position > LONG_AUDIO_CHUNK_SECONDS * 1.5:
+        target = position + LONG_AUDIO_CHUNK_SECONDS
+        nearby = [
+            (start, end) for start, end in silences
+            if abs((start + end) / 2 - target) <= LONG_AUDIO_SEARCH_SECONDS and (start + end) / 2 > position
+        ]
+        if nearby:
+            start, end = max(nearby, key=lambda silence: silence[1] - silence[0])
+            target = (start + end) / 2
+        cuts.append(target)
+        position = target
+    return cuts
+
+
+async def _transcribe_chunk(audio: bytes, ext: str, model: str) -> list:
+    for attempt in range(LONG_AUDIO_RETRIES):
+        try:
+            return await transcribe_words_deepgram(audio, ext, model)
+        except Exception as e:
+            if attempt + 1 == LONG_AUDIO_RETRIES:
+                raise
+            print(f"[Long Audio] chunk attempt {attempt + 1} failed: {e}")
+            await asyncio.sleep(LONG_AUDIO_BACKOFF_SECONDS * (2 ** attempt))
+
+
+def _speaker_mapping(previous: list, overlap: list) -> dict:
+    """
+    Map a chunk's local speaker labels onto the stitched ones by finding the
+    same words, at the same time, in the audio both chunks share.
+    """
+    votes = Counter()
+    for word in overlap:
+        for prior in previous:
+            if prior["word"] == word["word"] and abs(prior["start"] - word["start"]) <= ALIGN_TOLERANCE_SECONDS:
+                votes[(word.get("speaker", 0), prior["speaker"])] += 1
+                break
+
+    mapping = {}
+    for (local, speaker), _ in votes.most_common():
+        if local not in mapping and speaker not in mapping.values():
+            mapping[local] = speaker
+    return mapping
+
+
+def stitch(chunks: list) -> list:
+    """
+    Merge per-chunk word lists into one timeline with consistent speakers.
+
+    `chunks` holds `(offset, keep_from, words)` per chunk in order: `offset`
+    is where the chunk's audio starts in the recording and `keep_from` where
+    its own part begins (anything earlier is overlap with the previous chunk).
+    """
+    stitched = []
+    speakers = []
+    for offset, keep_from, words in chunks:
+        words = [{**word, "start": word["start"] + offset, "end": word["end"] + offset} for word in words]
+        previous = [word for word in stitched if word["start"] >= keep_from - LONG_AUDIO_OVERLAP_SECONDS]
+        mapping = _speaker_mapping(previous, [word for word in words if word["start"] < keep_from])
+
+        for word in words:
+            if word["start"] < keep_from:
+                continue
+            local = word.get("speaker", 0)
+            if local not in mapping:
+                # Unmatched labels take a known speaker not already claimed in this chunk
+                free = [speaker for speaker in speakers if speaker not in mapping.values()]
+                mapping[local] = free[0] if free else len(speakers)
+            if mapping[local] not in speakers:
+                speakers.append(mapping[local])
+            stitched.append({**word, "speaker": mapping[local]})
+    return stitched
+
+
+def render_paragraphs(words: list) -> list:
+    paragraphs = []
+    for word in words:
+        text = word.get("punctuated_word") or word["word"]
+        if paragraphs and paragraphs[-1]["speaker"] == word["speaker"]:
+            paragraphs[-1]["end"] = word["end"]
+            paragraphs[-1]["text"] += f" {text}"
+        else:
+            paragraphs.append({"speaker": word["speaker"], "start": word["start"], "end": word["end"], "text": text})
+    return paragraphs
+
+
+async def split_audio(audio: bytes, ext: str) -> list:
+    """
+    Cut a wav/mp3/ogg buffer at silences into `(offset, keep_from, audio)`
+    chunks for stitch: each chunk starts LONG_AUDIO_OVERLAP_SECONDS before
+    its own part.
+    """
+    duration, silences = await detect_silences(audio, LONG_AUDIO_NOISE_DB, LONG_AUDIO_MIN_SILENCE)
+    cuts = plan_cuts(duration, silences)
+    bounds = list(zip([0.0, *cuts], [*cuts, None]))
+
+    async def cut(start: float, end: float):
+        offset = max(0.0, start - LONG_AUDIO_OVERLAP_SECONDS)
+        return offset, start, await cut_audio(audio, ext, offset, end - offset if end is not None else None)
+
+    return await asyncio.gather(*(cut(start, end) for start, end in bounds))
+
+
+async def plan_chunks(audio: bytes, ext: str) -> list:
+    """
+    Long-audio mode's decision for one recording: no chunks (send it in one
+    request) when it is shorter than LONG_AUDIO_MIN_SECONDS, else the
+    split_audio chunks. Only ffmpeg runs here, so call it before routing;
+    a failure is the upload's fault, not the provider's.
+    """
+    if await probe_duration(audio) < LONG_AUDIO_MIN_SECONDS:
+        return []
+    return await split_audio(audio, ext)
+
+
+async def transcribe_chunks(chunks: list, ext: str = "mp3", model: str = DEEPGRAM_MODEL) -> dict:
+    """
+    Transcribe planned chunks concurrently (each retried on its own) and
+    stitch them back together. Returns the transcript in Deepgram's
+    "Speaker N: ..." paragraph format plus the timed paragraphs.
+    """
+    words = await asyncio.gather(*(_transcribe_chunk(audio, ext, model) for _, _, audio in chunks))
+    paragraphs = render_paragraphs(stitch([(offset, keep_from, chunk_words) for (offset, keep_from, _), chunk_words in zip(chunks, words)]))
+    return {
+        "transcript": "\n\n".join(f"Speaker {paragraph['speaker']}: {paragraph['text']}" for paragraph in paragraphs),
+        "paragraphs": paragraphs,
+        "chunks": len(chunks)
+    }
+
+
+async def transcribe_chunked(audio: bytes, ext: str = "mp3", model: str = DEEPGRAM_MODEL) -> dict:
+    """
+    Split and transcribe in one go, whatever the recording's length.
+    """
+    return await transcribe_chunks(await split_audio(audio, ext), ext, model)
@@ -1,11 +1,49 @@
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, File, UploadFile, Form
-from get_transcribe import transcribe_audio, transcribe_audio_openai, transcribe_audio_deepgram
-from get_analysis import get_call_analysis
-from mongo_utils import update_data, get_all_docs, get_data_by_id, get_or_create_agent, list_agents
-import uuid, os, shutil, subprocess
+from fastapi import FastAPI, File, UploadFile, Form, Request, WebSocket
+from fastapi.responses import StreamingResponse, Response, JSONResponse
+from typing import List
+from pipeline import process_call, transcript_cache, analysis_cache, transcribe_router, upload_snapshot, TRANSCRIBE_FUNCTIONS
+from audio_utils import upload_chunks, zip_members, zip_member_chunks, InvalidAudio
+from batch import process_batch, parse_manifest
+from live import run_live_call
+from jobs import start_workers, stop_workers, submit_job
+from metrics import RequestTimer, render as render_metrics
+from clients import close_http_pool, http_stats
+from transcript_compaction import start_encoding_load
+from admission import admission, provider_limits, AdmissionRejected
+from mongo_utils import (
+    get_all_docs, iter_calls, get_data_by_id, list_agents, iter_agent_names, get_job,
+    get_rollup_summary, get_analysis_history, get_reanalysis_run, ensure_indexes, encode_cursor, decode_cursor,
+    search_calls, encode_search_cursor, decode_search_cursor, client as mongo_client
+)
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+import asyncio, io, json, os, zipfile
+import orjson
+
+CALLS_PAGE_SIZE = int(os.getenv("CALLS_PAGE_SIZE", "50"))
+CALLS_MAX_PAGE_SIZE = int(os.getenv("CALLS_MAX_PAGE_SIZE", "500"))
+# Idle seconds before a keep-alive comment is sent on an event stream
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+# Streamed pipelines finish even if the client disconnects; hold them until then
+stream_tasks = set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ensure_indexes()
+    await start_workers()
+    # Loaded in the background; the first analysis waits for it if needed
+    start_encoding_load()
+    yield
+    await stop_workers()
+    await mongo_client.close()
+    await close_http_pool()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Qlink iDAC backend API",
     version="0.1.0",
     redoc_url=None,
@@ -21,11 +59,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-TRANSCRIBE_FUNCTIONS = {
-    "groq": transcribe_audio,
-    "openai": transcribe_audio_openai,
-    "deepgram": transcribe_audio_deepgram
-}
+app.add_middleware(RequestTimer)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        {"success": False, "response": exc.reason},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(InvalidAudio)
+async def invalid_audio(request: Request, exc: InvalidAudio):
+    return JSONResponse({"success": False, "response": str(exc)}, status_code=422)
 
 @app.get("/")
 async def root():
@@ -42,8 +88,22 @@ async def transcribe(
     file: UploadFile = File(...),
     agent_name: str = Form(...),
     patient_name: str = Form(...),
-    agent_phone_number: str = Form(...)
+    agent_phone_number: str = Form(...),
+    mode: str = "sync",
+    provider: str = None
 ):
+    """
+    Transcribe and analyze an uploaded call. With `mode=job` the upload is
+    queued and a job id is returned immediately; poll `/jobs/{job_id}`.
+    `provider` pins transcription to one of TRANSCRIBE_FUNCTIONS.
+    Sync calls wait for an admission slot and get a 429 with Retry-After
+    when too many are already waiting.
+    """
+    if provider and provider not in TRANSCRIBE_FUNCTIONS:
+        return {
+            "success": False,
+            "response": f"Unknown provider: {provider}"
+        }
 
     # Store values in lowercase
     agent_name_var = agent_name.lower()
@@ -51,99 +111,455 @@ async def transcribe(
     agent_phone_number_var = agent_phone_number.lower()
 
     ext = file.filename.split(".")[-1].lower()
-    temp_filename = f"temp_{uuid.uuid4().hex}.{ext}"
-    with open(temp_filename, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
 
+    if mode == "job":
+        job_id = await submit_job(
+            audio=await file.read(),
+            ext=ext,
+            metadata={
+                "bucket": bucket,
+                "agent_name": agent_name_var,
+                "patient_name": patient_name_var,
+                "agent_phone_number": agent_phone_number_var,
+                "provider": provider
+            }
+        )
+        if not job_id:
+            return JSONResponse(
+                {"success": False, "response": "Could not store the job, try again later."},
+                status_code=503
+            )
+        return {
+            "success": True,
+            "job_id": job_id
+        }
+
+    async with admission.slot(bucket):
+        return await process_call(
+            open_chunks=lambda: upload_chunks(file),
+            ext=ext,
+            bucket=bucket,
+            agent_name=agent_name_var,
+            patient_name=patient_name_var,
+            agent_phone_number=agent_phone_number_var,
+            provider=provider
+        )
+
+def sse_event(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data, default=str) + b"\n\n"
+
+@app.post("/transcribe/stream")
+async def transcribe_stream(
+    bucket: str,
+    file: UploadFile = File(...),
+    agent_name: str = Form(...),
+    patient_name: str = Form(...),
+    agent_phone_number: str = Form(...),
+    provider: str = None
+):
+    """
+    Same as /transcribe, answered as Server-Sent Events as each stage
+    finishes: `uploaded`, `transcoded`, `transcribed` (the transcript),
+    `analyzed` (the analysis) and `stored` (the call id), or `error`.
+    Admission works as for /transcribe; a 429 comes back before the stream.
+    """
+    if provider and provider not in TRANSCRIBE_FUNCTIONS:
+        return {
+            "success": False,
+            "response": f"Unknown provider: {provider}"
+        }
+
+    admitted_at = await admission.acquire(bucket)
 
     try:
-        agent_id = get_or_create_agent(agent_name=agent_name_var)
-
-        # Convert GSM → WAV (fastest) or MP3 if needed
-        if ext == "gsm":
-            wav_filename = f"temp_{uuid.uuid4().hex}.wav"
-            subprocess.run(["ffmpeg", "-y", "-i", temp_filename, wav_filename], check=True)
-            os.remove(temp_filename)
-            temp_filename = wav_filename
-            ext = "wav"
-
-        elif ext not in ["wav", "mp3"]:
-            mp3_filename = f"temp_{uuid.uuid4().hex}.mp3"
-            subprocess.run(["ffmpeg", "-y", "-i", temp_filename, mp3_filename], check=True)
-            os.remove(temp_filename)
-            temp_filename = mp3_filename
-            ext = "mp3"
-
-        transcription = transcribe_audio_deepgram(temp_filename)
-
-        if transcription:
-            analysis = get_call_analysis(transcribe=transcription, bucket=bucket)
-
-            if analysis:
-                id = update_data(
-                    agent_name=agent_name_var,
-                    agent_id=agent_id,
+        # The request's uploads are closed when this handler returns, before the
+        # stream runs; hand the spooled file to the pipeline and close it after
+        upload = UploadFile(file.file, size=file.size, filename=file.filename)
+        file.file = io.BytesIO()
+        events = asyncio.Queue()
+
+        async def run():
+            try:
+                result = await process_call(
+                    open_chunks=lambda: upload_chunks(upload),
+                    ext=upload.filename.split(".")[-1].lower(),
                     bucket=bucket,
-                    patient_name=patient_name_var,
-                    agent_phone_number=agent_phone_number_var,
-                    analystics=analysis,
-                    transcribe=transcription
+                    agent_name=agent_name.lower(),
+                    patient_name=patient_name.lower(),
+                    agent_phone_number=agent_phone_number.lower(),
+                    provider=provider,
+                    on_result=lambda event, data: events.put_nowait((event, data))
                 )
+                if not result["success"]:
+                    events.put_nowait(("error", {"response": result["response"]}))
+            except InvalidAudio as e:
+                events.put_nowait(("error", {"response": str(e)}))
+            finally:
+                admission.release(admitted_at)
+                events.put_nowait(None)
+                await upload.close()
 
-                return {
-                    "success": True,
-                    "response": id,
-                    "analysis": analysis
-                }
-        
-        return {
-            "success": False,
-            "response": "Error Processing Data."
+        task = asyncio.create_task(run())
+    except BaseException:
+        # run() never started, so its finally block will not release the slot
+        admission.release(admitted_at)
+        raise
+    stream_tasks.add(task)
+    task.add_done_callback(stream_tasks.discard)
+
+    async def stream():
+        yield sse_event("uploaded", {"filename": upload.filename, "bytes": upload.size})
+        while True:
+            try:
+                item = await asyncio.wait_for(events.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if item is None:
+                break
+            yield sse_event(*item)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/transcribe/live")
+async def transcribe_live(
+    websocket: WebSocket,
+    bucket: str,
+    agent_name: str,
+    patient_name: str,
+    agent_phone_number: str,
+    encoding: str = None,
+    sample_rate: int = None,
+    channels: int = None
+):
+    """
+    Transcribe a call while it is in progress. Send audio as binary frames
+    (containerized audio, or raw audio described by `encoding`,
+    `sample_rate` and `channels`) and `{"type": "stop"}` when the call ends.
+    Transcript `segment` messages come back as they are recognized, then
+    `analysis` and `stored` once the call is analyzed and saved.
+    """
+    await run_live_call(
+        websocket,
+        bucket=bucket,
+        agent_name=agent_name.lower(),
+        patient_name=patient_name.lower(),
+        agent_phone_number=agent_phone_number.lower(),
+        audio_format={"encoding": encoding, "sample_rate": sample_rate, "channels": channels}
+    )
+
+@app.post("/transcribe/batch")
+async def transcribe_batch(
+    bucket: str,
+    manifest: str = Form(...),
+    files: List[UploadFile] = File(None),
+    archive: UploadFile = File(None),
+    parallelism: int = None,
+    provider: str = None
+):
+    """
+    Transcribe and analyze many recordings in one request. Send them as
+    repeated `files` or as a zip `archive`. `manifest` is a JSON list of
+    `{"filename", "agent_name", "patient_name", "agent_phone_number"}`
+    (optionally `"bucket"` to override the query bucket per file).
+    """
+    if provider and provider not in TRANSCRIBE_FUNCTIONS:
+        return {"success": False, "response": f"Unknown provider: {provider}"}
+
+    try:
+        entries = parse_manifest(json.loads(manifest))
+    except (ValueError, TypeError) as e:
+        return {"success": False, "response": f"Invalid manifest: {e}"}
+
+    recordings = [(file.filename, lambda file=file: upload_chunks(file)) for file in files or []]
+
+    zip_file = None
+    if archive:
+        try:
+            zip_file = await run_in_threadpool(zipfile.ZipFile, archive.file)
+        except zipfile.BadZipFile:
+            return {"success": False, "response": "Archive is not a valid zip file."}
+        try:
+            members = zip_members(zip_file)
+        except ValueError as e:
+            zip_file.close()
+            return {"success": False, "response": f"Invalid archive: {e}"}
+        recordings.extend(
+            (filename, lambda info=info: zip_member_chunks(zip_file, info)) for filename, info in members
+        )
+
+    if not recordings:
+        return {"success": False, "response": "No files uploaded."}
+
+    try:
+        batch = await process_batch(recordings, entries, bucket, parallelism, provider)
+    finally:
+        if zip_file:
+            zip_file.close()
+    return {"success": True, "response": batch["results"], "summary": batch["summary"]}
+
+@app.get("/jobs/{job_id}")
+async def fetch_job(job_id: str):
+    """
+    Fetch the stage and, once finished, the result of a /transcribe job.
+    """
+    job = await get_job(job_id)
+    if not job:
+        return {"success": False, "response": "No Job Found"}
+    return {"success": True, "response": job}
+
+@app.get("/cache/stats")
+async def fetch_cache_stats():
+    """
+    Hit, miss and coalesced-request counters for the result caches.
+    """
+    return {
+        "success": True,
+        "response": {
+            "transcript": transcript_cache.snapshot(),
+            "analysis": analysis_cache.snapshot()
         }
-    
-    except Exception as e:
-        return {
-            "success": False,
-            "response": str(e)
+    }
+
+@app.get("/http/stats")
+async def fetch_http_stats():
+    """
+    Requests, new connections and TLS handshakes per provider host on the
+    shared connection pool; `reused_ratio` is the share of requests that
+    went over an already open connection.
+    """
+    return {"success": True, "response": http_stats()}
+
+@app.get("/admission/stats")
+async def fetch_admission_stats():
+    """
+    Calls running and queued per bucket behind the admission cap, and the
+    in-use and waiting counts for each provider's concurrency limit.
+    """
+    return {
+        "success": True,
+        "response": {
+            **admission.snapshot(),
+            "providers": {name: limit.snapshot() for name, limit in provider_limits.items()}
         }
-    finally:
-        os.remove(temp_filename)
+    }
+
+@app.get("/providers/stats")
+async def fetch_provider_stats():
+    """
+    Rolling latency, error rate and circuit state per transcription provider,
+    plus bytes sent before/after audio normalization under "upload".
+    """
+    health = transcribe_router.snapshot()
+    return {
+        "success": True,
+        "response": {name: {**health[name], "upload": upload_snapshot(name)} for name in health}
+    }
+
+@app.get("/metrics")
+async def fetch_metrics():
+    """
+    Stage latencies, in-flight gauges, provider errors and analysis token
+    usage in the Prometheus text format.
+    """
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
 
 @app.get("/docs")
-async def fetch_call_by_id(doc_id: str):
+async def fetch_call_by_id(doc_id: str, fields: str = None):
     """
-    Fetch a single call document by its ID.
+    Fetch a single call document by its ID. `fields` is a comma-separated
+    list of top-level fields to return (e.g. "analysis,agent_name").
     """
     try:
-        doc = get_data_by_id(doc_id)
+        doc = await get_data_by_id(doc_id, fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None)
         if not doc:
             return {"success": False, "response": "No Data Found"}
         return {"success": True, "response": doc}
     except Exception as e:
         raise {"success": True, "response": f"Error occuered: {e}"}
     
+def ndjson_response(rows):
+    """
+    Stream an async iterator of JSON-serialisable rows as newline-delimited
+    JSON. Rows are encoded one by one, so memory stays flat whatever the size.
+    If reading fails partway the last line is `{"error": ...}`: the status
+    is already sent, so that line is how clients tell a cut-off export from
+    a complete one.
+    """
+    async def lines():
+        buffer = bytearray()
+        try:
+            async for row in rows:
+                buffer += orjson.dumps(row)
+                buffer += b"\n"
+                # Flush in ~64 KB writes rather than one tiny write per row
+                if len(buffer) >= 65536:
+                    yield bytes(buffer)
+                    buffer.clear()
+        except Exception as e:
+            print(f"[General Error] {e}")
+            buffer += orjson.dumps({"error": f"Export stopped early: {e}"})
+            buffer += b"\n"
+        if buffer:
+            yield bytes(buffer)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/docs/history")
+async def fetch_analysis_history(doc_id: str):
+    """
+    Every analysis version stored for a call, oldest first. Versions after
+    the first come from re-analysis runs (see reanalyze.py).
+    """
+    history = await get_analysis_history(doc_id)
+    if history is None:
+        return {"success": False, "response": "Error fetching analysis history."}
+    return {"success": True, "data": history}
+
+@app.get("/reanalysis/{run_id}")
+async def fetch_reanalysis_run(run_id: str):
+    """
+    Status, checkpoint and counts of a re-analysis run.
+    """
+    run = await get_reanalysis_run(run_id)
+    if not run:
+        return {"success": False, "response": "No Re-analysis Run Found"}
+    return {"success": True, "response": run}
+
 @app.get("/calls")
-async def fetch_all_calls():
+async def fetch_all_calls(
+    limit: int = CALLS_PAGE_SIZE,
+    cursor: str = None,
+    agent_name: str = None,
+    bucket: str = None,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    min_score: int = None,
+    max_score: int = None,
+    format: str = "json"
+):
     """
-    Fetch all call documents with selected fields.
+    Fetch call documents with selected fields, newest first, one page at a
+    time. Pass the returned `next_cursor` back as `cursor` for the next page.
+    With `format=ndjson` every matching call is streamed instead, one JSON
+    object per line, and `limit` is ignored. `date_from` is inclusive and
+    `date_to` exclusive, so `date_to=2025-09-01` ends at the last moment of
+    August 31 (the /analytics endpoints take inclusive days instead).
     """
     try:
-        docs = get_all_docs()
-        return {"success": True, "data": docs}
-    except Exception as e:
-        raise {"success": True, "response": f"Error occuered: {e}"}
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return {"success": False, "response": str(e)}
+
+    filters = {
+        "agent_name": agent_name,
+        "bucket": bucket,
+        "date_from": date_from,
+        "date_to": date_to,
+        "min_score": min_score,
+        "max_score": max_score
+    }
+    if format == "ndjson":
+        return ndjson_response(iter_calls(after=after, **filters))
+
+    limit = max(1, min(limit, CALLS_MAX_PAGE_SIZE))
+    docs = await get_all_docs(limit=limit + 1, after=after, **filters)
+    if docs is None:
+        return {"success": False, "response": "Error fetching calls."}
+
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return {"success": True, "data": docs[:limit], "next_cursor": next_cursor}
     
+@app.get("/search")
+async def search(
+    q: str,
+    limit: int = CALLS_PAGE_SIZE,
+    cursor: str = None,
+    agent_name: str = None,
+    bucket: str = None,
+    date_from: datetime = None,
+    date_to: datetime = None
+):
+    """
+    Full-text search over transcripts, call summaries and unresolved issues,
+    best match first. Hindi (Devanagari) and English words can be mixed in
+    `q`; a call matches any of the words, "quoted phrases" must appear
+    word for word and -words exclude calls. Words match whole, without
+    stemming, but ignoring case and diacritics, which include the
+    Devanagari nukta and virama (फ़ीस also finds फीस). Dates work as on
+    /calls (`date_to` exclusive). Pass the returned `next_cursor` back as
+    `cursor` for the next page.
+    """
+    if not q.strip():
+        return {"success": False, "response": "Empty search query."}
+    try:
+        after = decode_search_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return {"success": False, "response": str(e)}
+
+    limit = max(1, min(limit, CALLS_MAX_PAGE_SIZE))
+    docs = await search_calls(
+        q, limit=limit + 1, after=after, agent_name=agent_name, bucket=bucket, date_from=date_from, date_to=date_to
+    )
+    if docs is None:
+        return {"success": False, "response": "Error searching calls."}
+
+    next_cursor = encode_search_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return {"success": True, "data": docs[:limit], "next_cursor": next_cursor}
+
 @app.get("/agents")
-async def list_all_agnets():
+async def list_all_agnets(format: str = "json"):
     """
     Fetch all agents docs with selected fields.
+    With `format=ndjson` the names are streamed, one JSON string per line.
     """
+    if format == "ndjson":
+        return ndjson_response(iter_agent_names())
+
     try:
-        docs = list_agents()
+        docs = await list_agents()
         return {"success": True, "data": docs}
     except Exception as e:
         raise {"success": True, "response": f"Error occuered: {e}"}
     
+async def analytics_response(group_by: str, agent_name: str, bucket: str, date_from: date, date_to: date):
+    docs = await get_rollup_summary(
+        group_by,
+        agent_name=agent_name,
+        bucket=bucket,
+        date_from=date_from.isoformat() if date_from else None,
+        date_to=date_to.isoformat() if date_to else None
+    )
+    if docs is None:
+        return {"success": False, "response": "Error fetching analytics."}
+    return {"success": True, "data": docs}
+
+@app.get("/analytics/agents")
+async def analytics_by_agent(agent_name: str = None, bucket: str = None, date_from: date = None, date_to: date = None):
+    """
+    Per-agent averages of Total_Score and each Individual_Scores dimension,
+    sentiment distributions and follow-up/payment rates, read from the
+    daily rollups. `date_from` and `date_to` are days and both inclusive.
+    """
+    return await analytics_response("agent", agent_name, bucket, date_from, date_to)
+
+@app.get("/analytics/buckets")
+async def analytics_by_bucket(agent_name: str = None, bucket: str = None, date_from: date = None, date_to: date = None):
+    """
+    Same figures as /analytics/agents, grouped by bucket.
+    """
+    return await analytics_response("bucket", agent_name, bucket, date_from, date_to)
+
+@app.get("/analytics/days")
+async def analytics_by_day(agent_name: str = None, bucket: str = None, date_from: date = None, date_to: date = None):
+    """
+    Same figures as /analytics/agents, one row per day.
+    """
+    return await analytics_response("day", agent_name, bucket, date_from, date_to)
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,182 @@
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json, time
+
+# From quick Mongo writes up to multi-minute transcriptions
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Bucket names are user input; anything not registered here is labelled "other"
+KNOWN_BUCKETS = set()
+
+STAGE_SECONDS = Histogram(
+    "diallo_stage_seconds", "Time spent in each pipeline stage", ["stage", "bucket"], buckets=LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter("diallo_stage_errors_total", "Pipeline stages that raised", ["stage", "bucket"])
+CALLS_IN_FLIGHT = Gauge("diallo_calls_in_flight", "Recordings currently being processed", ["bucket"])
+CALLS_TOTAL = Counter("diallo_calls_total", "Processed recordings by outcome", ["bucket", "status"])
+PROVIDER_SECONDS = Histogram(
+    "diallo_provider_request_seconds", "Latency of requests to each provider", ["provider", "bucket"], buckets=LATENCY_BUCKETS
+)
+PROVIDER_IN_FLIGHT = Gauge("diallo_provider_in_flight", "Requests currently out to each provider", ["provider", "bucket"])
+PROVIDER_ERRORS = Counter("diallo_provider_errors_total", "Failed provider requests", ["provider", "bucket"])
+LIVE_SESSIONS = Gauge("diallo_live_sessions", "Live calls currently streaming")
+ANALYSIS_TOKENS = Counter("diallo_analysis_tokens_total", "OpenAI tokens used by call analysis", ["model", "bucket", "kind"])
+TRANSCRIPT_TOKENS = Counter(
+    "diallo_transcript_tokens_total", "Transcript tokens before and after compaction", ["bucket", "kind"]
+)
+ADMISSION_RUNNING = Gauge("diallo_admission_running", "Calls holding an admission slot")
+ADMISSION_QUEUED = Gauge("diallo_admission_queued", "Calls waiting for an admission slot", ["bucket"])
+ADMISSION_WAIT_SECONDS = Histogram(
+    "diallo_admission_wait_seconds", "Time calls waited for an admission slot", ["bucket"], buckets=LATENCY_BUCKETS
+)
+ADMISSION_REJECTED = Counter("diallo_admission_rejected_total", "Calls answered with 429", ["bucket", "reason"])
+PROVIDER_QUEUED = Gauge("diallo_provider_queued", "Requests waiting for a provider concurrency slot", ["provider"])
+PROVIDER_WAIT_SECONDS = Histogram(
+    "diallo_provider_wait_seconds", "Time requests waited for a provider concurrency slot", ["provider"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_CLIENT_REQUESTS = Counter("diallo_http_client_requests_total", "Requests sent to provider hosts", ["host"])
+HTTP_CLIENT_CONNECTIONS = Counter(
+    "diallo_http_client_connections_total", "New connections opened to provider hosts; the rest reused one", ["host"]
+)
+HTTP_SECONDS = Histogram(
+    "diallo_http_request_seconds", "HTTP request latency, from the upload to the last body byte",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+
+_call = ContextVar("diallo_call", default=None)
+
+
+def bucket_label(bucket: str) -> str:
+    return bucket if bucket in KNOWN_BUCKETS else "other"
+
+
+def _current_bucket() -> str:
+    call = _call.get()
+    return call["bucket"] if call else "none"
+
+
+@contextmanager
+def track_call(bucket: str):
+    """
+    Scope one recording: stages, provider requests and token usage inside
+    it are labelled with its bucket, and one structured timing line is
+    printed when it ends. Set `status` on the yielded dict to record the
+    outcome (an exception records "error").
+    """
+    call = {"bucket": bucket_label(bucket), "status": "error", "stages": {}, "tokens": {}}
+    token = _call.set(call)
+    CALLS_IN_FLIGHT.labels(call["bucket"]).inc()
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        _call.reset(token)
+        CALLS_IN_FLIGHT.labels(call["bucket"]).dec()
+        CALLS_TOTAL.labels(call["bucket"], call["status"]).inc()
+        print(json.dumps({"event": "call_timing", "seconds": round(time.perf_counter() - start, 4), **call}))
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time one pipeline stage and count it as failed if it raises.
+    """
+    call = _call.get()
+    bucket = _current_bucket()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(name, bucket).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(name, bucket).observe(elapsed)
+        if call is not None:
+            call["stages"][name] = round(call["stages"].get(name, 0) + elapsed, 4)
+
+
+@contextmanager
+def track_provider(provider: str):
+    """
+    In-flight gauge, latency and errors for one outgoing provider request.
+    """
+    bucket = _current_bucket()
+    in_flight = PROVIDER_IN_FLIGHT.labels(provider, bucket)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        PROVIDER_ERRORS.labels(provider, bucket).inc()
+        raise
+    finally:
+        in_flight.dec()
+        PROVIDER_SECONDS.labels(provider, bucket).observe(time.perf_counter() - start)
+
+
+def record_tokens(model: str, input_tokens: int, output_tokens: int):
+    call = _call.get()
+    bucket = _current_bucket()
+    ANALYSIS_TOKENS.labels(model, bucket, "input").inc(input_tokens)
+    ANALYSIS_TOKENS.labels(model, bucket, "output").inc(output_tokens)
+    if call is not None:
+        call["tokens"] = {"model": model, "input": input_tokens, "output": output_tokens}
+
+
+def record_transcript_tokens(before: int, after: int):
+    call = _call.get()
+    bucket = _current_bucket()
+    TRANSCRIPT_TOKENS.labels(bucket, "before").inc(before)
+    TRANSCRIPT_TOKENS.labels(bucket, "after").inc(after)
+    if call is not None:
+        call["transcript_tokens"] = {"before": before, "after": after}
+
+
+class RequestTimer:
+    """
+    ASGI middleware observing HTTP_SECONDS when the last body chunk is sent,
+    so streamed responses (SSE, NDJSON) count their whole body, not just the
+    time to their headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        state = {"status": "500", "observed": False}
+
+        def observe():
+            if state["observed"]:
+                return
+            state["observed"] = True
+            # Label by route template so /jobs/{job_id} is one series, not one per job
+            route = scope.get("route")
+            HTTP_SECONDS.labels(
+                scope["method"], route.path if route else "unmatched", state["status"]
+            ).observe(time.perf_counter() - start)
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = str(message["status"])
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            # Client went away mid-body, or the app raised
+            observe()
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,37 @@
+"""
+Move the transcripts of stored calls between inline and split storage (see
+CALL_STORAGE_MODE in mongo_utils). Safe to re-run after an interruption:
+only calls still in the old layout are picked up.
+
+    python migrate_call_storage.py --dry-run
+    python migrate_call_storage.py --to split --batch-size 200
+    python migrate_call_storage.py --to inline
+"""
+from mongo_utils import migrate_call_storage, client
+import argparse, asyncio
+
+
+async def main(args):
+    calls = transcript_bytes = compressed_bytes = 0
+    try:
+        async for batch in migrate_call_storage(args.to, batch_size=args.batch_size, dry_run=args.dry_run):
+            calls += batch["calls"]
+            transcript_bytes += batch["transcript_bytes"]
+            compressed_bytes += batch["compressed_bytes"]
+            print(f"{calls} calls, up to {batch['last_id']}")
+            if args.limit and calls >= args.limit:
+                break
+    finally:
+        await client.close()
+
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"{verb} {calls} transcripts to {args.to} storage: {transcript_bytes} bytes raw, {compressed_bytes} bytes compressed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--to", choices=["split", "inline"], default="split")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--limit", type=int, help="stop after roughly this many calls")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would move")
+    asyncio.run(main(parser.parse_args()))
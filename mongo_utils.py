@@ -1,65 +1,257 @@
-from pymongo import MongoClient, errors
-from bson import ObjectId
-from datetime import datetime
-from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, ReturnDocument, UpdateOne, DeleteOne, WriteConcern, errors
+from bson import ObjectId, Binary
+from datetime import datetime, timedelta
+from collections import OrderedDict
+import gridfs
+import zstandard
+import unicodedata
+import base64
+import json
+import re
+import threading
+import time
+import asyncio
+import clients
 import os
 
-load_dotenv()
+# The clients module loads .env before these are read; the Mongo client
+# itself opens no connection until the first operation
 MONGODB_URI = os.getenv("MONGODB_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "demo")
 
-client = MongoClient(MONGODB_URI)
-db = client["demo"]
+# Connection pool per process; requests beyond it wait up to the wait-queue timeout
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "60000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+# Write concern: "majority" or a node count, journaled, bounded wait
+MONGO_WRITE_W = os.getenv("MONGO_WRITE_W", "majority")
+MONGO_WRITE_JOURNAL = os.getenv("MONGO_WRITE_JOURNAL", "1") == "1"
+MONGO_WTIMEOUT_MS = int(os.getenv("MONGO_WTIMEOUT_MS", "5000"))
+# "split" stores new transcripts zstd-compressed in diallo_call_content, keyed by
+# call id, leaving slim call documents; "inline" keeps them in the call document
+CALL_STORAGE_MODE = os.getenv("CALL_STORAGE_MODE", "inline")
+TRANSCRIPT_ZSTD_LEVEL = int(os.getenv("TRANSCRIPT_ZSTD_LEVEL", "10"))
+
+# /search text index. Mongo has no Hindi analyzer, and English stemming and
+# stop words would mangle Hinglish, so no language processing at all: terms
+# match whole, in Devanagari or Latin. The v3 text index still folds case and
+# diacritics, which strips the Devanagari nukta and virama: फ़ीस matches फीस
+# and पक्का matches पकका
+SEARCH_INDEX_NAME = "calls_text_search"
+SEARCH_INDEX_WEIGHTS = {
+    "analysis.Call_summary": 5,
+    "analysis.Unresolved_issues": 5,
+    "transcribe": 1,
+    "transcript_terms": 1
+}
+# Word characters plus Devanagari vowel signs, virama and nukta (not letters
+# to Python's \w), minus the danda punctuation marks
+SEARCH_TOKEN = re.compile(r"[\w\u0900-\u0963\u0966-\u097F]+")
+
+def _uri_options():
+    """
+    Lowercased option names given in MONGODB_URI; those win over the env defaults.
+    """
+    query = (MONGODB_URI or "").partition("?")[2]
+    return {option.split("=")[0].lower() for option in query.split("&") if option}
+
+def _client_options():
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+    }
+    in_uri = _uri_options()
+    return {name: value for name, value in options.items() if name.lower() not in in_uri}
+
+def _write_concern():
+    if "w" in _uri_options():
+        return None
+    return WriteConcern(
+        w=int(MONGO_WRITE_W) if MONGO_WRITE_W.isdigit() else MONGO_WRITE_W,
+        j=MONGO_WRITE_JOURNAL,
+        wtimeout=MONGO_WTIMEOUT_MS
+    )
+
+client = AsyncMongoClient(MONGODB_URI, **_client_options())
+db = client.get_database(MONGO_DB_NAME, write_concern=_write_concern())
 calls_collection = db["diallo"]
 agents_collection = db["diallo_agent"]
+jobs_collection = db["diallo_jobs"]
+transcript_cache_collection = db["diallo_transcript_cache"]
+analysis_cache_collection = db["diallo_analysis_cache"]
+rollups_collection = db["diallo_rollups"]
+analysis_history_collection = db["diallo_analysis_history"]
+reanalysis_runs_collection = db["diallo_reanalysis_runs"]
+call_content_collection = db["diallo_call_content"]
+job_audio_fs = gridfs.AsyncGridFS(db, collection="diallo_job_audio")
+
+JOB_FINAL_STATUSES = ["completed", "failed"]
 
-def list_agents():
+# Bounded name → id cache for get_or_create_agent
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "1024"))
+# How long list_agents may serve its cached list; other processes can add agents
+AGENT_LIST_TTL = float(os.getenv("AGENT_LIST_TTL", "60"))
+# Only touched from the event loop, with no await between a read and the
+# write it depends on, so neither cache needs a lock
+_agent_ids = OrderedDict()
+_agent_list = None
+
+# Documents fetched per round trip when streaming large reads
+CURSOR_BATCH_SIZE = int(os.getenv("MONGO_CURSOR_BATCH_SIZE", "500"))
+
+def _remember_agent(agent_name: str, agent_id: str):
+    _agent_ids[agent_name] = agent_id
+    _agent_ids.move_to_end(agent_name)
+    while len(_agent_ids) > AGENT_CACHE_SIZE:
+        _agent_ids.popitem(last=False)
+
+def invalidate_agent_cache():
+    global _agent_list
+    _agent_ids.clear()
+    _agent_list = None
+
+async def list_agents():
+    global _agent_list
     try:
-        docs_cursor = agents_collection.find({}, {"_id": 0, "name": 1})
-        return [doc.get("name", "") for doc in docs_cursor]
+        if _agent_list and time.monotonic() - _agent_list[0] < AGENT_LIST_TTL:
+            return list(_agent_list[1])
+
+        docs_cursor = agents_collection.find({}, {"_id": 1, "name": 1})
+        names = []
+        async for doc in docs_cursor:
+            names.append(doc.get("name", ""))
+            if doc.get("name"):
+                _remember_agent(doc["name"], str(doc["_id"]))
+
+        _agent_list = (time.monotonic(), names)
+        return list(names)
     except Exception as e:
         print(f"[General Error] {e}")
         return None
     
-def get_or_create_agent(agent_name: str):
-    try:
-        agent = agents_collection.find_one({"name": agent_name})
-        if agent:
-            return str(agent["_id"])
-        else:
-            result = agents_collection.insert_one({
-                "name": agent_name,
-                "created_at": datetime.now()
-            })
-            return str(result.inserted_id)
+async def get_or_create_agent(agent_name: str):
+    """
+    Return the agent's id, creating the agent if needed. A single atomic
+    upsert (backed by the unique index on name) so concurrent uploads for a
+    new agent cannot create duplicates; known agents are served from memory.
+    """
+    global _agent_list
+    if agent_name in _agent_ids:
+        _agent_ids.move_to_end(agent_name)
+        return _agent_ids[agent_name]
+
+    try:
+        new_id = ObjectId()
+        try:
+            existing = await agents_collection.find_one_and_update(
+                {"name": agent_name},
+                {"$setOnInsert": {"_id": new_id, "name": agent_name, "created_at": datetime.now()}},
+                projection={"_id": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except errors.DuplicateKeyError:
+            # Lost the insert race to another writer; the agent exists now
+            existing = await agents_collection.find_one({"name": agent_name}, {"_id": 1})
+
+        agent_id = str(existing["_id"]) if existing else str(new_id)
+        if not existing:
+            _agent_list = None
+        _remember_agent(agent_name, agent_id)
+        return agent_id
     except Exception as e:
         print(f"[General Error] {e}")
         return None
 
-def update_data(
+async def merge_duplicate_agents():
+    """
+    Collapse agents that share a name (left behind by the old find-then-insert
+    race) onto the oldest one, repointing their calls and folding their
+    rollups into the kept agent's, so the unique index can be built.
+    """
+    duplicates = await agents_collection.aggregate([
+        {"$sort": {"created_at": 1, "_id": 1}},
+        {"$group": {"_id": "$name", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ])
+    async for group in duplicates:
+        keep, extras = group["ids"][0], group["ids"][1:]
+        await calls_collection.update_many({"agent_id": {"$in": extras}}, {"$set": {"agent_id": keep}})
+        await _fold_agent_rollups(keep, extras)
+        await agents_collection.delete_many({"_id": {"$in": extras}})
+        print(f"[Agents] merged {len(extras)} duplicate(s) of {group['_id']!r}")
+    invalidate_agent_cache()
+
+def call_document(
+    agent_name: str,
+    agent_id: str,
+    bucket: str,
+    patient_name: str,
+    agent_phone_number: str,
+    analystics: dict,
+    transcribe: str,
+    analysis_model: str = None,
+    analysis_prompt_sha256: str = None
+):
+    now = datetime.now()
+    return {
+        "agent_id": ObjectId(agent_id),
+        "agent_name": agent_name,
+        "patient_name": patient_name,
+        "bucket": bucket,
+        "agent_phone_number": agent_phone_number,
+        "analysis": analystics,
+        "transcribe": transcribe,
+        # Which prompt/model produced `analysis`; re-analysis bumps the version
+        "analysis_version": 1,
+        "analysis_model": analysis_model,
+        "analysis_prompt_sha256": analysis_prompt_sha256,
+        "analyzed_at": now,
+        "created_at": now
+    }
+
+async def update_data(
     agent_name: str,
     agent_id: str,
     bucket: str,
     patient_name: str,
     agent_phone_number: str,
     analystics: str,
-    transcribe: str
+    transcribe: str,
+    analysis_model: str = None,
+    analysis_prompt_sha256: str = None
 ):
     
     try:
-        result = calls_collection.insert_one(
-            {
-                "agent_id": ObjectId(agent_id),
-                "agent_name": agent_name,
-                "patient_name": patient_name,
-                "bucket": bucket,
-                "agent_phone_number": agent_phone_number,
-                "analysis": analystics,
-                "transcribe": transcribe,
-                "created_at": datetime.now()
-            }
+        doc = call_document(
+            agent_name=agent_name,
+            agent_id=agent_id,
+            bucket=bucket,
+            patient_name=patient_name,
+            agent_phone_number=agent_phone_number,
+            analystics=analystics,
+            transcribe=transcribe,
+            analysis_model=analysis_model,
+            analysis_prompt_sha256=analysis_prompt_sha256
         )
+        try:
+            await _store_content([doc])
+            result = await calls_collection.insert_one(doc)
+        except Exception:
+            await _discard_content([doc])
+            raise
 
         if result:
+            await update_rollups([doc])
             return str(result.inserted_id)
         
         return None
@@ -68,43 +260,1013 @@ def update_data(
         print(f"[General Error] {e}")
         return None
     
-def get_data_by_id(id: str):
+async def insert_calls(docs: list):
+    """
+    Insert many call documents (see call_document) in one unordered round
+    trip. Returns one entry per document, in input order: its id, or None if
+    it was not stored. Rollups are updated for the stored ones only, so a
+    partial failure neither hides stored calls nor double-counts on retry.
+    """
+    if not docs:
+        return []
+    for doc in docs:
+        doc.setdefault("_id", ObjectId())
     try:
-        doc = calls_collection.find_one({"_id": ObjectId(id)})
+        await _store_content(docs)
+        await calls_collection.insert_many(docs, ordered=False)
+        failed = set()
+    except errors.BulkWriteError as e:
+        print(f"[General Error] {e}")
+        failed = {error["index"] for error in e.details["writeErrors"]}
+    except Exception as e:
+        # Unknown outcome (e.g. the connection dropped); ask what landed
+        print(f"[General Error] {e}")
+        try:
+            landed = await _stored_call_ids([doc["_id"] for doc in docs])
+        except Exception:
+            landed = set()
+        failed = {index for index, doc in enumerate(docs) if doc["_id"] not in landed}
+
+    if failed:
+        await _discard_content([docs[index] for index in failed])
+    await update_rollups([doc for index, doc in enumerate(docs) if index not in failed])
+    return [None if index in failed else str(doc["_id"]) for index, doc in enumerate(docs)]
+
+def compress_transcript(transcript: str) -> dict:
+    raw = transcript.encode("utf-8")
+    return {
+        "transcribe_zstd": Binary(zstandard.ZstdCompressor(level=TRANSCRIPT_ZSTD_LEVEL).compress(raw)),
+        "transcribe_bytes": len(raw)
+    }
+
+def transcript_terms(transcript: str) -> str:
+    """
+    Distinct words of a transcript, for the /search index on split calls,
+    whose full transcript is compressed out of the call document. Phrase
+    queries and term counts only work on inline transcripts.
+    """
+    text = unicodedata.normalize("NFC", transcript).casefold()
+    return " ".join(dict.fromkeys(SEARCH_TOKEN.findall(text)))
+
+def decompress_transcript(content: dict) -> str:
+    return zstandard.ZstdDecompressor().decompress(content["transcribe_zstd"]).decode("utf-8")
+
+async def _store_content(docs: list):
+    """
+    In split mode, move each call document's transcript into
+    diallo_call_content before the call is inserted. The documents get their
+    `_id` here and are marked `transcript_storage: "split"`.
+    """
+    if CALL_STORAGE_MODE != "split":
+        return
+    contents = []
+    for doc in docs:
+        doc.setdefault("_id", ObjectId())
+        transcript = doc.pop("transcribe") or ""
+        contents.append({"_id": doc["_id"], **compress_transcript(transcript), "created_at": doc["created_at"]})
+        doc["transcript_storage"] = "split"
+        doc["transcript_terms"] = transcript_terms(transcript)
+    await call_content_collection.insert_many(contents, ordered=False)
+
+async def _stored_call_ids(ids: list) -> set:
+    """
+    The subset of `ids` present in the calls collection.
+    """
+    return {doc["_id"] async for doc in calls_collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+
+async def _discard_content(docs: list):
+    """
+    Delete the diallo_call_content rows of split documents whose call was
+    not stored, after a failed insert. Calls that did land (a write that
+    succeeded despite the error) keep theirs.
+    """
+    ids = [doc["_id"] for doc in docs if doc.get("transcript_storage") == "split"]
+    if not ids:
+        return
+    try:
+        stored = await _stored_call_ids(ids)
+        orphaned = [id for id in ids if id not in stored]
+        if orphaned:
+            await call_content_collection.delete_many({"_id": {"$in": orphaned}})
+    except Exception as e:
+        print(f"[General Error] {e}")
+
+async def attach_transcripts(docs: list):
+    """
+    Fill in `transcribe` on split call documents, one query for all of them.
+    """
+    split = {doc["_id"]: doc for doc in docs if doc.get("transcript_storage") == "split"}
+    if not split:
+        return docs
+    async for content in call_content_collection.find({"_id": {"$in": list(split)}}):
+        split[content["_id"]]["transcribe"] = decompress_transcript(content)
+    return docs
+
+async def migrate_call_storage(to: str, batch_size: int = CURSOR_BATCH_SIZE, dry_run: bool = False):
+    """
+    Move existing transcripts to `to` ("split" or "inline") storage in _id
+    order, yielding per-batch stats. Only calls still in the other layout
+    are picked up, so an interrupted migration can simply be run again.
+    """
+    if to == "split":
+        query = {"transcript_storage": {"$ne": "split"}, "transcribe": {"$exists": True}}
+    else:
+        query = {"transcript_storage": "split"}
+
+    last_id = None
+    while True:
+        page = {**query, "_id": {"$gt": last_id}} if last_id else query
+        docs = await calls_collection.find(page, {"transcribe": 1, "transcript_storage": 1, "created_at": 1}) \
+            .sort("_id", 1).limit(batch_size).to_list()
+        if not docs:
+            return
+        last_id = docs[-1]["_id"]
+
+        if to == "inline":
+            # Calls whose content document is missing are left marked split
+            docs = [doc for doc in await attach_transcripts(docs) if "transcribe" in doc]
+        contents = {doc["_id"]: compress_transcript(doc["transcribe"] or "") for doc in docs}
+
+        if docs and not dry_run:
+            if to == "split":
+                await call_content_collection.bulk_write([
+                    UpdateOne({"_id": doc["_id"]}, {"$set": {**contents[doc["_id"]], "created_at": doc.get("created_at")}}, upsert=True)
+                    for doc in docs
+                ], ordered=False)
+                await calls_collection.bulk_write([
+                    UpdateOne({"_id": doc["_id"]}, {
+                        "$unset": {"transcribe": ""},
+                        "$set": {"transcript_storage": "split", "transcript_terms": transcript_terms(doc["transcribe"] or "")}
+                    })
+                    for doc in docs
+                ], ordered=False)
+            else:
+                await calls_collection.bulk_write([
+                    UpdateOne({"_id": doc["_id"]}, {"$set": {"transcribe": doc["transcribe"]}, "$unset": {"transcript_storage": "", "transcript_terms": ""}})
+                    for doc in docs
+                ], ordered=False)
+                await call_content_collection.delete_many({"_id": {"$in": list(contents)}})
+
+        yield {
+            "calls": len(docs),
+            "last_id": str(last_id),
+            "transcript_bytes": sum(content["transcribe_bytes"] for content in contents.values()),
+            "compressed_bytes": sum(len(content["transcribe_zstd"]) for content in contents.values())
+        }
+
+async def get_data_by_id(id: str, fields: list = None):
+    """
+    One call document. `fields` limits it to those top-level fields; the
+    transcript is only read (and decompressed) when "transcribe" is among
+    them or no selection is given.
+    """
+    try:
+        projection = None
+        if fields:
+            projection = {field: 1 for field in fields}
+            if "transcribe" in fields:
+                projection["transcript_storage"] = 1
+        doc = await calls_collection.find_one({"_id": ObjectId(id)}, projection)
         if doc:
+            if not fields or "transcribe" in fields:
+                await attach_transcripts([doc])
+                if fields and "transcript_storage" not in fields:
+                    doc.pop("transcript_storage", None)
+            if not fields or "transcript_terms" not in fields:
+                doc.pop("transcript_terms", None)
             doc["_id"] = str(doc["_id"])
-            doc["agent_id"] = str(doc["agent_id"])
+            if "agent_id" in doc:
+                doc["agent_id"] = str(doc["agent_id"])
         return doc
     except Exception as e:
         print(f"[General Error] {e}")
         return None
     
-def get_all_docs():
+# Rollup counters kept per (agent, bucket, day); see rollup_increments
+ROLLUP_SCORE_FIELDS = [
+    "Greeting_&_Opening",
+    "Objection_Handling",
+    "Urgency_Creation",
+    "Payment_Process_Clarity",
+    "Empathy_&_Tonality",
+    "Call_Management_&_Closing"
+]
+ROLLUP_SENTIMENTS = ["positive", "neutral", "negative"]
+ROLLUP_SENTIMENT_FIELDS = {
+    "sentiment_overall": "Sentiment_overall",
+    "agent_sentiment": "Sentiment_by_speaker.Agent_sentiment",
+    "customer_sentiment": "Sentiment_by_speaker.Customer_sentiment"
+}
+ROLLUP_COUNTERS = (
+    ["calls", "scored_calls", "total_score_sum", "individual_scores_calls", "follow_up_required", "payment_discussed"]
+    + [f"individual_scores.{field}" for field in ROLLUP_SCORE_FIELDS]
+    + [f"{name}.{value}" for name in ROLLUP_SENTIMENT_FIELDS for value in ROLLUP_SENTIMENTS]
+)
+
+def _rollup_day(created_at: datetime) -> str:
+    return created_at.strftime("%Y-%m-%d")
+
+def _analysis_value(analysis: dict, path: str):
+    value = analysis
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+def _is_score(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def rollup_increments(analysis: dict) -> dict:
+    """
+    $inc document adding one call's analysis to its rollup.
+    """
+    analysis = analysis if isinstance(analysis, dict) else {}
+    inc = {
+        "calls": 1,
+        "follow_up_required": 1 if analysis.get("Follow_up_required") is True else 0,
+        "payment_discussed": 1 if analysis.get("Payment_discussed") is True else 0
+    }
+
+    if _is_score(analysis.get("Total_Score")):
+        inc["scored_calls"] = 1
+        inc["total_score_sum"] = analysis["Total_Score"]
+
+    scores = analysis.get("Individual_Scores")
+    if isinstance(scores, dict) and scores:
+        inc["individual_scores_calls"] = 1
+        for field in ROLLUP_SCORE_FIELDS:
+            if _is_score(scores.get(field)):
+                inc[f"individual_scores.{field}"] = scores[field]
+
+    for name, path in ROLLUP_SENTIMENT_FIELDS.items():
+        value = _analysis_value(analysis, path)
+        if value in ROLLUP_SENTIMENTS:
+            inc[f"{name}.{value}"] = 1
+    return inc
+
+async def _fold_agent_rollups(keep: ObjectId, extras: list):
+    """
+    Add the rollups of the `extras` agents onto `keep`'s for the same bucket
+    and day, then delete them.
+    """
+    operations = []
+    async for rollup in rollups_collection.find({"agent_id": {"$in": extras}}):
+        inc = {}
+        for counter in ROLLUP_COUNTERS:
+            value = _analysis_value(rollup, counter)
+            if _is_score(value) and value:
+                inc[counter] = value
+        if inc:
+            operations.append(UpdateOne(
+                {"agent_id": keep, "bucket": rollup["bucket"], "day": rollup["day"]},
+                {"$inc": inc, "$setOnInsert": {"agent_name": rollup.get("agent_name")}},
+                upsert=True
+            ))
+        operations.append(DeleteOne({"_id": rollup["_id"]}))
+    if operations:
+        await rollups_collection.bulk_write(operations, ordered=True)
+
+async def update_rollups(docs: list):
+    """
+    Fold freshly inserted call documents into their (agent, bucket, day)
+    rollups with upserted $inc updates, in one bulk round trip.
+    """
     try:
-        docs_cursor = calls_collection.find(
-            {},
-            {
+        operations = [
+            UpdateOne(
+                {"agent_id": doc["agent_id"], "bucket": doc["bucket"], "day": _rollup_day(doc["created_at"])},
+                {"$inc": rollup_increments(doc.get("analysis")), "$set": {"agent_name": doc["agent_name"]}},
+                upsert=True
+            )
+            for doc in docs
+        ]
+        if operations:
+            await rollups_collection.bulk_write(operations, ordered=False)
+    except Exception as e:
+        print(f"[General Error] {e}")
+
+def _summarize_rollup(totals: dict) -> dict:
+    calls = totals.get("calls", 0)
+    scored = totals.get("scored_calls", 0)
+    with_scores = totals.get("individual_scores_calls", 0)
+    return {
+        "calls": calls,
+        "avg_total_score": round(totals.get("total_score_sum", 0) / scored, 2) if scored else None,
+        "avg_individual_scores": {
+            field: round(totals.get(f"individual_scores.{field}", 0) / with_scores, 2) if with_scores else None
+            for field in ROLLUP_SCORE_FIELDS
+        },
+        **{
+            name: {value: totals.get(f"{name}.{value}", 0) for value in ROLLUP_SENTIMENTS}
+            for name in ROLLUP_SENTIMENT_FIELDS
+        },
+        "follow_up_rate": round(totals.get("follow_up_required", 0) / calls, 4) if calls else None,
+        "payment_discussed_rate": round(totals.get("payment_discussed", 0) / calls, 4) if calls else None
+    }
+
+async def get_rollup_summary(
+    group_by: str,
+    agent_name: str = None,
+    bucket: str = None,
+    date_from: str = None,
+    date_to: str = None
+):
+    """
+    Sum the rollups matching the filters, grouped by "agent", "bucket" or
+    "day". Reads one document per (agent, bucket, day), never the calls.
+    Dates are inclusive YYYY-MM-DD strings.
+    """
+    try:
+        query = {}
+        if agent_name:
+            query["agent_name"] = agent_name.lower()
+        if bucket:
+            query["bucket"] = bucket
+        if date_from or date_to:
+            query["day"] = {}
+            if date_from:
+                query["day"]["$gte"] = date_from
+            if date_to:
+                query["day"]["$lte"] = date_to
+
+        group_key = {"agent": "$agent_id", "bucket": "$bucket", "day": "$day"}[group_by]
+        group = {"_id": group_key, "agent_name": {"$last": "$agent_name"}}
+        for counter in ROLLUP_COUNTERS:
+            group[counter.replace(".", "__")] = {"$sum": f"${counter}"}
+
+        docs_cursor = await rollups_collection.aggregate([
+            {"$match": query},
+            {"$group": group},
+            {"$sort": {"_id": 1}}
+        ])
+
+        summary = []
+        async for doc in docs_cursor:
+            totals = {counter: doc.get(counter.replace(".", "__"), 0) for counter in ROLLUP_COUNTERS}
+            if group_by == "agent":
+                row = {"agent_id": str(doc["_id"]), "agent_name": doc.get("agent_name")}
+            else:
+                row = {group_by: doc["_id"]}
+            summary.append({**row, **_summarize_rollup(totals)})
+        return summary
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+async def rebuild_rollups():
+    """
+    Recompute every rollup from the calls collection with one aggregation,
+    replacing diallo_rollups atomically via $out. Increments landing while
+    it runs are lost, so run it when ingestion is quiet.
+    """
+    group = {
+        "_id": {
+            "agent_id": "$agent_id",
+            "bucket": "$bucket",
+            "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+        },
+        "agent_name": {"$last": "$agent_name"},
+        "calls": {"$sum": 1},
+        "follow_up_required": {"$sum": {"$cond": [{"$eq": ["$analysis.Follow_up_required", True]}, 1, 0]}},
+        "payment_discussed": {"$sum": {"$cond": [{"$eq": ["$analysis.Payment_discussed", True]}, 1, 0]}},
+        "scored_calls": {"$sum": {"$cond": [{"$isNumber": "$analysis.Total_Score"}, 1, 0]}},
+        "total_score_sum": {"$sum": "$analysis.Total_Score"},
+        "individual_scores_calls": {
+            "$sum": {"$cond": [{"$eq": [{"$type": "$analysis.Individual_Scores"}, "object"]}, 1, 0]}
+        },
+    }
+    project = {
+        "_id": 0,
+        "agent_id": "$_id.agent_id",
+        "bucket": "$_id.bucket",
+        "day": "$_id.day",
+        "agent_name": 1,
+        "calls": 1,
+        "follow_up_required": 1,
+        "payment_discussed": 1,
+        "scored_calls": 1,
+        "total_score_sum": 1,
+        "individual_scores_calls": 1,
+        "individual_scores": {},
+    }
+    # Score field names contain "&", so read them with $getField rather than a dotted path
+    for field in ROLLUP_SCORE_FIELDS:
+        alias = f"individual_scores__{field}"
+        group[alias] = {"$sum": {"$getField": {"field": field, "input": "$analysis.Individual_Scores"}}}
+        project["individual_scores"][field] = f"${alias}"
+    for name, path in ROLLUP_SENTIMENT_FIELDS.items():
+        project[name] = {}
+        for value in ROLLUP_SENTIMENTS:
+            alias = f"{name}__{value}"
+            group[alias] = {"$sum": {"$cond": [{"$eq": [f"$analysis.{path}", value]}, 1, 0]}}
+            project[name][value] = f"${alias}"
+
+    try:
+        await calls_collection.aggregate([
+            {"$group": group},
+            {"$project": project},
+            {"$out": rollups_collection.name}
+        ])
+        return await rollups_collection.count_documents({})
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+def encode_cursor(doc: dict) -> str:
+    """
+    Opaque /calls page cursor pointing just past `doc` in (created_at, _id) order.
+    """
+    raw = json.dumps({"created_at": doc["created_at"].isoformat(), "_id": str(doc["_id"])})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str):
+    """
+    Inverse of encode_cursor. Raises ValueError on a malformed cursor.
+    """
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(raw["created_at"]), ObjectId(raw["_id"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def calls_filter(
+    agent_name: str = None,
+    bucket: str = None,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    min_score: int = None,
+    max_score: int = None
+):
+    """
+    Calls query for the /calls-style filters: created_at in
+    [date_from, date_to), i.e. date_to is exclusive, and scores inclusive.
+    """
+    query = {}
+    if agent_name:
+        query["agent_name"] = agent_name.lower()
+    if bucket:
+        query["bucket"] = bucket
+    if date_from or date_to:
+        query["created_at"] = {}
+        if date_from:
+            query["created_at"]["$gte"] = date_from
+        if date_to:
+            query["created_at"]["$lt"] = date_to
+    if min_score is not None or max_score is not None:
+        query["analysis.Total_Score"] = {}
+        if min_score is not None:
+            query["analysis.Total_Score"]["$gte"] = min_score
+        if max_score is not None:
+            query["analysis.Total_Score"]["$lte"] = max_score
+    return query
+
+async def iter_calls(limit: int = None, after: tuple = None, batch_size: int = CURSOR_BATCH_SIZE, **filters):
+    """
+    Yield call listing rows, newest first, straight from the cursor.
+    `after` is a decoded cursor (created_at, _id) to continue from;
+    `filters` are the keyword arguments of calls_filter.
+    """
+    query = calls_filter(**filters)
+    if after:
+        created_at, _id = after
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": _id}}
+        ]}]}
+
+    docs_cursor = calls_collection.find(
+        query,
+        {
+            "agent_name": 1,
+            "patient_name": 1,
+            "agent_phone_number": 1,
+            "created_at": 1,
+            "bucket": 1
+        },
+        batch_size=batch_size
+    ).sort([("created_at", -1), ("_id", -1)])
+    if limit:
+        docs_cursor = docs_cursor.limit(limit)
+
+    async for doc in docs_cursor:
+        yield {
+            "_id": str(doc["_id"]),
+            "agent_name": doc.get("agent_name"),
+            "patient_name": doc.get("patient_name"),
+            "agent_phone_number": doc.get("agent_phone_number"),
+            "created_at": doc.get("created_at"),
+            "bucket": doc.get("bucket"),
+        }
+
+async def get_all_docs(limit: int = None, after: tuple = None, **filters):
+    """
+    Call listing as a list; see iter_calls for the arguments.
+    """
+    try:
+        return [doc async for doc in iter_calls(limit=limit, after=after, **filters)]
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+def encode_search_cursor(doc: dict) -> str:
+    """
+    Opaque /search page cursor pointing just past `doc` in (score, _id) order.
+    """
+    raw = json.dumps({"score": doc["score"], "_id": doc["_id"]})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_search_cursor(cursor: str):
+    """
+    Inverse of encode_search_cursor. Raises ValueError on a malformed cursor.
+    """
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(raw["score"]), ObjectId(raw["_id"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+async def search_calls(query: str, limit: int, after: tuple = None, **filters):
+    """
+    Calls matching `query` on the text index, best match first. The query
+    uses $text syntax: words match any of them, "quoted phrases" and
+    -excluded words are supported. `after` is a decoded search cursor;
+    `filters` are the keyword arguments of calls_filter.
+    """
+    try:
+        match = {"$text": {"$search": unicodedata.normalize("NFC", query)}, **calls_filter(**filters)}
+        pipeline = [
+            {"$match": match},
+            {"$addFields": {"score": {"$meta": "textScore"}}}
+        ]
+        if after:
+            score, _id = after
+            pipeline.append({"$match": {"$or": [
+                {"score": {"$lt": score}},
+                {"score": score, "_id": {"$lt": _id}}
+            ]}})
+        pipeline += [
+            {"$sort": {"score": -1, "_id": -1}},
+            {"$limit": limit},
+            {"$project": {
                 "agent_name": 1,
                 "patient_name": 1,
                 "agent_phone_number": 1,
                 "created_at": 1,
-                "bucket": 1
-            }
-        ).sort("created_at", -1)
+                "bucket": 1,
+                "score": 1,
+                "analysis.Call_summary": 1,
+                "analysis.Unresolved_issues": 1,
+                "analysis.Total_Score": 1
+            }}
+        ]
+
+        docs_cursor = await calls_collection.aggregate(pipeline)
+        docs = []
+        async for doc in docs_cursor:
+            doc["_id"] = str(doc["_id"])
+            docs.append(doc)
+        return docs
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+async def iter_agent_names(batch_size: int = CURSOR_BATCH_SIZE):
+    docs_cursor = agents_collection.find({}, {"_id": 0, "name": 1}, batch_size=batch_size)
+    async for doc in docs_cursor:
+        yield doc.get("name", "")
 
-        docs_list = []
-        for doc in docs_cursor:
-            docs_list.append({
-                "_id": str(doc["_id"]),
-                "agent_name": doc.get("agent_name"),
-                "patient_name": doc.get("patient_name"),
-                "agent_phone_number": doc.get("agent_phone_number"),
-                "created_at": doc.get("created_at"),
-                "bucket": doc.get("bucket"),
-            })
+async def ensure_indexes():
+    """
+    Create the indexes the API queries rely on. Safe to run on every startup.
+    """
+    try:
+        # /calls: keyset pagination, alone or after an equality filter
+        await calls_collection.create_index([("created_at", -1), ("_id", -1)])
+        await calls_collection.create_index([("agent_name", 1), ("created_at", -1), ("_id", -1)])
+        await calls_collection.create_index([("bucket", 1), ("created_at", -1), ("_id", -1)])
+        await calls_collection.create_index([("agent_name", 1), ("bucket", 1), ("created_at", -1), ("_id", -1)])
+        # min_score/max_score: the score range goes after the sort keys (equality,
+        # sort, range), so pages still come off the index in order and
+        # out-of-range calls are skipped on index keys, without a fetch
+        await calls_collection.create_index([("created_at", -1), ("_id", -1), ("analysis.Total_Score", 1)])
+        await calls_collection.create_index([("bucket", 1), ("created_at", -1), ("_id", -1), ("analysis.Total_Score", 1)])
+        await jobs_collection.create_index([("status", 1), ("created_at", 1)])
+        # /analytics: one rollup document per agent, bucket and day
+        await rollups_collection.create_index([("agent_id", 1), ("bucket", 1), ("day", 1)], unique=True)
+        await rollups_collection.create_index([("bucket", 1), ("day", 1)])
+        await rollups_collection.create_index([("day", 1)])
+        await analysis_history_collection.create_index([("call_id", 1), ("version", 1)], unique=True)
+        await reanalysis_runs_collection.create_index([("status", 1), ("created_at", -1)])
+    except Exception as e:
+        print(f"[General Error] {e}")
+
+    try:
+        # /search; language_override points at a field calls never have, so
+        # no document can switch the index to a language Mongo rejects
+        await calls_collection.create_index(
+            [(field, "text") for field in SEARCH_INDEX_WEIGHTS],
+            name=SEARCH_INDEX_NAME,
+            weights=SEARCH_INDEX_WEIGHTS,
+            default_language="none",
+            language_override="search_language"
+        )
+    except Exception as e:
+        print(f"[General Error] {e}")
+
+    try:
+        try:
+            await agents_collection.create_index("name", unique=True)
+        except errors.OperationFailure as e:
+            if e.code != 11000:
+                raise
+            await merge_duplicate_agents()
+            await agents_collection.create_index("name", unique=True)
+    except Exception as e:
+        print(f"[General Error] {e}")
+
+async def create_reanalysis_run(filters: dict, settings: dict):
+    """
+    Record a re-analysis run over the calls matching `filters` (keyword
+    arguments of calls_filter). Its checkpoint starts before the oldest call.
+    """
+    try:
+        now = datetime.now()
+        result = await reanalysis_runs_collection.insert_one({
+            "status": "created",
+            "filters": filters,
+            "settings": settings,
+            "checkpoint": None,
+            "counts": {"analyzed": 0, "skipped": 0, "failed": 0},
+            "failed_ids": [],
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        })
+        return str(result.inserted_id)
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+async def get_reanalysis_run(run_id: str):
+    try:
+        run = await reanalysis_runs_collection.find_one({"_id": ObjectId(run_id)})
+        if run:
+            run["_id"] = str(run["_id"])
+            run["failed_ids"] = [str(_id) for _id in run["failed_ids"]]
+            if run["checkpoint"]:
+                run["checkpoint"]["_id"] = str(run["checkpoint"]["_id"])
+        return run
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+async def update_reanalysis_run(run_id: str, **fields):
+    try:
+        fields["updated_at"] = datetime.now()
+        await reanalysis_runs_collection.update_one({"_id": ObjectId(run_id)}, {"$set": fields})
+    except Exception as e:
+        print(f"[General Error] {e}")
+
+async def checkpoint_reanalysis_run(run_id: str, last_doc: dict, counts: dict, failed_ids: list):
+    """
+    Move the run's checkpoint past `last_doc` and add this batch's counts.
+    """
+    await reanalysis_runs_collection.update_one(
+        {"_id": ObjectId(run_id)},
+        {
+            "$set": {"checkpoint": {"created_at": last_doc["created_at"], "_id": last_doc["_id"]}, "updated_at": datetime.now()},
+            "$inc": {f"counts.{name}": value for name, value in counts.items()},
+            # Keep the most recent failures only; the counts hold the totals
+            "$push": {"failed_ids": {"$each": failed_ids, "$slice": -1000}}
+        }
+    )
+
+async def iter_reanalysis_calls(after: dict = None, batch_size: int = CURSOR_BATCH_SIZE, **filters):
+    """
+    Yield the calls to re-analyze, oldest first, with what re-analysis needs.
+    `after` is a run checkpoint ({"created_at", "_id"}) to continue from.
+    """
+    query = calls_filter(**filters)
+    if after:
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$gt": after["created_at"]}},
+            {"created_at": after["created_at"], "_id": {"$gt": ObjectId(after["_id"])}}
+        ]}]}
+
+    docs_cursor = calls_collection.find(
+        query,
+        {
+            "agent_id": 1,
+            "agent_name": 1,
+            "bucket": 1,
+            "transcribe": 1,
+            "transcript_storage": 1,
+            "analysis": 1,
+            "analysis_version": 1,
+            "analysis_model": 1,
+            "analysis_prompt_sha256": 1,
+            "analyzed_at": 1,
+            "created_at": 1
+        },
+        batch_size=batch_size
+    ).sort([("created_at", 1), ("_id", 1)])
+
+    batch = []
+    async for doc in docs_cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            for doc in await attach_transcripts(batch):
+                yield doc
+            batch = []
+    for doc in await attach_transcripts(batch):
+        yield doc
+
+async def save_reanalysis(results: list, run_id: str):
+    """
+    Store new analyses for calls from iter_reanalysis_calls, in bulk writes
+    per batch:
+
+    - history: the previous analysis is archived under its version (kept if
+      already there);
+    - calls: `analysis` replaced and `analysis_version` bumped, guarded on
+      the version that was read;
+    - for the calls that update applied to, the new analysis is written to
+      history under the next version and the difference between old and new
+      analysis is applied to the rollups.
 
-        return docs_list
+    A call whose version moved on meanwhile (a concurrent re-analysis won)
+    gets neither a history entry nor a rollup change. Each entry of
+    `results` is {"doc", "analysis", "model", "prompt_sha256"}. Returns the
+    ids of the calls updated. If a run dies before the last writes, the
+    call keeps its new analysis, the next re-analysis archives it, and
+    rebuild_rollups.py fixes the rollups.
+    """
+    if not results:
+        return set()
+    now = datetime.now()
+    archive_ops, call_ops = [], []
+    for result in results:
+        doc = result["doc"]
+        version = doc.get("analysis_version") or 1
+        archive_ops.append(UpdateOne(
+            {"call_id": doc["_id"], "version": version},
+            {"$setOnInsert": {
+                "analysis": doc.get("analysis"),
+                "model": doc.get("analysis_model"),
+                "prompt_sha256": doc.get("analysis_prompt_sha256"),
+                "created_at": doc.get("analyzed_at") or doc["created_at"]
+            }},
+            upsert=True
+        ))
 
+        current = {"analysis_version": version} if doc.get("analysis_version") else {"analysis_version": {"$exists": False}}
+        call_ops.append(UpdateOne(
+            {"_id": doc["_id"], **current},
+            {"$set": {
+                "analysis": result["analysis"],
+                "analysis_version": version + 1,
+                "analysis_model": result["model"],
+                "analysis_prompt_sha256": result["prompt_sha256"],
+                "analyzed_at": now
+            }}
+        ))
+
+    await analysis_history_collection.bulk_write(archive_ops, ordered=False)
+    written = await calls_collection.bulk_write(call_ops, ordered=False)
+    ids = [result["doc"]["_id"] for result in results]
+    if written.matched_count == len(call_ops):
+        applied = set(ids)
+    else:
+        # Some guards missed; the calls this batch updated carry its analyzed_at
+        docs_cursor = calls_collection.find({"_id": {"$in": ids}, "analyzed_at": now}, {"_id": 1})
+        applied = {doc["_id"] async for doc in docs_cursor}
+
+    history_ops, rollup_ops = [], []
+    for result in results:
+        doc = result["doc"]
+        if doc["_id"] not in applied:
+            continue
+        version = doc.get("analysis_version") or 1
+        history_ops.append(UpdateOne(
+            {"call_id": doc["_id"], "version": version + 1},
+            {"$set": {
+                "analysis": result["analysis"],
+                "model": result["model"],
+                "prompt_sha256": result["prompt_sha256"],
+                "run_id": ObjectId(run_id),
+                "created_at": now
+            }},
+            upsert=True
+        ))
+
+        old, new = rollup_increments(doc.get("analysis")), rollup_increments(result["analysis"])
+        delta = {key: new.get(key, 0) - old.get(key, 0) for key in set(old) | set(new)}
+        delta = {key: value for key, value in delta.items() if value}
+        if delta:
+            rollup_ops.append(UpdateOne(
+                {"agent_id": doc["agent_id"], "bucket": doc["bucket"], "day": _rollup_day(doc["created_at"])},
+                {"$inc": delta, "$set": {"agent_name": doc["agent_name"]}},
+                upsert=True
+            ))
+
+    if history_ops:
+        await analysis_history_collection.bulk_write(history_ops, ordered=False)
+    if rollup_ops:
+        await rollups_collection.bulk_write(rollup_ops, ordered=False)
+    return applied
+
+async def get_analysis_history(call_id: str):
+    """
+    Every stored analysis version of a call, oldest first.
+    """
+    try:
+        docs_cursor = analysis_history_collection.find({"call_id": ObjectId(call_id)}, {"_id": 0}).sort("version", 1)
+        history = []
+        async for doc in docs_cursor:
+            doc["call_id"] = str(doc["call_id"])
+            if doc.get("run_id"):
+                doc["run_id"] = str(doc["run_id"])
+            history.append(doc)
+        return history
     except Exception as e:
         print(f"[General Error] {e}")
-        return None
\ No newline at end of file
+        return None
+
+async def create_job(audio: bytes, ext: str, metadata: dict):
+    """
+    Persist an uploaded recording and its form fields as a queued job.
+    The audio goes to GridFS so the job can be replayed after a restart.
+    """
+    try:
+        audio_id = await job_audio_fs.put(audio, filename=f"job_audio.{ext}")
+        now = datetime.now()
+        result = await jobs_collection.insert_one({
+            "status": "queued",
+            "ext": ext,
+            "audio_id": audio_id,
+            "metadata": metadata,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        })
+        return str(result.inserted_id)
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+async def update_job(job_id: str, **fields):
+    try:
+        fields["updated_at"] = datetime.now()
+        await jobs_collection.update_one({"_id": ObjectId(job_id)}, {"$set": fields})
+    except Exception as e:
+        print(f"[General Error] {e}")
+
+async def claim_job(job_id: str):
+    """
+    Atomically move a queued job to running so only one worker picks it up.
+    Returns the job document, or None if another worker already claimed it.
+    Storage errors are raised so the job can be retried instead of dropped.
+    """
+    return await jobs_collection.find_one_and_update(
+        {"_id": ObjectId(job_id), "status": "queued"},
+        {"$set": {"status": "running", "worker_pid": os.getpid(), "updated_at": datetime.now()}},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def get_job(job_id: str):
+    try:
+        job = await jobs_collection.find_one({"_id": ObjectId(job_id)}, {"metadata": 0})
+        if job:
+            job["_id"] = str(job["_id"])
+            job.pop("audio_id", None)
+        return job
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+async def load_job_audio(audio_id):
+    try:
+        return await (await job_audio_fs.get(audio_id)).read()
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+async def delete_job_audio(job_id: str, audio_id):
+    try:
+        await job_audio_fs.delete(audio_id)
+        await jobs_collection.update_one({"_id": ObjectId(job_id)}, {"$unset": {"audio_id": ""}})
+    except Exception as e:
+        print(f"[General Error] {e}")
+
+async def requeue_stale_jobs(lease_seconds: int):
+    """
+    Reset jobs whose worker stopped heartbeating for `lease_seconds` back to
+    queued and return their ids.
+    """
+    try:
+        stale = {
+            "status": {"$nin": JOB_FINAL_STATUSES + ["queued"]},
+            "updated_at": {"$lt": datetime.now() - timedelta(seconds=lease_seconds)}
+        }
+        ids = [doc["_id"] async for doc in jobs_collection.find(stale, {"_id": 1})]
+        if ids:
+            await jobs_collection.update_many(
+                {**stale, "_id": {"$in": ids}},
+                {"$set": {"status": "queued", "updated_at": datetime.now()}}
+            )
+        return [str(id) for id in ids]
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return []
+
+async def queued_job_ids():
+    """
+    Ids of every job waiting to run, oldest first.
+    """
+    try:
+        docs_cursor = jobs_collection.find({"status": "queued"}, {"_id": 1}).sort("created_at", 1)
+        return [str(doc["_id"]) async for doc in docs_cursor]
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return []
+
+async def _get_cached(collection, key: str, field: str):
+    try:
+        doc = await collection.find_one({"_id": key}, {field: 1})
+        return doc[field] if doc else None
+    except Exception as e:
+        print(f"[General Error] {e}")
+        return None
+
+async def _save_cached(collection, key: str, field: str, value, metadata: dict):
+    try:
+        await collection.update_one(
+            {"_id": key},
+            {"$set": {field: value, **metadata, "created_at": datetime.now()}},
+            upsert=True
+        )
+    except Exception as e:
+        print(f"[General Error] {e}")
+
+async def get_cached_transcript(key: str):
+    return await _get_cached(transcript_cache_collection, key, "transcript")
+
+async def save_cached_transcript(key: str, transcript: str, metadata: dict):
+    await _save_cached(transcript_cache_collection, key, "transcript", transcript, metadata)
+
+async def get_cached_analysis(key: str):
+    return await _get_cached(analysis_cache_collection, key, "analysis")
+
+async def save_cached_analysis(key: str, analysis: dict, metadata: dict):
+    await _save_cached(analysis_cache_collection, key, "analysis", analysis, metadata)
+
+# Blocking versions of the original data-layer entry points, same signatures,
+# for scripts and other sync callers. They run the coroutines on a private
+# event loop thread (the async client is bound to the loop it first runs
+# on), so don't mix them with the coroutines in one process, and never call
+# them from async code.
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+def _run_sync(coro):
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="mongo-sync", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _sync_loop).result()
+
+def list_agents_sync():
+    return _run_sync(list_agents())
+
+def get_or_create_agent_sync(agent_name: str):
+    return _run_sync(get_or_create_agent(agent_name))
+
+def update_data_sync(
+    agent_name: str,
+    agent_id: str,
+    bucket: str,
+    patient_name: str,
+    agent_phone_number: str,
+    analystics: str,
+    transcribe: str,
+    analysis_model: str = None,
+    analysis_prompt_sha256: str = None
+):
+    return _run_sync(update_data(
+        agent_name=agent_name,
+        agent_id=agent_id,
+        bucket=bucket,
+        patient_name=patient_name,
+        agent_phone_number=agent_phone_number,
+        analystics=analystics,
+        transcribe=transcribe,
+        analysis_model=analysis_model,
+        analysis_prompt_sha256=analysis_prompt_sha256
+    ))
+
+def get_data_by_id_sync(id: str, fields: list = None):
+    return _run_sync(get_data_by_id(id, fields))
+
+def get_all_docs_sync(limit: int = None, after: tuple = None, **filters):
+    return _run_sync(get_all_docs(limit=limit, after=after, **filters))
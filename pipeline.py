@@ -0,0 +1,317 @@
+from get_transcribe import (
+    transcribe_audio, transcribe_audio_openai, transcribe_audio_deepgram,
+    GROQ_MODEL, OPENAI_TRANSCRIBE_MODEL, DEEPGRAM_MODEL, DEEPGRAM_OPTIONS
+)
+from long_audio import plan_chunks, transcribe_chunks, LONG_AUDIO_MODE, LONG_AUDIO_SETTINGS
+from get_analysis import get_call_analysis, analysis_prompt_hash, ANALYSIS_MODEL
+from transcript_compaction import compact_transcript, ensure_encoding, TRANSCRIPT_COMPACTION, COMPACTION_SETTINGS
+from mongo_utils import (
+    update_data, get_or_create_agent,
+    get_cached_transcript, save_cached_transcript, get_cached_analysis, save_cached_analysis
+)
+from audio_utils import (
+    transcode, hash_chunks, normalize_audio, invalid_audio, InvalidAudio, NORMALIZE_SAMPLE_RATE, NORMALIZE_BITRATE_KBPS
+)
+from cache_utils import ResultCache, make_key
+from provider_router import ProviderRouter
+from metrics import track_call, stage, record_transcript_tokens
+import inspect, os, subprocess, time, unicodedata
+
+transcript_cache = ResultCache(
+    "transcript",
+    load=get_cached_transcript,
+    save=save_cached_transcript,
+    lru_size=int(os.getenv("TRANSCRIPT_CACHE_LRU_SIZE", "256"))
+)
+analysis_cache = ResultCache(
+    "analysis",
+    load=get_cached_analysis,
+    save=save_cached_analysis,
+    lru_size=int(os.getenv("ANALYSIS_CACHE_LRU_SIZE", "256"))
+)
+
+
+TRANSCRIBE_FUNCTIONS = {
+    "groq": transcribe_audio,
+    "openai": transcribe_audio_openai,
+    "deepgram": transcribe_audio_deepgram
+}
+# Providers whose long recordings are split at silences and sent as chunks (see long_audio)
+CHUNKED_PROVIDERS = {"deepgram"} if LONG_AUDIO_MODE else set()
+# Model and options per provider; part of the transcript cache key
+TRANSCRIBE_SETTINGS = {
+    "groq": (GROQ_MODEL, {}),
+    "openai": (OPENAI_TRANSCRIBE_MODEL, {}),
+    "deepgram": (DEEPGRAM_MODEL, {**DEEPGRAM_OPTIONS, **LONG_AUDIO_SETTINGS} if LONG_AUDIO_MODE else DEEPGRAM_OPTIONS)
+}
+
+# Codec each provider's audio is normalized to before upload (see audio_utils.NORMALIZE_CODECS); "off" sends it as transcoded
+AUDIO_NORMALIZE = {
+    provider: os.getenv(f"AUDIO_NORMALIZE_{provider.upper()}", "opus") for provider in TRANSCRIBE_FUNCTIONS
+}
+# Bytes before/after normalization and time spent per provider; request time covers upload and recognition
+upload_stats = {
+    provider: {"requests": 0, "normalized": 0, "bytes_in": 0, "bytes_sent": 0, "normalize_seconds": 0.0, "request_seconds": 0.0}
+    for provider in TRANSCRIBE_FUNCTIONS
+}
+
+
+async def prepare_uploads(audio: bytes, ext: str, providers: list) -> dict:
+    """
+    Normalize the audio once per codec among `providers`, and split it for
+    CHUNKED_PROVIDERS, before routing. Retries and hedges reuse the result,
+    and an undecodable upload raises InvalidAudio here instead of counting
+    against every provider's health.
+    Returns provider -> `(audio, ext, chunks)`; `chunks` is empty when the
+    recording goes out in one request.
+    """
+    by_codec, chunks_by_codec, uploads = {}, {}, {}
+    try:
+        for provider in providers:
+            codec = AUDIO_NORMALIZE[provider]
+            if codec not in by_codec:
+                start = time.perf_counter()
+                with stage("normalize"):
+                    by_codec[codec] = await normalize_audio(audio, ext, codec)
+                upload_stats[provider]["normalize_seconds"] += time.perf_counter() - start
+            data, data_ext = by_codec[codec]
+            chunks = []
+            if provider in CHUNKED_PROVIDERS:
+                if codec not in chunks_by_codec:
+                    with stage("split"):
+                        chunks_by_codec[codec] = await plan_chunks(data, data_ext)
+                chunks = chunks_by_codec[codec]
+            uploads[provider] = (data, data_ext, chunks)
+    except subprocess.CalledProcessError as e:
+        raise invalid_audio(e) from e
+    return uploads
+
+
+async def upload_normalized(provider: str, audio: bytes, uploads: dict):
+    """
+    Send the audio prepared for `provider`, recording upload stats.
+    """
+    stats = upload_stats[provider]
+    data, data_ext, chunks = uploads[provider]
+    sent = time.perf_counter()
+    try:
+        if chunks:
+            return (await transcribe_chunks(chunks, data_ext, TRANSCRIBE_SETTINGS[provider][0]))["transcript"]
+        return await TRANSCRIBE_FUNCTIONS[provider](data, data_ext)
+    finally:
+        stats["requests"] += 1
+        stats["normalized"] += 1 if data is not audio else 0
+        stats["bytes_in"] += len(audio)
+        stats["bytes_sent"] += len(data)
+        stats["request_seconds"] += time.perf_counter() - sent
+
+
+def upload_snapshot(provider: str):
+    stats = upload_stats[provider]
+    return {
+        **stats,
+        "normalize_seconds": round(stats["normalize_seconds"], 3),
+        "request_seconds": round(stats["request_seconds"], 3),
+        "codec": AUDIO_NORMALIZE[provider],
+        "bytes_saved_ratio": round(1 - stats["bytes_sent"] / stats["bytes_in"], 4) if stats["bytes_in"] else None
+    }
+
+
+def transcript_key(provider: str, audio_hash: str) -> str:
+    model, options = TRANSCRIBE_SETTINGS[provider]
+    normalize = [AUDIO_NORMALIZE[provider], NORMALIZE_SAMPLE_RATE, NORMALIZE_BITRATE_KBPS]
+    return make_key(audio_hash, provider, model, options, normalize)
+
+
+def _cached_transcriber(provider: str):
+    """
+    Wrap a provider so its transcripts are memoized on the uploaded bytes,
+    model, options and normalization. Identical uploads in flight share one
+    provider call.
+    """
+    async def transcribe(audio: bytes, uploads: dict, audio_hash: str = None):
+        if not audio_hash:
+            return await upload_normalized(provider, audio, uploads)
+
+        return await transcript_cache.get_or_compute(
+            transcript_key(provider, audio_hash),
+            lambda: upload_normalized(provider, audio, uploads),
+            meta={"audio_sha256": audio_hash, "provider": provider, "model": TRANSCRIBE_SETTINGS[provider][0]}
+        )
+    return transcribe
+
+
+transcribe_router = ProviderRouter(
+    {provider: _cached_transcriber(provider) for provider in TRANSCRIBE_FUNCTIONS},
+    order=os.getenv("TRANSCRIBE_PROVIDER_ORDER", "deepgram,groq,openai").split(",")
+)
+
+
+async def transcribe_routed(audio: bytes, ext: str, audio_hash: str = None, provider: str = None):
+    """
+    Transcribe through the provider router. Returns `(transcript, provider)`.
+    A cached transcript from the first-choice provider is returned before
+    any normalization; otherwise the audio is prepared once for every
+    candidate (see prepare_uploads) and only the provider requests run
+    under the router.
+    """
+    if provider and provider not in TRANSCRIBE_FUNCTIONS:
+        raise ValueError(f"Unknown provider: {provider}")
+    candidates = [provider] if provider else transcribe_router.ranked()
+    if audio_hash:
+        cached = await transcript_cache.peek(transcript_key(candidates[0], audio_hash))
+        if cached:
+            return cached, candidates[0]
+
+    uploads = await prepare_uploads(audio, ext, candidates)
+    return await transcribe_router.call(audio, uploads, audio_hash=audio_hash, provider=provider)
+
+
+def normalize_transcript(transcript: str) -> str:
+    """
+    Canonical form used for cache keys: NFC Unicode (Devanagari has several
+    encodings for the same text) and whitespace collapsed within each line.
+    """
+    text = unicodedata.normalize("NFC", transcript)
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def analysis_metadata(bucket: str) -> dict:
+    """
+    Model and prompt fingerprint stored next to an analysis, so re-analysis
+    can tell which calls are already current.
+    """
+    return {"analysis_model": ANALYSIS_MODEL, "analysis_prompt_sha256": analysis_prompt_hash(bucket)}
+
+
+async def analyze_cached(transcription: str, bucket: str, force: bool = False):
+    """
+    LLM analysis memoized on the normalized transcript, bucket, prompt +
+    schema fingerprint, model and compaction settings. Editing a bucket
+    prompt or the schema changes the fingerprint, so stale entries are never
+    served. The transcript is compacted (see transcript_compaction) before
+    it is sent. `force` skips the cache and replaces its entry.
+    """
+    analysis_input = transcription
+    if TRANSCRIPT_COMPACTION:
+        await ensure_encoding()
+        with stage("compact"):
+            analysis_input, stats = compact_transcript(transcription)
+        record_transcript_tokens(stats["tokens_before"], stats["tokens_after"])
+
+    transcript_hash = make_key(normalize_transcript(transcription))
+    prompt_hash = analysis_prompt_hash(bucket)
+    key = make_key(transcript_hash, bucket, prompt_hash, ANALYSIS_MODEL, COMPACTION_SETTINGS)
+    lookup = analysis_cache.refresh if force else analysis_cache.get_or_compute
+    return await lookup(
+        key,
+        lambda: get_call_analysis(transcribe=analysis_input, bucket=bucket),
+        meta={"transcript_sha256": transcript_hash, "bucket": bucket, "prompt_sha256": prompt_hash, "model": ANALYSIS_MODEL}
+    )
+
+
+async def _notify(callback, *args):
+    if callback:
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            await result
+
+
+async def run_stages(open_chunks, ext: str, bucket: str, on_stage=None, provider: str = None, on_result=None):
+    """
+    Transcode → transcribe → analysis for one recording, without storing it.
+    Returns `(transcription, analysis)`; analysis is None when there is no
+    transcript to analyze.
+    """
+    await _notify(on_stage, "transcoding")
+    open_chunks, audio_hash = hash_chunks(open_chunks)
+    try:
+        with stage("transcode"):
+            audio, ext = await transcode(open_chunks, ext)
+    except subprocess.CalledProcessError as e:
+        raise invalid_audio(e) from e
+    await _notify(on_result, "transcoded", {"bytes": len(audio), "format": ext})
+
+    await _notify(on_stage, "transcribing")
+    with stage("transcribe"):
+        transcription, provider = await transcribe_routed(audio, ext, audio_hash(), provider)
+    if not transcription:
+        return transcription, None
+    await _notify(on_result, "transcribed", {"transcript": transcription, "provider": provider})
+
+    await _notify(on_stage, "analyzing")
+    with stage("analyze"):
+        analysis = await analyze_cached(transcription, bucket)
+    if analysis:
+        await _notify(on_result, "analyzed", analysis)
+    return transcription, analysis
+
+
+async def process_call(
+    open_chunks,
+    ext: str,
+    bucket: str,
+    agent_name: str,
+    patient_name: str,
+    agent_phone_number: str,
+    on_stage=None,
+    provider: str = None,
+    on_result=None
+):
+    """
+    Run the full transcode → transcribe → analysis → store pipeline for one
+    uploaded recording. `open_chunks` returns a fresh async iterator over the
+    upload (see audio_utils.transcode).
+    `on_stage` is called with the name of each stage as it starts, and
+    `on_result` with `(event, data)` as each one finishes: "transcoded",
+    "transcribed" (transcript and provider), "analyzed" (the analysis) and
+    "stored" (the call id).
+    `provider` pins transcription to one of TRANSCRIBE_FUNCTIONS.
+    Raises InvalidAudio when the upload cannot be decoded.
+    """
+    with track_call(bucket) as call:
+        call["status"] = "failed"
+        try:
+            with stage("agent_lookup"):
+                agent_id = await get_or_create_agent(agent_name=agent_name)
+
+            transcription, analysis = await run_stages(open_chunks, ext, bucket, on_stage, provider, on_result)
+
+            if transcription and analysis:
+                await _notify(on_stage, "storing")
+                with stage("store"):
+                    id = await update_data(
+                        agent_name=agent_name,
+                        agent_id=agent_id,
+                        bucket=bucket,
+                        patient_name=patient_name,
+                        agent_phone_number=agent_phone_number,
+                        analystics=analysis,
+                        transcribe=transcription,
+                        **analysis_metadata(bucket)
+                    )
+                await _notify(on_result, "stored", {"id": id})
+
+                call["status"] = "ok"
+                return {
+                    "success": True,
+                    "response": id,
+                    "analysis": analysis
+                }
+
+            return {
+                "success": False,
+                "response": "Error Processing Data."
+            }
+
+        except InvalidAudio:
+            # The caller answers this as a client error
+            call["status"] = "invalid"
+            raise
+        except Exception as e:
+            call["status"] = "error"
+            return {
+                "success": False,
+                "response": str(e)
+            }
@@ -0,0 +1,187 @@
+from collections import deque
+import asyncio, os, random, time
+
+# Rolling window of recent calls kept per provider
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "100"))
+# Attempts per provider before failing over to the next one
+ROUTER_RETRIES = int(os.getenv("ROUTER_RETRIES", "2"))
+ROUTER_BACKOFF_SECONDS = float(os.getenv("ROUTER_BACKOFF_SECONDS", "0.5"))
+# Consecutive failures that open a provider's circuit, and how long it stays open
+ROUTER_BREAKER_THRESHOLD = int(os.getenv("ROUTER_BREAKER_THRESHOLD", "5"))
+ROUTER_BREAKER_COOLDOWN = float(os.getenv("ROUTER_BREAKER_COOLDOWN", "30"))
+# "priority" keeps the configured order; "latency" prefers the fastest healthy provider
+ROUTER_STRATEGY = os.getenv("ROUTER_STRATEGY", "priority")
+ROUTER_HEDGE = os.getenv("ROUTER_HEDGE", "0") == "1"
+# Hedge delay used until a provider has enough samples for a p95
+ROUTER_HEDGE_DEFAULT_DELAY = float(os.getenv("ROUTER_HEDGE_DEFAULT_DELAY", "30"))
+ROUTER_MIN_SAMPLES = 20
+
+
+class ProviderUnavailable(Exception):
+    pass
+
+
+class ProviderHealth:
+    """
+    Rolling latency/error window and circuit breaker for one provider.
+    """
+
+    def __init__(self, window: int):
+        self.calls = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+
+    def record(self, latency: float, ok: bool):
+        self.calls.append((latency, ok))
+        if ok:
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+        else:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= ROUTER_BREAKER_THRESHOLD:
+                self.open_until = time.monotonic() + ROUTER_BREAKER_COOLDOWN
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.open_until == 0.0:
+            return "closed"
+        if time.monotonic() < self.open_until:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def latency_percentile(self, q: float):
+        latencies = sorted(latency for latency, ok in self.calls if ok)
+        if len(latencies) < ROUTER_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, ok in self.calls if not ok) / len(self.calls)
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "calls": len(self.calls),
+            "error_rate": round(self.error_rate(), 4),
+            "p50_seconds": self.latency_percentile(0.5),
+            "p95_seconds": self.latency_percentile(0.95),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class ProviderRouter:
+    """
+    Route a call across interchangeable async providers with retries,
+    failover, circuit breaking and optional hedging.
+
+    `providers` maps a name to an async callable; all of them must accept the
+    same arguments. `order` is the preference order used by the "priority"
+    strategy and as the tie-breaker for "latency".
+    """
+
+    def __init__(self, providers: dict, order: list = None, strategy: str = ROUTER_STRATEGY, hedge: bool = ROUTER_HEDGE):
+        self.providers = providers
+        self.order = [name for name in (order or list(providers)) if name in providers]
+        self.strategy = strategy
+        self.hedge = hedge
+        self.health = {name: ProviderHealth(ROUTER_WINDOW) for name in providers}
+
+    def ranked(self) -> list:
+        if self.strategy != "latency":
+            return list(self.order)
+
+        def score(name):
+            health = self.health[name]
+            p50 = health.latency_percentile(0.5)
+            return (p50 if p50 is not None else 0.0) * (1 + 4 * health.error_rate())
+
+        return sorted(self.order, key=lambda name: (score(name), self.order.index(name)))
+
+    async def _call(self, name: str, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            result = await self.providers[name](*args, **kwargs)
+        except asyncio.CancelledError:
+            self.health[name].trial_in_flight = False
+            raise
+        except Exception:
+            self.health[name].record(time.monotonic() - start, ok=False)
+            raise
+        self.health[name].record(time.monotonic() - start, ok=True)
+        return result
+
+    async def _call_with_retries(self, name: str, *args, **kwargs):
+        last_error = None
+        for attempt in range(ROUTER_RETRIES):
+            if not self.health[name].allow():
+                raise ProviderUnavailable(f"{name} circuit is open")
+            try:
+                return await self._call(name, *args, **kwargs)
+            except Exception as e:
+                last_error = e
+                print(f"[Router] {name} attempt {attempt + 1} failed: {e}")
+                if attempt + 1 < ROUTER_RETRIES:
+                    await asyncio.sleep(ROUTER_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random()))
+        raise last_error
+
+    async def _hedged(self, primary: str, secondary: str, *args, **kwargs):
+        p95 = self.health[primary].latency_percentile(0.95)
+        delay = p95 if p95 is not None else ROUTER_HEDGE_DEFAULT_DELAY
+
+        tasks = {asyncio.ensure_future(self._call_with_retries(primary, *args, **kwargs)): primary}
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks[asyncio.ensure_future(self._call_with_retries(secondary, *args, **kwargs))] = secondary
+
+        pending = set(tasks)
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), tasks[task]
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, *args, provider: str = None, **kwargs):
+        """
+        Run the call and return `(result, provider_name)`. Passing `provider`
+        pins the request to that provider (retries, no failover).
+        """
+        if provider:
+            if provider not in self.providers:
+                raise ValueError(f"Unknown provider: {provider}")
+            return await self._call_with_retries(provider, *args, **kwargs), provider
+
+        candidates = self.ranked()
+        last_error = ProviderUnavailable("No provider available")
+        for index, name in enumerate(candidates):
+            try:
+                fallback = next(iter(candidates[index + 1:]), None)
+                if self.hedge and fallback and self.health[fallback].state == "closed":
+                    return await self._hedged(name, fallback, *args, **kwargs)
+                return await self._call_with_retries(name, *args, **kwargs), name
+            except Exception as e:
+                last_error = e
+                print(f"[Router] failing over from {name}: {e}")
+        raise last_error
+
+    def snapshot(self):
+        return {name: self.health[name].snapshot() for name in self.order}
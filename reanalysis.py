@@ -0,0 +1,119 @@
+from pipeline import analyze_cached, analysis_metadata
+from get_analysis import bucket_prompt
+from mongo_utils import (
+    get_reanalysis_run, update_reanalysis_run, checkpoint_reanalysis_run, iter_reanalysis_calls, save_reanalysis
+)
+import asyncio, os, random
+
+# Calls analyzed at the same time, and the analysis request rate across them
+REANALYSIS_CONCURRENCY = int(os.getenv("REANALYSIS_CONCURRENCY", "4"))
+REANALYSIS_RATE_PER_MINUTE = float(os.getenv("REANALYSIS_RATE_PER_MINUTE", "120"))
+# Calls per bulk write; progress is checkpointed after each batch
+REANALYSIS_BATCH_SIZE = int(os.getenv("REANALYSIS_BATCH_SIZE", "50"))
+REANALYSIS_RETRIES = int(os.getenv("REANALYSIS_RETRIES", "3"))
+REANALYSIS_BACKOFF_SECONDS = float(os.getenv("REANALYSIS_BACKOFF_SECONDS", "2"))
+
+
+class RateLimiter:
+    """
+    Space acquisitions at least 60 / per_minute seconds apart.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60 / per_minute if per_minute > 0 else 0.0
+        self.next_at = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        at = max(now, self.next_at)
+        self.next_at = at + self.interval
+        await asyncio.sleep(at - now)
+
+
+async def _analyze(doc: dict, limiter: RateLimiter, force: bool = False):
+    last_error = None
+    for attempt in range(REANALYSIS_RETRIES):
+        await limiter.wait()
+        try:
+            return await analyze_cached(doc["transcribe"], doc["bucket"], force=force)
+        except Exception as e:
+            last_error = e
+            print(f"[Reanalysis] {doc['_id']} attempt {attempt + 1} failed: {e}")
+            await asyncio.sleep(REANALYSIS_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random()))
+    raise last_error
+
+
+async def run_reanalysis(
+    run_id: str,
+    concurrency: int = REANALYSIS_CONCURRENCY,
+    rate_per_minute: float = REANALYSIS_RATE_PER_MINUTE,
+    force: bool = False
+):
+    """
+    Re-analyze the stored transcripts matching a run's filters, starting
+    after its checkpoint, so an interrupted run picks up where it stopped.
+
+    Calls whose analysis already comes from the current prompt and model are
+    skipped unless `force` is set. Returns the run document.
+    """
+    run = await get_reanalysis_run(run_id)
+    if not run:
+        raise ValueError(f"No re-analysis run {run_id}")
+    if run["status"] == "completed":
+        return run
+
+    await update_reanalysis_run(run_id, status="running", error=None)
+
+    limiter = RateLimiter(rate_per_minute)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    current = {}
+
+    async def analyze_one(doc: dict):
+        if not doc.get("transcribe") or doc.get("bucket") not in bucket_prompt:
+            return doc, None, "skipped"
+        metadata = current.setdefault(doc["bucket"], analysis_metadata(doc["bucket"]))
+        if not force and doc.get("analysis_prompt_sha256") == metadata["analysis_prompt_sha256"] \
+                and doc.get("analysis_model") == metadata["analysis_model"]:
+            return doc, None, "skipped"
+        async with semaphore:
+            try:
+                analysis = await _analyze(doc, limiter, force)
+            except Exception:
+                return doc, None, "failed"
+        return doc, analysis, "analyzed" if analysis else "failed"
+
+    async def flush(batch: list):
+        outcomes = await asyncio.gather(*(analyze_one(doc) for doc in batch))
+        applied = await save_reanalysis([
+            {
+                "doc": doc,
+                "analysis": analysis,
+                "model": current[doc["bucket"]]["analysis_model"],
+                "prompt_sha256": current[doc["bucket"]]["analysis_prompt_sha256"]
+            }
+            for doc, analysis, status in outcomes if status == "analyzed"
+        ], run_id)
+        counts = {"analyzed": 0, "skipped": 0, "failed": 0}
+        for doc, _, status in outcomes:
+            # Superseded by a concurrent re-analysis of the same call
+            if status == "analyzed" and doc["_id"] not in applied:
+                status = "skipped"
+            counts[status] += 1
+        failed_ids = [doc["_id"] for doc, _, status in outcomes if status == "failed"]
+        await checkpoint_reanalysis_run(run_id, batch[-1], counts, failed_ids)
+
+    try:
+        batch = []
+        async for doc in iter_reanalysis_calls(after=run["checkpoint"], batch_size=REANALYSIS_BATCH_SIZE, **run["filters"]):
+            batch.append(doc)
+            if len(batch) >= REANALYSIS_BATCH_SIZE:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+    except Exception as e:
+        await update_reanalysis_run(run_id, status="interrupted", error=str(e))
+        raise
+
+    await update_reanalysis_run(run_id, status="completed")
+    return await get_reanalysis_run(run_id)
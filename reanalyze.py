@@ -0,0 +1,70 @@
+"""
+Re-run the call analysis over stored transcripts, e.g. after changing a
+bucket prompt or the analysis model. Progress is checkpointed in Mongo, so
+an interrupted run can be resumed by id.
+
+    python reanalyze.py start --bucket x_bucket --date-from 2025-08-01 --date-to 2025-09-01
+    python reanalyze.py resume <run_id>
+    python reanalyze.py status <run_id>
+"""
+from reanalysis import run_reanalysis, REANALYSIS_CONCURRENCY, REANALYSIS_RATE_PER_MINUTE
+from mongo_utils import create_reanalysis_run, get_reanalysis_run, client
+from datetime import datetime
+import argparse, asyncio, json
+
+
+async def main(args):
+    try:
+        if args.command == "status":
+            print(json.dumps(await get_reanalysis_run(args.run_id), indent=2, default=str))
+            return
+
+        run_id = getattr(args, "run_id", None)
+        if args.command == "start":
+            filters = {
+                "agent_name": args.agent,
+                "bucket": args.bucket,
+                "date_from": datetime.fromisoformat(args.date_from) if args.date_from else None,
+                "date_to": datetime.fromisoformat(args.date_to) if args.date_to else None
+            }
+            run_id = await create_reanalysis_run(filters, {"force": args.force})
+            if not run_id:
+                raise SystemExit("Could not create the re-analysis run.")
+            print(f"Started re-analysis run {run_id}")
+
+        run = await get_reanalysis_run(run_id)
+        if not run:
+            raise SystemExit(f"No re-analysis run {run_id}")
+        result = await run_reanalysis(
+            run_id,
+            concurrency=args.concurrency,
+            rate_per_minute=args.rate,
+            force=run["settings"].get("force", False)
+        )
+        print(json.dumps(result["counts"]))
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start = commands.add_parser("start", help="re-analyze the calls matching the filters")
+    start.add_argument("--bucket")
+    start.add_argument("--agent")
+    start.add_argument("--date-from", help="inclusive, ISO date or datetime")
+    start.add_argument("--date-to", help="exclusive, ISO date or datetime")
+    start.add_argument("--force", action="store_true", help="also re-analyze calls already on the current prompt and model")
+
+    resume = commands.add_parser("resume", help="continue an interrupted run from its checkpoint")
+    resume.add_argument("run_id")
+
+    status = commands.add_parser("status", help="show a run's progress")
+    status.add_argument("run_id")
+
+    for command in (start, resume):
+        command.add_argument("--concurrency", type=int, default=REANALYSIS_CONCURRENCY)
+        command.add_argument("--rate", type=float, default=REANALYSIS_RATE_PER_MINUTE, help="analysis requests per minute")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,19 @@
+"""
+Recompute the /analytics rollups from the calls collection.
+
+    python rebuild_rollups.py
+"""
+from mongo_utils import rebuild_rollups, client
+import asyncio
+
+
+async def main():
+    count = await rebuild_rollups()
+    await client.close()
+    if count is None:
+        raise SystemExit("Rollup rebuild failed.")
+    print(f"Rebuilt {count} rollup documents.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,272 @@
+from get_analysis import ANALYSIS_MODEL
+from starlette.concurrency import run_in_threadpool
+import asyncio, math, os, re, unicodedata
+
+# tiktoken downloads the encoding once into its cache directory; a prefetched
+# copy next to the code (`python transcript_compaction.py`) is used when present,
+# so serverless cold starts read it instead of downloading it again
+ENCODING_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tiktoken")
+if os.path.isdir(ENCODING_CACHE_DIR):
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", ENCODING_CACHE_DIR)
+
+# Compact transcripts before analysis; "0" sends them as transcribed
+TRANSCRIPT_COMPACTION = os.getenv("TRANSCRIPT_COMPACTION", "1") == "1"
+# Max analysis input tokens for the transcript; 0 disables the budget
+TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", "6000"))
+# Collapse immediately repeated phrases and runs of filler-only turns (hold, "hello? hello?")
+TRANSCRIPT_COLLAPSE_REPEATS = os.getenv("TRANSCRIPT_COLLAPSE_REPEATS", "0") == "1"
+# Longest phrase, in words, checked for immediate repetition
+REPEAT_MAX_WORDS = int(os.getenv("TRANSCRIPT_REPEAT_MAX_WORDS", "4"))
+# Consecutive filler-only turns that count as a hold segment
+HOLD_MIN_TURNS = int(os.getenv("TRANSCRIPT_HOLD_MIN_TURNS", "3"))
+
+# Sentences longer than budget / this are cut into pieces of whole words
+SEGMENT_BUDGET_SHARE = 8
+
+# Part of the analysis cache key: changing any of these changes the model input
+COMPACTION_SETTINGS = [
+    TRANSCRIPT_COMPACTION, TRANSCRIPT_TOKEN_BUDGET, TRANSCRIPT_COLLAPSE_REPEATS, REPEAT_MAX_WORDS, HOLD_MIN_TURNS,
+    SEGMENT_BUDGET_SHARE
+]
+
+SPEAKER_LABEL = re.compile(r"^\s*speaker\s*(\d+)\s*[:：]\s*", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.?!।])\s+")
+PUNCTUATION = ".,?!।;:-…\"'"
+FILLER_WORDS = {
+    "hello", "hi", "hmm", "hm", "ok", "okay", "yes", "ya", "haan", "han", "ji", "sir", "ma'am", "madam",
+    "जी", "हां", "हाँ", "हम्म", "हेलो", "हैलो", "अच्छा", "ओके", "सर"
+}
+
+_encoding = None
+_loading = None
+
+
+def load_encoding():
+    """
+    The analysis model's tiktoken encoding, or False when it cannot be
+    loaded. The first call may download it, so async code goes through
+    ensure_encoding instead.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model(ANALYSIS_MODEL)
+        except Exception as e:
+            print(f"[Compaction] tiktoken unavailable, estimating tokens: {e}")
+            _encoding = False
+    return _encoding
+
+
+def start_encoding_load():
+    """
+    Begin loading the encoding in the thread pool (once) and return the future.
+    """
+    global _loading
+    if _loading is None:
+        _loading = asyncio.ensure_future(run_in_threadpool(load_encoding))
+    return _loading
+
+
+async def ensure_encoding():
+    """
+    Wait until the encoding is loaded, without blocking the event loop.
+    """
+    if _encoding is None:
+        await asyncio.shield(start_encoding_load())
+
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens `text` costs as analysis input. Uses the model's tiktoken encoding
+    when it can be loaded, otherwise an estimate (about 4 characters per
+    token for Latin text and 2 for Devanagari).
+    """
+    encoding = _encoding if _encoding is not None else load_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for char in text if char.isascii())
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+
+def parse_turns(transcript: str) -> list:
+    """
+    Split a transcript into `[speaker, text]` turns with whitespace collapsed,
+    merging consecutive lines from the same speaker. Unlabelled lines belong
+    to the previous speaker; transcripts without labels give one turn whose
+    speaker is None.
+    """
+    turns = []
+    for line in unicodedata.normalize("NFC", transcript).splitlines():
+        line = " ".join(line.split())
+        if not line:
+            continue
+        match = SPEAKER_LABEL.match(line)
+        if match:
+            speaker, line = int(match.group(1)), line[match.end():]
+        else:
+            speaker = turns[-1][0] if turns else None
+        if not line:
+            continue
+        if turns and turns[-1][0] == speaker:
+            turns[-1][1] += " " + line
+        else:
+            turns.append([speaker, line])
+    return turns
+
+
+def render_turns(turns: list) -> str:
+    return "\n".join(text if speaker is None else f"Speaker {speaker}: {text}" for speaker, text in turns)
+
+
+def _word_key(word: str) -> str:
+    return word.strip(PUNCTUATION).lower()
+
+
+def collapse_repeats(text: str, max_words: int = REPEAT_MAX_WORDS) -> str:
+    """
+    Drop immediate repetitions of phrases up to `max_words` long, e.g.
+    "वह क्या मतलब वह क्या मतलब" → "वह क्या मतलब". Punctuation is ignored
+    when comparing.
+    """
+    words, kept = text.split(), []
+    index = 0
+    while index < len(words):
+        for size in range(min(max_words, len(kept), len(words) - index), 0, -1):
+            phrase = [_word_key(word) for word in words[index:index + size]]
+            if all(phrase) and phrase == [_word_key(word) for word in kept[-size:]]:
+                index += size
+                break
+        else:
+            kept.append(words[index])
+            index += 1
+    return " ".join(kept)
+
+
+def _is_filler(text: str) -> bool:
+    words = [_word_key(word) for word in text.split()]
+    return len(words) <= 4 and all(word in FILLER_WORDS or not word for word in words)
+
+
+def collapse_holds(turns: list, min_turns: int = HOLD_MIN_TURNS) -> list:
+    """
+    Replace runs of at least `min_turns` filler-only turns with the first one
+    and a marker, keeping the fact that the call stalled there.
+    """
+    result, index = [], 0
+    while index < len(turns):
+        end = index
+        while end < len(turns) and _is_filler(turns[end][1]):
+            end += 1
+        if end - index >= min_turns:
+            result.append(turns[index])
+            result.append([None, f"[{end - index - 1} short filler turns omitted]"])
+            index = end
+        else:
+            result.append(turns[index])
+            index += 1
+    return result
+
+
+def split_words(segment: list, max_tokens: int) -> list:
+    """
+    Cut a segment longer than `max_tokens` into consecutive pieces of whole
+    words that each fit, for transcripts with few or no sentence ends.
+    """
+    speaker, text = segment
+    if count_tokens(text) <= max_tokens:
+        return [segment]
+    pieces, words, used = [], [], 0
+    for word in text.split():
+        cost = count_tokens(" " + word)
+        if words and used + cost > max_tokens:
+            pieces.append([speaker, " ".join(words)])
+            words, used = [], 0
+        words.append(word)
+        used += cost
+    if words:
+        pieces.append([speaker, " ".join(words)])
+    return pieces
+
+
+def fit_budget(turns: list, budget: int) -> list:
+    """
+    Keep the opening and the closing of the call (what greeting and closing
+    scores depend on) within `budget` tokens, dropping sentences from the
+    middle and marking the gap. Sentences longer than a
+    SEGMENT_BUDGET_SHARE of the budget are cut by words first, so an
+    unpunctuated transcript still keeps both ends. The first piece is kept
+    even when the budget cannot fit it next to the marker: the model never
+    gets a call with no transcript text.
+    """
+    max_segment = max(1, budget // SEGMENT_BUDGET_SHARE)
+    segments = [
+        piece
+        for speaker, text in turns
+        for sentence in SENTENCE_END.split(text) if sentence
+        for piece in split_words([speaker, sentence], max_segment)
+    ]
+    costs = [count_tokens(render_turns([segment])) + 1 for segment in segments]
+    if sum(costs) <= budget:
+        return turns
+
+    used = count_tokens("[... 00000 passages omitted to fit the token budget ...]") + 1
+    head, tail = [], []
+    first, last = 0, len(segments) - 1
+    from_head = True
+    while first <= last:
+        index = first if from_head else last
+        if used + costs[index] > budget:
+            break
+        used += costs[index]
+        if from_head:
+            head.append(segments[first])
+            first += 1
+        else:
+            tail.insert(0, segments[last])
+            last -= 1
+        from_head = not from_head
+    if not head and not tail:
+        head, first = [segments[0]], 1
+    marker = [None, f"[... {last - first + 1} passages omitted to fit the token budget ...]"]
+
+    merged = []
+    for speaker, text in head + [marker] + tail:
+        if merged and merged[-1][0] == speaker and speaker is not None:
+            merged[-1][1] += " " + text
+        else:
+            merged.append([speaker, text])
+    return merged
+
+
+def compact_transcript(transcript: str, budget: int = None, collapse: bool = None):
+    """
+    Analysis input for a transcript: speaker labels and whitespace
+    normalized, consecutive turns from one speaker merged, optionally
+    repetitions and hold segments collapsed, and cut to the token budget.
+
+    Returns `(text, stats)`, stats holding the token counts before and after.
+    """
+    budget = TRANSCRIPT_TOKEN_BUDGET if budget is None else budget
+    collapse = TRANSCRIPT_COLLAPSE_REPEATS if collapse is None else collapse
+
+    turns = parse_turns(transcript)
+    if collapse:
+        turns = collapse_holds([[speaker, collapse_repeats(text)] for speaker, text in turns])
+    if budget > 0:
+        turns = fit_budget(turns, budget)
+
+    text = render_turns(turns)
+    return text, {
+        "tokens_before": count_tokens(transcript),
+        "tokens_after": count_tokens(text)
+    }
+
+
+if __name__ == "__main__":
+    # Build step: fetch the encoding into ENCODING_CACHE_DIR to ship with the code
+    os.makedirs(ENCODING_CACHE_DIR, exist_ok=True)
+    os.environ["TIKTOKEN_CACHE_DIR"] = ENCODING_CACHE_DIR
+    if not load_encoding():
+        raise SystemExit("Could not fetch the tiktoken encoding.")
+    print(f"Cached the {ANALYSIS_MODEL} encoding in {ENCODING_CACHE_DIR}.")